@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import log_classifier  # noqa: E402
+import miner_config  # noqa: E402
+from log_buffer import LogBuffer  # noqa: E402
+from miner_events import MinerOutputParser, MiningStatistics  # noqa: E402
+from miner_supervisor import MinerSupervisor  # noqa: E402
+from mining_session import (MiningOutputPipeline, create_log_writer, monitor_mining_connection,  # noqa: E402
+                            monitor_large_pages)
+
+DEFAULT_TOLERANCE = 0.15  # 比基准慢超过这个比例视为性能退化
+
+# 与SRBMiner真实输出格式相近的样本行，按比例混合：大部分是算力和份额，少量连接、任务和错误信息
+SAMPLE_LINES = [
+    "[2024-05-01 12:00:00] cpu hashrate: 10s: 1234.56 H/s 60s: 1230.12 H/s",
+    "[2024-05-01 12:00:01] cpu result accepted [ 35ms ] shares: 120/1",
+    "[2024-05-01 12:00:01] pool1 new job from scash.pool.example:3333 diff 1000 height 123456",
+    "[2024-05-01 12:00:02] cpu0 thread stats: nonce 0000abcd",
+    "[2024-05-01 12:00:02] Total hashrate: 1.23 KH/s",
+    "[2024-05-01 12:00:03] cpu result rejected [ reason: Low difficulty share ] [ 40ms ]",
+    "[2024-05-01 12:00:03] pool1 difficulty set to 1200",
+    "[2024-05-01 12:00:04] cpu1 thread stats: nonce 0000abce",
+    "[2024-05-01 12:00:04] pool1 connected to scash.pool.example:3333",
+    "[2024-05-01 12:00:05] devfee: connection failed to devfee pool, retrying in 10 sec",
+    "[2024-05-01 12:00:05] randomx: huge pages allocated 100%",
+    "[2024-05-01 12:00:06] cpu2 thread stats: nonce 0000abcf",
+]
+
+
+class SkipBenchmark(Exception):
+    """当前环境无法运行的测试（例如没有图形界面）"""
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name, items):
+    """注册一个测试：func(count) 执行 count 项工作，返回 (实际完成的项数, 计时的秒数)"""
+    def register(func):
+        BENCHMARKS[name] = (func, items)
+        return func
+    return register
+
+
+def sample_lines(count):
+    return [SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(count)]
+
+
+@benchmark('classify', 200000)
+def bench_classify(count):
+    """日志窗口给每行着色时的分类（classify_line + ui_tag）"""
+    lines = sample_lines(count)
+    classify_line, ui_tag = log_classifier.classify_line, log_classifier.ui_tag
+    started = time.perf_counter()
+    for line in lines:
+        ui_tag(classify_line(line))
+    return count, time.perf_counter() - started
+
+
+@benchmark('parse_monitor', 100000)
+def bench_parse_monitor(count):
+    """解析挖矿事件并通知统计、连接监测和大页监测"""
+    lines = sample_lines(count)
+    parser = MinerOutputParser()
+    MiningStatistics().attach(parser)
+    quiet = lambda message: None  # noqa: E731
+    monitor_mining_connection(parser, quiet)
+    monitor_large_pages(parser, quiet)
+    feed_line = parser.feed_line
+    started = time.perf_counter()
+    for line in lines:
+        feed_line(line)
+    return count, time.perf_counter() - started
+
+
+@benchmark('pipeline', 100000)
+def bench_pipeline(count):
+    """挖矿输出流水线的完整处理：显示（入队）、解析和监测、写日志缓冲"""
+    lines = sample_lines(count)
+    queue = LogBuffer(maxlen=count + 1)
+    with tempfile.TemporaryDirectory(prefix="scash-bench-") as workdir:
+        pipeline = MiningOutputPipeline(miner_config.DEFAULT_CONFIG, display=queue.append, log=lambda message: None,
+                                        log_file_path=os.path.join(workdir, "mining_log.txt"))
+        pipeline.open()
+        started = time.perf_counter()
+        for offset in range(0, count, 256):
+            pipeline.handle_lines(lines[offset:offset + 256])
+        elapsed = time.perf_counter() - started
+        pipeline.close()
+    return count, elapsed
+
+
+@benchmark('log_queue', 200000)
+def bench_log_queue(count):
+    """日志队列：读取线程入队（含重复消息合并），界面线程按批取出"""
+    lines = sample_lines(count)
+    queue = LogBuffer(maxlen=10000)
+    append, drain = queue.append, queue.drain
+    started = time.perf_counter()
+    for index, line in enumerate(lines, 1):
+        append(line)
+        if index % 500 == 0:
+            drain()
+    drain()
+    return count, time.perf_counter() - started
+
+
+@benchmark('log_write', 200000)
+def bench_log_write(count):
+    """日志写入：按默认配置批量写盘，计时包括关闭时的最后一次刷新"""
+    lines = sample_lines(count)
+    with tempfile.TemporaryDirectory(prefix="scash-bench-") as workdir:
+        writer = create_log_writer(miner_config.DEFAULT_CONFIG, os.path.join(workdir, "mining_log.txt"))
+        writer.open()
+        write_line = writer.write_line
+        started = time.perf_counter()
+        for line in lines:
+            write_line(line)
+        writer.close()
+        elapsed = time.perf_counter() - started
+        writer.wait_for_compression()
+    return count, elapsed
+
+
+# 尽快输出 count 行的子进程
+EMITTER = """
+import sys
+lines = {lines!r}
+count = {count}
+chunk = "\\n".join(lines[i % len(lines)] for i in range(1000)) + "\\n"
+for _ in range(count // 1000):
+    sys.stdout.write(chunk)
+sys.stdout.flush()
+"""
+
+
+@benchmark('reader', 500000)
+def bench_reader(count):
+    """监督线程读取快速输出的子进程（分块读取、拆分为行、按批回调）"""
+    count = max(1000, count - count % 1000)
+    supervisor = MinerSupervisor()
+    state = {'lines': 0, 'first': None}
+    done = threading.Event()
+
+    def on_lines(lines):
+        if state['first'] is None:
+            state['first'] = time.perf_counter()
+        state['lines'] += len(lines)
+
+    def on_exit(returncode, stop_requested):
+        state['last'] = time.perf_counter()
+        done.set()
+
+    try:
+        supervisor.start([sys.executable, '-c', EMITTER.format(lines=SAMPLE_LINES, count=count)],
+                         on_lines=on_lines, on_exit=on_exit).result(10)
+        if not done.wait(120):
+            raise RuntimeError("子进程没有在120秒内结束")
+    finally:
+        supervisor.shutdown()
+    # 从收到第一批输出开始计时，不包括启动Python子进程的时间
+    return state['lines'], state['last'] - state['first']
+
+
+@benchmark('tk_insert', 20000)
+def bench_tk_insert(count):
+    """日志文本框按批插入带颜色标签的行（隐藏的Tk窗口，包括超出最大行数时的删除）"""
+    try:
+        import tkinter as tk
+        from tkinter import scrolledtext
+        root = tk.Tk()
+    except Exception as e:
+        raise SkipBenchmark(f"无法创建Tk窗口: {str(e)}")
+    import main
+    try:
+        root.withdraw()
+        # 只需要 render_log_batch / trim_log_text 用到的属性，不创建完整的主窗口
+        gui = types.SimpleNamespace(log_text=scrolledtext.ScrolledText(root, wrap=tk.WORD), log_max_lines=5000,
+                                    trimmed_line_count=0)
+        gui.trim_log_text = lambda: main.ScashMinerGUI.trim_log_text(gui)
+        gui.log_text.pack()
+        lines = sample_lines(count)
+        started = time.perf_counter()
+        for offset in range(0, count, 100):
+            main.ScashMinerGUI.render_log_batch(gui, lines[offset:offset + 100])
+            root.update_idletasks()
+        elapsed = time.perf_counter() - started
+    finally:
+        root.destroy()
+    return count, elapsed
+
+
+def run_benchmarks(names, repeat, scale, log=print):
+    results = {}
+    for name in names:
+        func, items = BENCHMARKS[name]
+        count = max(1, int(items * scale))
+        rates = []
+        try:
+            for _ in range(repeat):
+                done, seconds = func(count)
+                rates.append(done / seconds if seconds > 0 else float('inf'))
+        except SkipBenchmark as e:
+            log(f"⏭️ {name}: 跳过（{str(e)}）")
+            results[name] = {'skipped': str(e)}
+            continue
+        median = statistics.median(rates)
+        results[name] = {
+            'unit': 'lines/s',
+            'items': count,
+            'runs': [round(rate, 1) for rate in rates],
+            'median': round(median, 1),
+            'best': round(max(rates), 1),
+            'spread': round((max(rates) - min(rates)) / median, 3) if median else None,
+        }
+        log(f"✅ {name}: {median:,.0f} 行/秒（最好 {max(rates):,.0f}，{repeat} 次）")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """与基准结果比较最好成绩（受机器上其他负载的影响比中位数小），
+    返回 {测试名: 变化比例}，以及变慢超过 tolerance 的测试"""
+    changes = {}
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if 'best' not in result or not base or not base.get('best'):
+            continue
+        change = result['best'] / base['best'] - 1
+        changes[name] = round(change, 4)
+        if change < -tolerance:
+            regressions.append(name)
+    return changes, regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'host': platform.node(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scash Miner 性能测试：日志分类、事件解析、输出读取、日志写入和界面插入的吞吐量")
+    parser.add_argument('names', nargs='*', help=f"只运行指定的测试（{', '.join(BENCHMARKS)}）")
+    parser.add_argument('--repeat', type=int, default=5, help="每个测试重复的次数，取中位数")
+    parser.add_argument('--scale', type=float, default=1.0, help="每个测试工作量的倍数")
+    parser.add_argument('--json', dest='json_path', help="把结果写入JSON文件（可作为以后的基准）")
+    parser.add_argument('--baseline', help="与之前保存的JSON结果比较，变慢超过容差时退出码为1")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="允许变慢的比例（默认0.15）")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的测试: {', '.join(unknown)}")
+
+    report = {
+        'environment': environment(),
+        'repeat': args.repeat,
+        'scale': args.scale,
+        'results': run_benchmarks(args.names or list(BENCHMARKS), max(1, args.repeat), args.scale),
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        base_env = baseline.get('environment') or {}
+        if (base_env.get('host'), base_env.get('python')) != (report['environment']['host'],
+                                                              report['environment']['python']):
+            print(f"⚠️ 基准来自其他环境（{base_env.get('host')}, Python {base_env.get('python')}），比较结果仅供参考")
+        changes, regressions = compare(report['results'], baseline, args.tolerance)
+        report['baseline'] = {'path': args.baseline, 'environment': baseline.get('environment'),
+                              'tolerance': args.tolerance, 'changes': changes, 'regressions': regressions}
+        for name, change in changes.items():
+            mark = "❌" if name in regressions else "✅"
+            print(f"{mark} {name}: 与基准相比 {change * 100:+.1f}%")
+        if regressions:
+            print(f"⚠️ 性能退化: {', '.join(regressions)}（容差 {args.tolerance * 100:.0f}%）")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import os
+
+SYSFS_ROOT = "/sys"
+
+# RandomX每个线程需要2MB的L3缓存存放scratchpad
+RANDOMX_L3_PER_THREAD = 2 * 1024 * 1024
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+
+
+def parse_cpu_list(text):
+    """解析sysfs中的CPU列表，如 "0-3,8-11" """
+    cpus = []
+    for part in text.strip().split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def parse_cache_size(text):
+    """解析缓存大小，如 "32768K" """
+    text = text.strip().upper()
+    if text and text[-1] in SIZE_UNITS:
+        return int(text[:-1]) * SIZE_UNITS[text[-1]]
+    return int(text)
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class CpuTopology:
+    """从Linux sysfs读取的CPU拓扑：逻辑CPU、物理核心、SMT兄弟线程、NUMA节点和L3缓存"""
+
+    def __init__(self, cpus, cores, numa_nodes, l3_caches):
+        self.cpus = cpus                # 在线的逻辑CPU编号
+        self.cores = cores              # (封装ID, 核心ID) -> 该核心上的逻辑CPU
+        self.numa_nodes = numa_nodes    # NUMA节点 -> 逻辑CPU
+        self.l3_caches = l3_caches      # [(L3大小, 共享该L3的逻辑CPU)]
+
+    @property
+    def logical_cpus(self):
+        return len(self.cpus)
+
+    @property
+    def physical_cores(self):
+        return len(self.cores) or len(self.cpus)
+
+    @property
+    def smt(self):
+        return self.physical_cores < self.logical_cpus
+
+    @property
+    def l3_total(self):
+        return sum(size for size, _ in self.l3_caches)
+
+    def recommended_threads(self):
+        """按每个L3缓存域可容纳的RandomX线程数估算最佳线程数（不超过该域的逻辑CPU数）"""
+        if not self.l3_caches:
+            # 没有缓存信息时按CPU核心数-1
+            return max(1, self.logical_cpus - 1)
+        threads = 0
+        for size, shared_cpus in self.l3_caches:
+            threads += min(size // RANDOMX_L3_PER_THREAD, len(shared_cpus))
+        return max(1, threads)
+
+    def describe(self):
+        """拓扑摘要，用于日志"""
+        parts = [f"{self.logical_cpus} 个逻辑CPU", f"{self.physical_cores} 个物理核心"]
+        if self.smt:
+            parts.append("已开启SMT/超线程")
+        if len(self.numa_nodes) > 1:
+            parts.append(f"{len(self.numa_nodes)} 个NUMA节点")
+        if self.l3_caches:
+            sizes = " + ".join(f"{size // (1024 * 1024)}MB" for size, _ in self.l3_caches)
+            parts.append(f"L3缓存 {sizes}")
+        return "，".join(parts)
+
+
+def read_topology(sysfs_root=SYSFS_ROOT):
+    """读取CPU拓扑；不是Linux或读取失败时返回None（sysfs_root可指向测试用的假目录）"""
+    cpu_root = os.path.join(sysfs_root, "devices", "system", "cpu")
+    if not os.path.isdir(cpu_root):
+        return None
+
+    online = _read(os.path.join(cpu_root, "online"))
+    if online:
+        cpus = parse_cpu_list(online)
+    else:
+        cpus = sorted(int(name[3:]) for name in os.listdir(cpu_root)
+                      if name.startswith("cpu") and name[3:].isdigit())
+    if not cpus:
+        return None
+
+    cores = {}
+    l3_by_cpus = {}
+    for cpu in cpus:
+        cpu_dir = os.path.join(cpu_root, f"cpu{cpu}")
+        package_id = _read(os.path.join(cpu_dir, "topology", "physical_package_id"))
+        core_id = _read(os.path.join(cpu_dir, "topology", "core_id"))
+        if package_id is not None and core_id is not None:
+            cores.setdefault((int(package_id), int(core_id)), []).append(cpu)
+
+        cache_root = os.path.join(cpu_dir, "cache")
+        try:
+            indexes = [name for name in os.listdir(cache_root) if name.startswith("index")]
+        except OSError:
+            indexes = []
+        for index in indexes:
+            index_dir = os.path.join(cache_root, index)
+            if _read(os.path.join(index_dir, "level")) != "3":
+                continue
+            size = _read(os.path.join(index_dir, "size"))
+            shared = _read(os.path.join(index_dir, "shared_cpu_list"))
+            if not size:
+                continue
+            shared_cpus = tuple(parse_cpu_list(shared)) if shared else (cpu,)
+            # 共享同一个L3的CPU只记录一次
+            l3_by_cpus[shared_cpus] = parse_cache_size(size)
+
+    numa_nodes = {}
+    node_root = os.path.join(sysfs_root, "devices", "system", "node")
+    if os.path.isdir(node_root):
+        for name in sorted(os.listdir(node_root)):
+            if name.startswith("node") and name[4:].isdigit():
+                cpulist = _read(os.path.join(node_root, name, "cpulist"))
+                node_cpus = [cpu for cpu in parse_cpu_list(cpulist) if cpu in cpus] if cpulist else []
+                if node_cpus:
+                    numa_nodes[int(name[4:])] = node_cpus
+    if not numa_nodes:
+        numa_nodes = {0: list(cpus)}
+
+    online_set = set(cpus)
+    l3_caches = [(size, [cpu for cpu in shared if cpu in online_set])
+                 for shared, size in sorted(l3_by_cpus.items())]
+    return CpuTopology(cpus, cores, numa_nodes, l3_caches)
+
+
+def check_threads(threads, topology):
+    """检查线程数是否明显不合理，返回提示信息或None"""
+    if topology is None:
+        return None
+    if threads > topology.logical_cpus:
+        return f"CPU线程数 {threads} 超过了逻辑CPU数 {topology.logical_cpus}，多出的线程只会互相争抢CPU"
+    recommended = topology.recommended_threads()
+    if topology.l3_caches and threads > recommended * 1.5:
+        return (f"CPU线程数 {threads} 远超过L3缓存可容纳的线程数（约 {recommended}），"
+                f"RandomX算力可能反而下降")
+    return None
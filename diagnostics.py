@@ -0,0 +1,296 @@
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# 尝试导入psutil库，如果失败则在Linux上读取 /proc，其他系统只能得到本进程的Python线程数
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+SAMPLE_INTERVAL_MS = 1000  # 汇总一次运行数据的间隔（毫秒）
+LAG_PROBE_INTERVAL_MS = 200  # 检测界面事件循环延迟的定时器间隔（毫秒）
+HISTORY = 600  # 保留最近多少次汇总（默认10分钟）
+SAMPLING_INTERVAL = 0.005  # 采样分析的间隔（秒）
+PROFILE_TOP = 30  # 分析报告中列出的函数个数
+
+
+def process_stats(pid=None):
+    """返回进程的线程数和常驻内存 {'pid', 'threads', 'rss'}，无法获取时返回None"""
+    pid = os.getpid() if pid is None else pid
+    if PSUTIL_AVAILABLE:
+        try:
+            process = psutil.Process(pid)
+            return {'pid': pid, 'threads': process.num_threads(), 'rss': process.memory_info().rss}
+        except psutil.Error:
+            return None
+    try:
+        stats = {'pid': pid, 'threads': None, 'rss': None}
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+                elif line.startswith('VmRSS:'):
+                    stats['rss'] = int(line.split()[1]) * 1024
+        return stats
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid == os.getpid():
+        return {'pid': pid, 'threads': threading.active_count(), 'rss': None}
+    return None
+
+
+def _format_mb(value):
+    return f"{value / 1024 / 1024:.1f} MB" if value is not None else "未知"
+
+
+class SelfMonitor:
+    """程序自身的运行数据：界面事件循环延迟、日志队列长度、每秒读取的行数、每批日志刷新耗时，
+    以及界面进程和挖矿进程的线程数和内存。定时器都在界面线程中运行"""
+
+    def __init__(self, schedule, log_queue, read_stats, miner_pids, history=HISTORY):
+        self.schedule = schedule  # schedule(毫秒, 回调)，即 root.after
+        self.log_queue = log_queue
+        self.read_stats = read_stats  # 返回挖矿输出读取统计（MinerGroup.stats）
+        self.miner_pids = miner_pids  # 返回挖矿进程PID列表
+        self.history = deque(maxlen=history)
+        self.started_at = time.time()
+        self._running = False
+        # 当前汇总周期内的数据
+        self._lags = []
+        self._expected = None
+        self._batches = 0
+        self._batch_lines = 0
+        self._batch_total = 0.0
+        self._batch_max = 0.0
+        self._queue_max = 0
+        self._last_lines = None
+        self._last_sample = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._expected = time.perf_counter() + LAG_PROBE_INTERVAL_MS / 1000
+        self._last_sample = time.perf_counter()
+        self.schedule(LAG_PROBE_INTERVAL_MS, self._probe)
+        self.schedule(SAMPLE_INTERVAL_MS, self._sample)
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _probe(self):
+        """定时器实际触发的时间比预定时间晚多少，就是界面线程被占用的时间"""
+        if not self._running:
+            return
+        now = time.perf_counter()
+        self._lags.append(max(0.0, now - self._expected))
+        self._queue_max = max(self._queue_max, len(self.log_queue))
+        self._expected = now + LAG_PROBE_INTERVAL_MS / 1000
+        self.schedule(LAG_PROBE_INTERVAL_MS, self._probe)
+
+    def record_batch(self, lines, seconds):
+        """记录一次日志刷新（update_log_display）处理的行数和耗时"""
+        self._batches += 1
+        self._batch_lines += lines
+        self._batch_total += seconds
+        self._batch_max = max(self._batch_max, seconds)
+
+    def _sample(self):
+        if not self._running:
+            return
+        try:
+            self.history.append(self._collect())
+        finally:
+            self.schedule(SAMPLE_INTERVAL_MS, self._sample)
+
+    def _collect(self):
+        now = time.perf_counter()
+        elapsed = max(now - self._last_sample, 1e-9)
+        self._last_sample = now
+
+        # 每个会话开始时读取统计会清零，这时按新会话的行数计算
+        lines = self.read_stats()['lines']
+        previous = self._last_lines if self._last_lines is not None and lines >= self._last_lines else 0
+        self._last_lines = lines
+
+        lags = self._lags
+        queue_stats = self.log_queue.stats()
+        sample = {
+            'time': time.time(),
+            'loop_lag_ms': {
+                'avg': round(sum(lags) / len(lags) * 1000, 2) if lags else None,
+                'max': round(max(lags) * 1000, 2) if lags else None,
+            },
+            'log_queue': {
+                'depth': len(self.log_queue),
+                'max_depth': self._queue_max,
+                'dropped': queue_stats['dropped'],
+                'coalesced': queue_stats['coalesced'],
+            },
+            'lines_per_sec': round((lines - previous) / elapsed, 1),
+            'display_batches': {
+                'count': self._batches,
+                'lines': self._batch_lines,
+                'avg_ms': round(self._batch_total / self._batches * 1000, 2) if self._batches else None,
+                'max_ms': round(self._batch_max * 1000, 2) if self._batches else None,
+            },
+            'gui': process_stats(),
+            'python_threads': threading.active_count(),
+            'miners': [stats for stats in (process_stats(pid) for pid in self.miner_pids()) if stats is not None],
+        }
+        self._lags = []
+        self._batches = self._batch_lines = 0
+        self._batch_total = self._batch_max = 0.0
+        self._queue_max = len(self.log_queue)
+        return sample
+
+    @property
+    def latest(self):
+        return self.history[-1] if self.history else None
+
+    def format_lines(self):
+        """诊断面板显示的文本"""
+        sample = self.latest
+        if sample is None:
+            return ["正在收集数据..."]
+        lag = sample['loop_lag_ms']
+        queue = sample['log_queue']
+        batches = sample['display_batches']
+        recent = list(self.history)[-60:]
+        worst_lag = max((item['loop_lag_ms']['max'] or 0 for item in recent), default=0)
+        lines = [
+            f"界面事件循环延迟: 平均 {lag['avg'] if lag['avg'] is not None else '-'} ms，"
+            f"最大 {lag['max'] if lag['max'] is not None else '-'} ms（最近1分钟最大 {worst_lag} ms）",
+            f"日志队列: 当前 {queue['depth']} 条，本秒最多 {queue['max_depth']} 条，"
+            f"累计丢弃 {queue['dropped']} 条，合并 {queue['coalesced']} 条",
+            f"读取挖矿输出: {sample['lines_per_sec']} 行/秒",
+            f"日志刷新: {batches['count']} 批 / {batches['lines']} 行，"
+            f"每批平均 {batches['avg_ms'] if batches['avg_ms'] is not None else '-'} ms，"
+            f"最长 {batches['max_ms'] if batches['max_ms'] is not None else '-'} ms",
+        ]
+        gui = sample['gui'] or {}
+        lines.append(f"界面进程: 线程 {gui.get('threads', '未知')}（Python线程 {sample['python_threads']}），"
+                     f"内存 {_format_mb(gui.get('rss'))}")
+        if not sample['miners']:
+            lines.append("挖矿进程: 未运行" if not self.miner_pids() else "挖矿进程: 无法读取（需要安装psutil）")
+        for miner in sample['miners']:
+            lines.append(f"挖矿进程 PID {miner['pid']}: 线程 {miner['threads']}，内存 {_format_mb(miner['rss'])}")
+        if not PSUTIL_AVAILABLE and not sys.platform.startswith('linux'):
+            lines.append("💡 安装 psutil 后可以显示进程内存和线程数: pip install psutil")
+        return lines
+
+    def dump(self, path, profiler=None):
+        """把运行数据历史写入JSON文件"""
+        data = {
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'dumped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'sample_interval_ms': SAMPLE_INTERVAL_MS,
+            'lag_probe_interval_ms': LAG_PROBE_INTERVAL_MS,
+            'profiler': profiler.mode if profiler is not None and profiler.running else None,
+            'history': list(self.history),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+class RuntimeProfiler:
+    """运行时开关的性能分析：
+    cprofile 用 cProfile 分析调用 start 的线程（界面线程）；
+    sampling 在后台线程定时采样所有线程的调用栈，开销小，能看到读取线程等其他线程"""
+
+    def __init__(self, mode='sampling', interval=SAMPLING_INTERVAL):
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f"未知的分析方式: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.running = False
+        self.started_at = None
+        self._profile = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.thread_counts = Counter()
+
+    def start(self):
+        self.started_at = time.time()
+        self.running = True
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="SamplingProfiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.thread_counts[names.get(ident, str(ident))] += 1
+                self.self_counts[self._location(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    location = self._location(frame)
+                    if location not in seen:
+                        seen.add(location)
+                        self.total_counts[location] += 1
+                    frame = frame.f_back
+            self.samples += 1
+
+    @staticmethod
+    def _location(frame):
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+    def stop(self, path_prefix):
+        """停止分析并保存报告，返回报告文件路径列表"""
+        self.running = False
+        paths = []
+        if self.mode == 'cprofile':
+            self._profile.disable()
+            # .prof 可用 snakeviz 等工具查看，.txt 为按累计时间排序的摘要
+            self._profile.dump_stats(path_prefix + ".prof")
+            paths.append(path_prefix + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            report = stream.getvalue()
+        else:
+            self._stop_event.set()
+            self._thread.join()
+            report = self.format_samples()
+        with open(path_prefix + ".txt", 'w', encoding='utf-8') as f:
+            f.write(report)
+        paths.append(path_prefix + ".txt")
+        return paths
+
+    def format_samples(self):
+        duration = time.time() - self.started_at
+        lines = [f"采样分析: {self.samples} 次采样，{duration:.1f} 秒，间隔 {self.interval * 1000:.0f} ms", "",
+                 "各线程采样次数:"]
+        lines.extend(f"  {count:8d}  {name}" for name, count in self.thread_counts.most_common())
+        for title, counts in (("正在执行的函数（自身）:", self.self_counts), ("调用栈中的函数（累计）:", self.total_counts)):
+            lines.extend(["", title])
+            total = sum(self.thread_counts.values()) or 1
+            lines.extend(f"  {count:8d}  {count * 100 / total:5.1f}%  {location}"
+                         for location, count in counts.most_common(PROFILE_TOP))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,157 @@
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+from miner_events import format_hashrate
+
+# 可选的显示时长：(名称, 时长秒, 使用的算力历史分辨率秒)
+SPANS = (("1小时", 3600, 10), ("6小时", 6 * 3600, 60), ("24小时", 24 * 3600, 900))
+GAP_FACTOR = 3  # 相邻两点间隔超过这么多个分辨率时视为中断（挖矿停止），不连线
+PADDING = 4
+LINE_COLOR = "purple"
+LINE_TAG = "hashrate"
+
+
+class HashrateChart:
+    """右侧面板的实时算力曲线：有新数据时只平移已有线段并追加新线段，
+    纵轴范围变化时整体缩放，只有切换时长或窗口大小改变时才重画"""
+
+    def __init__(self, parent, history, height=90):
+        self.history = history
+        self.frame = ttk.Frame(parent)
+        self.span_index = tk.IntVar(value=0)
+        button_frame = ttk.Frame(self.frame)
+        button_frame.pack(fill=tk.X)
+        for index, (label, _, _) in enumerate(SPANS):
+            ttk.Radiobutton(button_frame, text=label, variable=self.span_index, value=index,
+                            command=self.redraw).pack(side=tk.LEFT)
+        self.canvas = tk.Canvas(self.frame, height=height, bg="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.X, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.scale_label = self.canvas.create_text(PADDING, PADDING, anchor=tk.NW, fill="gray", font=('SimHei', 8))
+        self.segments = deque()  # 已画出的线段 (结束时间, 结束点算力, 画布项目)
+        self.last_point = None  # 最后一个已画出的点 (时间, 算力)
+        self.latest_time = None  # 曲线右端对应的时间
+        self.y_max = None
+        self.drawn_version = None
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    @property
+    def span(self):
+        return SPANS[self.span_index.get()][1]
+
+    @property
+    def resolution(self):
+        return SPANS[self.span_index.get()][2]
+
+    def _size(self):
+        width = max(self.canvas.winfo_width(), 10)
+        height = max(self.canvas.winfo_height(), 10)
+        return width, height
+
+    def _x(self, time_point):
+        width, _ = self._size()
+        plot_width = width - 2 * PADDING
+        return width - PADDING - (self.latest_time - time_point) * plot_width / self.span
+
+    def _y(self, value):
+        _, height = self._size()
+        return height - PADDING - value * (height - 2 * PADDING) / self.y_max
+
+    def _bottom(self):
+        return self._size()[1] - PADDING
+
+    @staticmethod
+    def _nice_max(value):
+        """纵轴上限取略大于最大值的整齐数值"""
+        value = max(value, 1e-9) * 1.2
+        magnitude = 10 ** len(str(int(value))) / 10 if value >= 1 else 1
+        for step in (1, 2, 2.5, 5, 10):
+            if value <= step * magnitude:
+                return step * magnitude
+        return value
+
+    def _set_y_max(self, y_max):
+        if self.y_max is not None and y_max != self.y_max:
+            # 以底边为基准整体缩放已画出的线段
+            self.canvas.scale(LINE_TAG, 0, self._bottom(), 1, self.y_max / y_max)
+        self.y_max = y_max
+        self.canvas.itemconfigure(self.scale_label, text=f"{format_hashrate(y_max)}  ({SPANS[self.span_index.get()][0]})")
+
+    def _rescale(self, new_values):
+        """新数据超出纵轴或曲线明显变低时调整纵轴范围"""
+        values = [value for _, value, _ in self.segments] + list(new_values)
+        if self.last_point is not None:
+            values.append(self.last_point[1])
+        if not values:
+            return
+        visible_max = max(values)
+        if visible_max > self.y_max or visible_max < self.y_max * 0.4:
+            self._set_y_max(self._nice_max(visible_max))
+
+    def _append(self, point):
+        """在最后一个点之后追加一个点"""
+        if self.last_point is not None and point[0] - self.last_point[0] <= self.resolution * GAP_FACTOR:
+            item = self.canvas.create_line(self._x(self.last_point[0]), self._y(self.last_point[1]),
+                                           self._x(point[0]), self._y(point[1]), fill=LINE_COLOR, width=1.5,
+                                           tags=LINE_TAG)
+            self.segments.append((point[0], point[1], item))
+        self.last_point = point
+
+    def redraw(self):
+        """按当前时长完整重画"""
+        self.canvas.delete(LINE_TAG)
+        self.segments.clear()
+        self.last_point = None
+        self.drawn_version = self.history.version
+        latest = self.history.latest()
+        if latest is None:
+            self.y_max = None
+            self.canvas.itemconfigure(self.scale_label, text="暂无算力数据")
+            return
+        self.latest_time = latest[0]
+        points = self.history.series(self.resolution, self.latest_time - self.span)
+        self.y_max = None
+        self._set_y_max(self._nice_max(max(value for _, value in points) if points else latest[1]))
+        for point in points:
+            self._append(point)
+
+    def update(self):
+        """有新的算力数据时增量更新（在主线程中定期调用）"""
+        version = self.history.version
+        if version == self.drawn_version:
+            return
+        if self.last_point is None:
+            self.redraw()
+            return
+        self.drawn_version = version
+        points = self.history.series(self.resolution, self.last_point[0])
+        revised = None
+        if points and points[0][0] == self.last_point[0]:
+            # 最后一个时间段又有了新样本，平均值变化：只修改最后一条线段的终点
+            revised, points = points[0], points[1:]
+            if revised[1] != self.last_point[1] and self.segments and self.segments[-1][0] == revised[0]:
+                end_time, _, item = self.segments[-1]
+                coords = self.canvas.coords(item)
+                self.canvas.coords(item, coords[0], coords[1], coords[2], self._y(revised[1]))
+                self.segments[-1] = (end_time, revised[1], item)
+            self.last_point = revised
+        if not points:
+            self._rescale([revised[1]] if revised else [])
+            return
+
+        # 整条曲线左移，新的点画在右端
+        new_latest = points[-1][0]
+        width, _ = self._size()
+        self.canvas.move(LINE_TAG, -(new_latest - self.latest_time) * (width - 2 * PADDING) / self.span, 0)
+        self.latest_time = new_latest
+
+        # 移出显示范围的线段删除
+        while self.segments and self.segments[0][0] < self.latest_time - self.span:
+            self.canvas.delete(self.segments.popleft()[2])
+
+        self._rescale([value for _, value in points])
+        for point in points:
+            self._append(point)
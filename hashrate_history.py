@@ -0,0 +1,128 @@
+import threading
+from array import array
+
+from miner_events import HashrateEvent
+
+# 各分辨率（秒）及保留的时长（秒）：原始10秒、1分钟和15分钟平均，都保留24小时
+TIERS = ((10, 24 * 3600), (60, 24 * 3600), (900, 24 * 3600))
+
+
+class _Tier:
+    """一个分辨率的定长环形缓冲：同一时间段内的样本取平均，占满后覆盖最早的数据"""
+
+    def __init__(self, resolution, span):
+        self.resolution = resolution
+        self.capacity = max(1, int(span // resolution))
+        self.times = array('d', bytes(8 * self.capacity))
+        self.values = array('d', bytes(8 * self.capacity))
+        self.start = 0
+        self.count = 0
+        self._bucket = None
+        self._sum = 0.0
+        self._samples = 0
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.resolution)
+        if bucket == self._bucket:
+            # 仍在当前时间段内：更新最后一个点的平均值
+            self._sum += value
+            self._samples += 1
+            self.values[(self.start + self.count - 1) % self.capacity] = self._sum / self._samples
+            return
+        if self._bucket is not None and bucket < self._bucket:
+            return  # 时间倒退的样本（例如系统时间被调整）直接忽略
+        self._bucket = bucket
+        self._sum = value
+        self._samples = 1
+        if self.count < self.capacity:
+            index = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[index] = bucket * self.resolution
+        self.values[index] = value
+
+    def _time_at(self, position):
+        return self.times[(self.start + position) % self.capacity]
+
+    def series(self, since=None):
+        """返回时间不早于 since 的 (时间, 平均算力) 列表，按时间顺序"""
+        first = 0
+        if since is not None:
+            # 时间单调递增，二分查找起点
+            low, high = 0, self.count
+            while low < high:
+                middle = (low + high) // 2
+                if self._time_at(middle) < since:
+                    low = middle + 1
+                else:
+                    high = middle
+            first = low
+        times, values, start, capacity = self.times, self.values, self.start, self.capacity
+        return [(times[(start + i) % capacity], values[(start + i) % capacity]) for i in range(first, self.count)]
+
+
+class HashrateHistory:
+    """挖矿程序报告的算力历史：按多个分辨率降采样保存在定长数组中，内存占用固定（约160 KB）。
+    读取线程写入，界面等其他组件可随时查询曲线数据和平均值"""
+
+    def __init__(self, tiers=TIERS):
+        self._tiers = [_Tier(resolution, span) for resolution, span in tiers]
+        self._lock = threading.Lock()
+        self.version = 0  # 每添加一个样本加1，用于判断是否有新数据
+
+    @property
+    def resolutions(self):
+        return [tier.resolution for tier in self._tiers]
+
+    def _tier(self, resolution):
+        for tier in self._tiers:
+            if tier.resolution == resolution:
+                return tier
+        raise ValueError(f"没有 {resolution} 秒分辨率的算力历史")
+
+    def add(self, timestamp, hashrate):
+        with self._lock:
+            for tier in self._tiers:
+                tier.add(timestamp, hashrate)
+            self.version += 1
+
+    def attach(self, pipeline):
+        """记录一次挖矿会话的算力；多实例时记录各实例之和（统计先于本订阅更新）"""
+        def on_event(event):
+            if pipeline.stats.hashrate is not None:
+                self.add(event.timestamp, pipeline.stats.hashrate)
+
+        for parser in pipeline.parsers.values():
+            parser.subscribe(on_event, (HashrateEvent,))
+        return self
+
+    def series(self, resolution, since=None):
+        with self._lock:
+            return self._tier(resolution).series(since)
+
+    def latest(self):
+        """最近一个 (时间, 算力)，没有数据时返回None"""
+        with self._lock:
+            tier = self._tiers[0]
+            if not tier.count:
+                return None
+            index = (tier.start + tier.count - 1) % tier.capacity
+            return tier.times[index], tier.values[index]
+
+    def average(self, seconds, now=None):
+        """最近 seconds 秒的平均算力（默认截止到最新的样本），没有数据时返回None。
+        使用能让窗口内至少有20个点的最粗分辨率，查询24小时平均也只需遍历不到100个点"""
+        latest = self.latest()
+        if latest is None:
+            return None
+        now = latest[0] if now is None else now
+        usable = [tier for tier in self._tiers if tier.resolution * 20 <= seconds] or self._tiers[:1]
+        tier = max(usable, key=lambda item: item.resolution)
+        with self._lock:
+            points = tier.series(now - seconds)
+        values = [value for time_point, value in points if time_point <= now]
+        if not values:
+            return None
+        return sum(values) / len(values)
@@ -0,0 +1,212 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+import cpu_topology
+import hashrate_history
+import hugepages
+import miner_config
+import multi_instance
+import pool_probe
+import pool_selector
+import stratum_monitor
+from miner_events import format_hashrate
+from miner_supervisor import MinerGroup
+from mining_session import MiningOutputPipeline, LOG_FILE_PATH
+from session_state import SessionStateMachine, IDLE, STARTING, MINING, STOPPING
+
+
+class HeadlessMiner:
+    """无界面挖矿：不依赖Tkinter，读取config.json、检测矿池、启动SRBMiner，
+    日志输出到标准输出（在systemd下由journald收集）"""
+
+    def __init__(self, config_path=miner_config.CONFIG_PATH, log_file_path=LOG_FILE_PATH,
+                 stats_interval=60, skip_probe=False, reserve_hugepages=None, miner_path=None):
+        self.config_path = config_path
+        self.log_file_path = log_file_path
+        self.stats_interval = stats_interval
+        self.skip_probe = skip_probe
+        self.reserve_hugepages = reserve_hugepages  # None表示使用配置中的 hugepages_reserve
+        self.miner_path = miner_path  # None表示使用配置中的 miner_path
+        # journald会自己记录时间，直接运行在终端时才加时间戳
+        self.timestamps = 'JOURNAL_STREAM' not in os.environ
+        self.supervisor = MinerGroup()
+        self.session_state = SessionStateMachine()
+        self.pipeline = None
+        self.hashrate_history = hashrate_history.HashrateHistory()  # 最近24小时的算力（跨会话保留）
+        self._done = threading.Event()
+        self._restart = False  # 停止后是否重新启动挖矿程序（切换矿池或挖矿连接卡住）
+        self._restart_lock = threading.Lock()  # 停止信号和自动重启请求互斥，停止信号优先
+        self._output_lock = threading.Lock()
+        self.returncode = 0
+
+    def log(self, message):
+        """输出一条日志到标准输出（线程安全）"""
+        if self.timestamps:
+            message = f"[{time.strftime('%H:%M:%S')}] {message}"
+        with self._output_lock:
+            sys.stdout.write(message + "\n")
+            sys.stdout.flush()
+
+    def request_stop(self, signum=None, frame=None):
+        """收到 SIGINT/SIGTERM 时停止挖矿"""
+        if signum is not None:
+            self.log(f"📴 收到信号 {signum}，正在停止挖矿进程...")
+        with self._restart_lock:
+            self._restart = False
+            self._done.set()
+
+    def run(self):
+        """运行挖矿会话，直到收到停止信号或挖矿进程退出；返回进程退出码"""
+        config = miner_config.load_config(self.config_path, log=self.log)
+        if self.miner_path:
+            config['miner_path'] = self.miner_path
+        settings = miner_config.settings_from_config(config)
+        error = miner_config.validate_settings(settings)
+        if error:
+            self.log(f"❌ 配置错误: {error}")
+            return 2
+        topology = cpu_topology.read_topology()
+        warning = cpu_topology.check_threads(int(settings['cpu_threads']), topology)
+        if warning:
+            self.log(f"⚠️ {warning}")
+
+        # 配置了备用矿池时按延迟和可靠性排序，挖矿期间持续检测
+        pools = miner_config.pool_list(settings, config, log=self.log)
+        selector = pool_selector.create_selector(pools, config, log=self.log) if len(pools) > 1 else None
+
+        session = self.session_state.begin()
+        if not self.skip_probe:
+            self.log("🔍 开始启动前网络检测...")
+            if selector is not None:
+                is_reachable = selector.rank()
+            else:
+                is_reachable, test_results = pool_probe.test_pool_connectivity(settings['pool_address'], log=self.log)
+            if not is_reachable:
+                self.log("❌ 矿池网络不可达，无法开始挖矿，请检查VPN和防火墙设置")
+                self.session_state.transition(IDLE, session, detail="矿池连接失败")
+                return 1
+            self.log("✅ 矿池网络可达，开始启动挖矿程序...")
+
+        while True:
+            if selector is not None:
+                settings = dict(settings, pools=list(selector.order))
+            returncode = self._mine(session, config, settings, topology, selector)
+            if not self._restart:
+                break
+            # 当前矿池变差（按新的矿池顺序）或挖矿连接卡住，重新启动挖矿程序
+            self._restart = False
+            self._done.clear()
+            session = self.session_state.begin()
+        self.supervisor.shutdown()
+        return returncode
+
+    def _mine(self, session, config, settings, topology, selector=None):
+        """启动挖矿进程并等待到停止；返回进程退出码"""
+        instances = multi_instance.build_instances(config, settings, topology, log=self.log)
+        reserve = config.get('hugepages_reserve') if self.reserve_hugepages is None else self.reserve_hugepages
+        hugepages.preflight(int(settings['cpu_threads']), len(instances), reserve=bool(reserve), log=self.log)
+        if self._done.is_set() or not self.session_state.transition(STARTING, session):
+            self.log("挖矿已在启动前被停止")
+            return 0
+        for name, cmd, _ in instances:
+            self.log(f"开始挖矿{f' [{name}]' if name else ''}: {' '.join(cmd)}")
+
+        self.pipeline = MiningOutputPipeline(config, display=self.log, log=self.log,
+                                             log_file_path=self.log_file_path,
+                                             names=[name for name, _, _ in instances])
+        self.hashrate_history.attach(self.pipeline)
+        self.pipeline.open()
+        try:
+            pids = self.supervisor.start(
+                instances,
+                on_lines=self.pipeline.handle_instance_lines,
+                on_exit=self._on_process_exit,
+                on_instance_exit=self.pipeline.instance_exited
+            ).result()
+        except Exception as e:
+            self.log(f"❌ 启动挖矿进程失败: {str(e)}")
+            self.pipeline.close(self.supervisor.stats())
+            self.session_state.transition(IDLE, session)
+            return 1
+        self.log(f"挖矿进程已启动，PID: {', '.join(str(pid) for pid in pids)}")
+        self.session_state.transition(MINING, session)
+        if selector is not None:
+            selector.start(lambda order: self._on_pools_degraded(session, order))
+        monitor = stratum_monitor.create_monitor(self.pipeline, settings, config, log=self.log,
+                                                 on_stuck=lambda name: self._on_connection_stuck(session, name))
+
+        # 主线程只等待停止信号，定期输出统计摘要
+        while not self._done.wait(self.stats_interval):
+            summary = self.pipeline.stats.summary()
+            average = self.hashrate_history.average(3600)
+            if average is not None:
+                summary = f"{summary} | 1小时平均 {format_hashrate(average)}"
+            if monitor is not None:
+                summary = f"{summary} | {monitor.summary()}"
+            self.log(f"📊 {summary}")
+
+        if selector is not None:
+            selector.stop()
+        if monitor is not None:
+            monitor.stop()
+        if self.session_state.transition(STOPPING, session):
+            stop_result = self.supervisor.stop().result()
+            self.log(f"挖矿进程已停止 ({stop_result})")
+            self.session_state.transition(IDLE, session)
+        return self.returncode
+
+    def _request_restart(self, session):
+        """会话仍在挖矿且没有收到停止信号时才自动重启（过期的回调直接丢弃），返回是否接受"""
+        with self._restart_lock:
+            if (self._done.is_set() or self.session_state.session != session
+                    or self.session_state.state != MINING):
+                return False
+            self._restart = True
+            self._done.set()
+            return True
+
+    def _on_pools_degraded(self, session, order):
+        """当前矿池变差（在矿池检测线程中执行）：停止挖矿进程后按新的顺序重启"""
+        self._request_restart(session)
+
+    def _on_connection_stuck(self, session, name):
+        """矿池监测发现挖矿连接卡住（在监测线程中执行）：重启挖矿程序"""
+        if self._request_restart(session):
+            self.log("🔄 重新启动挖矿程序以恢复矿池连接")
+
+    def _on_process_exit(self, returncode, stop_requested):
+        """挖矿进程退出（在监督线程中执行）"""
+        self.pipeline.close(self.supervisor.stats())
+        self.log(f"挖矿进程结束，退出代码: {returncode}")
+        if not stop_requested:
+            # 意外退出时以挖矿进程的退出码结束，交给systemd等进程管理器决定是否重启
+            self.returncode = returncode or 1
+            self._restart = False
+            self.session_state.transition(IDLE, detail="挖矿意外停止")
+            self._done.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scash Miner 无界面模式")
+    parser.add_argument('--config', default=miner_config.CONFIG_PATH, help="配置文件路径")
+    parser.add_argument('--log-file', default=LOG_FILE_PATH, help="挖矿日志文件路径")
+    parser.add_argument('--stats-interval', type=float, default=60, help="输出统计摘要的间隔（秒）")
+    parser.add_argument('--skip-probe', action='store_true', help="跳过启动前的矿池网络检测")
+    parser.add_argument('--reserve-hugepages', action='store_true', default=None,
+                        help="大页不足时自动预留（需要root权限）")
+    parser.add_argument('--miner', help="挖矿程序路径（默认使用配置中的 miner_path，可指定 tools/fake_miner.py 测试）")
+    args = parser.parse_args(argv)
+
+    miner = HeadlessMiner(args.config, args.log_file, args.stats_interval, args.skip_probe,
+                          args.reserve_hugepages, args.miner)
+    signal.signal(signal.SIGINT, miner.request_stop)
+    signal.signal(signal.SIGTERM, miner.request_stop)
+    return miner.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+import cpu_topology
+import hugepages
+
+# 检查结果的状态
+OK = 'ok'
+WARN = 'warn'
+INFO = 'info'
+
+
+class Finding:
+    """一项主机检查结果；impact_pct 为估计的算力损失百分比"""
+    __slots__ = ('check', 'status', 'message', 'impact_pct', 'fix')
+
+    def __init__(self, check, status, message, impact_pct=0, fix=None):
+        self.check = check
+        self.status = status
+        self.message = message
+        self.impact_pct = impact_pct
+        self.fix = fix
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _selected(text):
+    """解析 "always [madvise] never" 这种格式中被选中的值"""
+    if not text:
+        return None
+    for word in text.split():
+        if word.startswith('[') and word.endswith(']'):
+            return word[1:-1]
+    return text.split()[0]
+
+
+def cpu_vendor(proc_root=hugepages.PROC_ROOT):
+    """从 /proc/cpuinfo 读取CPU厂商（AuthenticAMD / GenuineIntel）"""
+    cpuinfo = _read(os.path.join(proc_root, "cpuinfo")) or ""
+    for line in cpuinfo.splitlines():
+        if line.startswith("vendor_id"):
+            return line.split(':', 1)[1].strip()
+    return None
+
+
+def check_governor(sysfs_root):
+    pattern = os.path.join(sysfs_root, "devices", "system", "cpu", "cpu[0-9]*", "cpufreq", "scaling_governor")
+    governors = {}
+    for path in glob.glob(pattern):
+        governor = _read(path)
+        if governor:
+            governors[governor] = governors.get(governor, 0) + 1
+    if not governors:
+        return Finding('governor', INFO, "未找到CPU调频信息（虚拟机或未加载cpufreq驱动）")
+    if set(governors) == {'performance'}:
+        return Finding('governor', OK, "CPU调频策略为 performance")
+    summary = ", ".join(f"{name} x{count}" for name, count in sorted(governors.items()))
+    return Finding('governor', WARN, f"CPU调频策略为 {summary}，挖矿时频率可能上不去", 5,
+                   "sudo cpupower frequency-set -g performance")
+
+
+def check_thp(sysfs_root, hugepage_ok):
+    mode = _selected(_read(os.path.join(sysfs_root, "kernel", "mm", "transparent_hugepage", "enabled")))
+    if mode is None:
+        return Finding('thp', INFO, "未找到透明大页(THP)设置")
+    if hugepage_ok:
+        return Finding('thp', OK, f"透明大页模式为 {mode}（已预留足够的大页，不依赖THP）")
+    if mode == 'never':
+        return Finding('thp', WARN, "透明大页已关闭且预留的大页不足，RandomX只能使用普通内存页", 10,
+                       "echo madvise | sudo tee /sys/kernel/mm/transparent_hugepage/enabled")
+    return Finding('thp', INFO, f"透明大页模式为 {mode}，预留大页不足时可部分弥补")
+
+
+def check_hugepages(proc_root, sysfs_root, threads, instances):
+    status = hugepages.read_status(proc_root, sysfs_root)
+    if status is None:
+        return Finding('hugepages', INFO, "无法读取大页信息"), None
+    needed = hugepages.required_pages(threads, instances, status.page_kb)
+    shortfall = status.shortfall(threads, instances)
+    if not shortfall:
+        return Finding('hugepages', OK, f"大页{status.describe()}，满足 {threads} 线程所需的 {needed} 页"), True
+    # 没有大页时RandomX算力大约下降三到五成
+    impact = 40 if shortfall >= needed else round(40 * shortfall / needed)
+    return Finding('hugepages', WARN, f"大页{status.describe()}，{threads} 线程需要 {needed} 页", impact,
+                   f"sudo sysctl -w vm.nr_hugepages={status.total + shortfall}"), False
+
+
+def check_smt(sysfs_root, topology, threads):
+    control = _read(os.path.join(sysfs_root, "devices", "system", "cpu", "smt", "control"))
+    if topology is None:
+        return Finding('smt', INFO, f"SMT状态: {control or '未知'}")
+    recommended = topology.recommended_threads()
+    if topology.smt and threads > topology.physical_cores and threads > recommended:
+        return Finding('smt', WARN,
+                       f"线程数 {threads} 超过物理核心数 {topology.physical_cores}，且超过L3缓存可容纳的 {recommended} 个线程，"
+                       f"超线程会争抢L3缓存", 5, f"把 cpu_threads 设为 {recommended}")
+    state = "开启" if topology.smt else "关闭"
+    return Finding('smt', OK, f"SMT/超线程{state}（{topology.describe()}），线程数 {threads} 合理")
+
+
+def check_msr(proc_root, sysfs_root):
+    vendor = cpu_vendor(proc_root)
+    msr_loaded = os.path.isdir(os.path.join(sysfs_root, "module", "msr"))
+    # RandomX的MSR优化（关闭硬件预取）在Zen架构上收益最明显
+    impact = 10 if vendor == 'AuthenticAMD' else 5
+    if not msr_loaded:
+        return Finding('msr', WARN, "msr 内核模块未加载，挖矿程序无法应用RandomX的MSR预取优化", impact,
+                       "sudo modprobe msr，并以root权限运行挖矿程序")
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        return Finding('msr', WARN, "msr 模块已加载，但当前不是root用户，挖矿程序无法写MSR寄存器", impact,
+                       "以root权限运行挖矿程序")
+    return Finding('msr', OK, "msr 模块已加载且有root权限，挖矿程序可以应用MSR优化")
+
+
+def environment_info():
+    """运行环境信息（启动时打印的调试信息）"""
+    return {
+        'python': platform.python_version(),
+        'os': f"{platform.system()} {platform.release()} {platform.architecture()}",
+        'cwd': os.getcwd(),
+        'executable': sys.executable,
+        'frozen': hasattr(sys, 'frozen'),
+        'meipass': getattr(sys, '_MEIPASS', None),
+    }
+
+
+def print_environment_info(info=None):
+    """打印运行环境信息"""
+    info = info or environment_info()
+    print(f"Python版本: {info['python']}")
+    print(f"操作系统: {info['os']}")
+    print(f"当前工作目录: {info['cwd']}")
+    print(f"Python解释器路径: {info['executable']}")
+    print(f"是否打包: {'是' if info['frozen'] else '否'}")
+    if info['meipass']:
+        print(f"MEIPASS路径: {info['meipass']}")
+
+
+def diagnose(threads=None, instances=1, sysfs_root=cpu_topology.SYSFS_ROOT, proc_root=hugepages.PROC_ROOT):
+    """检查主机的RandomX相关设置，返回可以直接导出为JSON的报告"""
+    topology = cpu_topology.read_topology(sysfs_root)
+    if threads is None:
+        threads = topology.recommended_threads() if topology is not None else max(1, (os.cpu_count() or 2) - 1)
+    findings = []
+    if platform.system() == 'Linux' or sysfs_root != cpu_topology.SYSFS_ROOT:
+        hugepage_finding, hugepage_ok = check_hugepages(proc_root, sysfs_root, threads, instances)
+        findings = [
+            check_governor(sysfs_root),
+            hugepage_finding,
+            check_thp(sysfs_root, hugepage_ok),
+            check_smt(sysfs_root, topology, threads),
+            check_msr(proc_root, sysfs_root),
+        ]
+    else:
+        findings.append(Finding('platform', INFO, "主机调优检查仅支持Linux"))
+
+    # 各项损失按乘法叠加，得分即估计能发挥出的算力百分比
+    remaining = 1.0
+    for finding in findings:
+        remaining *= 1 - finding.impact_pct / 100
+    return {
+        'host': socket.gethostname(),
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment_info(),
+        'cpu': {
+            'vendor': cpu_vendor(proc_root),
+            'topology': topology.describe() if topology is not None else None,
+            'recommended_threads': topology.recommended_threads() if topology is not None else None,
+        },
+        'threads': threads,
+        'instances': instances,
+        'score': round(remaining * 100),
+        'expected_loss_pct': round((1 - remaining) * 100, 1),
+        'findings': [finding.to_dict() for finding in findings],
+    }
+
+
+def format_report(report):
+    """把诊断报告格式化为文本"""
+    icons = {OK: "✅", WARN: "⚠️", INFO: "ℹ️"}
+    lines = [
+        f"🖥 主机: {report['host']}    时间: {report['generated_at']}",
+        f"🧩 CPU: {report['cpu']['vendor'] or '未知'}  {report['cpu']['topology'] or ''}",
+        f"📈 得分: {report['score']}/100（估计算力损失 {report['expected_loss_pct']}%，按 {report['threads']} 线程计算）",
+        "",
+    ]
+    for finding in report['findings']:
+        impact = f"（约 -{finding['impact_pct']}%）" if finding['impact_pct'] else ""
+        lines.append(f"{icons.get(finding['status'], '')} [{finding['check']}] {finding['message']}{impact}")
+        if finding['fix'] and finding['status'] == WARN:
+            lines.append(f"    💡 {finding['fix']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RandomX主机调优诊断")
+    parser.add_argument('--threads', type=int, help="按该线程数检查（默认使用推荐线程数）")
+    parser.add_argument('--instances', type=int, default=1, help="挖矿进程数")
+    parser.add_argument('--json', dest='json_path', help="把报告写入JSON文件（- 表示标准输出）")
+    parser.add_argument('--sysfs-root', default=cpu_topology.SYSFS_ROOT)
+    parser.add_argument('--proc-root', default=hugepages.PROC_ROOT)
+    args = parser.parse_args(argv)
+
+    report = diagnose(args.threads, args.instances, args.sysfs_root, args.proc_root)
+    if args.json_path == '-':
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n报告已保存: {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
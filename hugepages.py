@@ -0,0 +1,163 @@
+import os
+
+PROC_ROOT = "/proc"
+SYSFS_ROOT = "/sys"
+
+# RandomX内存需求：数据集 2080MB + 缓存 256MB（每个挖矿进程一份），每个线程 2MB scratchpad
+RANDOMX_DATASET_BYTES = 2080 * 1024 * 1024
+RANDOMX_CACHE_BYTES = 256 * 1024 * 1024
+RANDOMX_SCRATCHPAD_BYTES = 2 * 1024 * 1024
+
+GIGANTIC_PAGE_KB = 1024 * 1024
+MINER_PROCESS_PREFIX = "srbminer"  # 挖矿进程名（/proc/<pid>/status 的 Name）的开头，不区分大小写
+
+
+def read_meminfo(proc_root=PROC_ROOT):
+    """读取 /proc/meminfo，返回 名称 -> 数值（kB单位的项已去掉单位）"""
+    values = {}
+    try:
+        with open(os.path.join(proc_root, "meminfo"), 'r') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                parts = rest.split()
+                if parts and parts[0].isdigit():
+                    values[name.strip()] = int(parts[0])
+    except OSError:
+        return None
+    return values
+
+
+def miner_held_pages(page_kb=2048, proc_root=PROC_ROOT, prefix=MINER_PROCESS_PREFIX):
+    """正在运行的挖矿进程已占用的大页数量（按 /proc/<pid>/status 中的 HugetlbPages 计算）。
+    挖矿时大页被挖矿程序占用，HugePages_Free 会变少，这部分仍然算作可用"""
+    held_kb = 0
+    try:
+        pids = [name for name in os.listdir(proc_root) if name.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            with open(os.path.join(proc_root, pid, "status"), 'r') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+        except (OSError, ValueError):
+            continue  # 进程已退出或没有权限
+        if not fields.get('Name', '').strip().lower().startswith(prefix):
+            continue
+        parts = fields.get('HugetlbPages', '').split()
+        if parts and parts[0].isdigit():
+            held_kb += int(parts[0])
+    return held_kb // page_kb
+
+
+def required_pages(threads, instances=1, page_kb=2048):
+    """按线程数和挖矿进程数计算需要的大页数量（默认2MB大页，约 1168 + 线程数）"""
+    page_bytes = page_kb * 1024
+    per_instance = -(-(RANDOMX_DATASET_BYTES + RANDOMX_CACHE_BYTES) // page_bytes)
+    scratchpads = -(-(threads * RANDOMX_SCRATCHPAD_BYTES) // page_bytes)
+    return per_instance * instances + scratchpads
+
+
+class HugePageStatus:
+    """大页可用情况"""
+
+    def __init__(self, total, free, page_kb, gigantic_supported, gigantic_total, held=0):
+        self.total = total
+        self.free = free
+        self.page_kb = page_kb
+        self.held = held  # 正在运行的挖矿进程占用的大页
+        self.gigantic_supported = gigantic_supported  # 内核是否提供1GB大页
+        self.gigantic_total = gigantic_total          # 已预留的1GB大页数量
+
+    def shortfall(self, threads, instances=1):
+        """还缺少的大页数量（挖矿进程正在占用的大页重启后可以再用，算作可用）"""
+        return max(0, required_pages(threads, instances, self.page_kb) - self.available)
+
+    @property
+    def available(self):
+        return min(self.total, self.free + self.held)
+
+    def describe(self):
+        """日志中使用的可用大页描述"""
+        if self.held:
+            return f"空闲 {self.free} 页 + 挖矿程序占用 {self.held} 页（共 {self.total} 页）"
+        return f"空闲 {self.free}/{self.total} 页"
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'free': self.free,
+            'held': self.held,
+            'page_kb': self.page_kb,
+            'gigantic_supported': self.gigantic_supported,
+            'gigantic_total': self.gigantic_total,
+        }
+
+
+def read_status(proc_root=PROC_ROOT, sysfs_root=SYSFS_ROOT):
+    """读取大页状态；不是Linux或读取失败时返回None"""
+    meminfo = read_meminfo(proc_root)
+    if not meminfo or 'HugePages_Total' not in meminfo:
+        return None
+    gigantic_dir = os.path.join(sysfs_root, "kernel", "mm", "hugepages", f"hugepages-{GIGANTIC_PAGE_KB}kB")
+    gigantic_total = 0
+    try:
+        with open(os.path.join(gigantic_dir, "nr_hugepages"), 'r') as f:
+            gigantic_total = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        pass
+    page_kb = meminfo.get('Hugepagesize', 2048)
+    return HugePageStatus(
+        total=meminfo.get('HugePages_Total', 0),
+        free=meminfo.get('HugePages_Free', 0),
+        page_kb=page_kb,
+        gigantic_supported=os.path.isdir(gigantic_dir),
+        gigantic_total=gigantic_total,
+        held=miner_held_pages(page_kb, proc_root),
+    )
+
+
+def reserve_pages(count, proc_root=PROC_ROOT):
+    """把预留的大页总数设为count（需要root权限），返回是否成功"""
+    try:
+        with open(os.path.join(proc_root, "sys", "vm", "nr_hugepages"), 'w') as f:
+            f.write(str(count))
+        return True
+    except OSError:
+        return False
+
+
+def preflight(threads, instances=1, reserve=False, log=print, proc_root=PROC_ROOT, sysfs_root=SYSFS_ROOT):
+    """启动前检查 --randomx-use-largepages 所需的大页是否足够，可选地自动预留；
+    返回是否足够（无法检查时返回None）"""
+    status = read_status(proc_root, sysfs_root)
+    if status is None:
+        log("ℹ️ 无法读取大页信息（仅支持Linux），跳过大页检查")
+        return None
+
+    needed = required_pages(threads, instances, status.page_kb)
+    log(f"🧠 大页: {status.describe()}（每页 {status.page_kb} kB），"
+        f"{instances} 个进程 {threads} 线程需要 {needed} 页")
+    if status.gigantic_supported:
+        log(f"ℹ️ 内核支持1GB大页（已预留 {status.gigantic_total} 页），可考虑使用 --randomx-use-1gb-pages")
+
+    shortfall = status.shortfall(threads, instances)
+    if not shortfall:
+        log("✅ 大页充足")
+        return True
+
+    target = status.total + shortfall
+    if reserve:
+        if hasattr(os, 'geteuid') and os.geteuid() != 0:
+            log("⚠️ 预留大页需要root权限")
+        elif reserve_pages(target, proc_root):
+            status = read_status(proc_root, sysfs_root)
+            if status is not None and not status.shortfall(threads, instances):
+                log(f"✅ 已预留大页，当前共 {status.total} 页")
+                return True
+            log("⚠️ 内存碎片过多，只预留到部分大页，建议重启后尽早预留")
+        else:
+            log("⚠️ 预留大页失败")
+
+    log(f"⚠️ 大页不足，还缺少 {shortfall} 页，挖矿程序会退回普通内存页，算力明显下降")
+    log(f"💡 可执行: sudo sysctl -w vm.nr_hugepages={target}（写入 /etc/sysctl.conf 可永久生效）")
+    return False
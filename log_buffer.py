@@ -0,0 +1,88 @@
+import re
+import threading
+from collections import deque
+
+# 溢出策略
+DROP_OLDEST = 'drop_oldest'  # 丢弃最早的消息，保留最新的日志
+DROP_NEWEST = 'drop_newest'  # 丢弃新到的消息，保留已排队的日志
+
+# 合并重复消息时忽略其中的数字（哈希率、延迟、份额计数等）
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+
+class LogBuffer:
+    """有界的日志环形队列：连续重复的消息合并为一条并计数，队列满时按策略丢弃"""
+
+    def __init__(self, maxlen=10000, overflow=DROP_OLDEST, coalesce=True):
+        self.maxlen = maxlen
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.configure(maxlen, overflow)
+        self._entries = deque()
+        self._lock = threading.Lock()
+        # 统计计数
+        self.appended = 0   # 收到的消息总数
+        self.dropped = 0    # 因队列已满丢弃的消息数
+        self.coalesced = 0  # 被合并到上一条的消息数
+        self.max_depth = 0  # 队列出现过的最大长度
+
+    def configure(self, maxlen=None, overflow=None):
+        """修改队列容量和溢出策略（已排队的消息保持不变）"""
+        if overflow is not None:
+            if overflow not in (DROP_OLDEST, DROP_NEWEST):
+                raise ValueError(f"未知的溢出策略: {overflow}")
+            self.overflow = overflow
+        if maxlen is not None:
+            if maxlen <= 0:
+                raise ValueError("日志队列容量必须大于0")
+            self.maxlen = maxlen
+
+    def append(self, message):
+        """添加一条消息，返回添加前队列是否为空"""
+        key = NUMBER_RE.sub('#', message) if self.coalesce else None
+        with self._lock:
+            self.appended += 1
+            entries = self._entries
+            was_empty = not entries
+
+            # 与队尾消息相同（忽略数字）时直接合并，保留最新的内容
+            if key is not None and entries and entries[-1][0] == key:
+                last = entries[-1]
+                last[1] = message
+                last[2] += 1
+                self.coalesced += 1
+                return was_empty
+
+            if len(entries) >= self.maxlen:
+                self.dropped += 1
+                if self.overflow == DROP_NEWEST:
+                    return was_empty
+                entries.popleft()
+
+            entries.append([key, message, 1])
+            if len(entries) > self.max_depth:
+                self.max_depth = len(entries)
+            return was_empty
+
+    def drain(self):
+        """取出队列中的全部消息，合并过的消息带有 (xN) 后缀"""
+        with self._lock:
+            entries = self._entries
+            self._entries = deque()
+        return [message if count == 1 else f"{message} (x{count})" for _, message, count in entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """返回队列统计数据"""
+        with self._lock:
+            return {
+                'depth': len(self._entries),
+                'max_depth': self.max_depth,
+                'maxlen': self.maxlen,
+                'overflow': self.overflow,
+                'appended': self.appended,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,174 @@
+import re
+
+# 日志行分类标志（可按位组合，一行可以同时属于多个类别）
+HASHRATE = 1 << 0          # 哈希率输出
+ACCEPTED = 1 << 1          # 份额被接受
+REJECTED = 1 << 2          # 份额被拒绝
+JOB = 1 << 3               # 收到新任务/难度设置
+ERROR = 1 << 4             # 一般错误
+CONNECTION_ERROR = 1 << 5  # 矿池连接错误
+DEVFEE = 1 << 6            # devfee相关错误（不影响挖矿）
+CONNECTED = 1 << 7         # 已连接
+DISCONNECTED = 1 << 8      # 连接断开
+INITIALIZED = 1 << 9       # 初始化完成
+MINING = 1 << 10           # 其他表示正在挖矿的输出
+IMPORTANT = 1 << 11        # 界面中需要突出显示的重要信息
+
+# 界面中红色警告显示
+WARNING_MASK = ERROR | REJECTED | DISCONNECTED
+# 界面中绿色成功显示
+SUCCESS_MASK = ACCEPTED | CONNECTED | INITIALIZED
+
+# 关键词与类别的对应关系（关键词均为小写）
+DEFAULT_KEYWORDS = {
+    # 哈希率
+    'hashrate': HASHRATE | IMPORTANT,
+    'hash rate': HASHRATE | IMPORTANT,
+    'h/s': HASHRATE,
+    '哈希率': HASHRATE,
+    # 份额
+    'accepted': ACCEPTED | IMPORTANT,
+    'rejected': REJECTED | IMPORTANT,
+    'shares': IMPORTANT,
+    'shares: ': MINING,
+    'cpu result': MINING | IMPORTANT,
+    # 任务与难度
+    'job received': JOB | IMPORTANT,
+    'new job': JOB,
+    'difficulty': IMPORTANT,
+    'difficulty set to': JOB,
+    '接受任务': JOB,
+    # 挖矿状态
+    'randomscash algorithm': MINING,
+    'mining started': MINING,
+    '开始挖矿': MINING,
+    'algorithm': IMPORTANT,
+    'pool': IMPORTANT,
+    'success': IMPORTANT,
+    'initialized': INITIALIZED,
+    'connected': CONNECTED | IMPORTANT,
+    'disconnected': DISCONNECTED | IMPORTANT,
+    # 错误
+    'error': ERROR | IMPORTANT,
+    'failed': ERROR | IMPORTANT,
+}
+
+# 矿池连接错误关键词
+CONNECTION_ERROR_KEYWORDS = [
+    'connection failed', 'connection refused', 'connection timeout',
+    'failed to connect', 'unable to connect', 'network unreachable',
+    'host unreachable', 'connection reset', 'socket error',
+    'getaddrinfo failed', 'name resolution failed', 'dns lookup failed',
+    'connection timed out', 'no route to host', 'network is unreachable',
+    'pool connection error', 'pool not reachable', 'connect error',
+    '连接失败', '连接被拒绝', '连接超时', '网络不可达',
+    'error: failed to', 'cannot connect to', 'connection lost'
+]
+
+# devfee相关错误关键词（特殊处理，绝不能导致挖矿退出）
+DEVFEE_ERROR_KEYWORDS = [
+    'couldn\'t get active devfee pools', 'devfee pool connection failed',
+    'devfee pool error', 'devfee network error', 'devfee pools - check your internet',
+    'devfee pools - check your firewall', 'couldn\'t get active devfee pools - check your internet/firewall!',
+    'devfee connection failed', 'devfee - check your internet', 'devfee - check your firewall',
+    'couldn\'t connect to devfee', 'devfee pools unreachable', 'devfee timeout'
+]
+
+
+def build_keyword_table():
+    """合并所有关键词，生成 关键词 -> 类别标志 的映射"""
+    table = dict(DEFAULT_KEYWORDS)
+    for keyword in CONNECTION_ERROR_KEYWORDS:
+        table[keyword] = table.get(keyword, 0) | CONNECTION_ERROR
+    for keyword in DEVFEE_ERROR_KEYWORDS:
+        table[keyword] = table.get(keyword, 0) | DEVFEE
+    return table
+
+
+def _trie_pattern(keywords):
+    """把关键词按公共前缀合并成一个正则（前缀树形式），每个位置最多尝试一条分支，
+    且同一前缀下优先匹配更长的关键词"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = []
+        end = "" in node
+        for char in sorted(k for k in node if k):
+            branches.append(re.escape(char) + build(node[char]))
+        if not branches:
+            return ""
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if end else body
+
+    return build(trie)
+
+
+class LogClassifier:
+    """预编译的多关键词匹配器，对每行日志只扫描一次即可得到所有类别"""
+
+    def __init__(self, keyword_table=None):
+        if keyword_table is None:
+            keyword_table = build_keyword_table()
+
+        # 较长的关键词包含较短的关键词时，继承其类别，
+        # 这样每个位置只需匹配最长的关键词，结果与逐个子串查找完全一致
+        self.flags_by_keyword = {}
+        for keyword in keyword_table:
+            flags = 0
+            for other, other_flags in keyword_table.items():
+                if other in keyword:
+                    flags |= other_flags
+            self.flags_by_keyword[keyword] = flags
+
+        # 匹配到某个关键词后，如果另一个关键词可能从它的中间开始（部分重叠），
+        # 记录需要回退到的偏移量，否则直接跳过整个关键词
+        self.resume_offset = {}
+        for keyword in keyword_table:
+            offset = len(keyword)
+            for i in range(1, len(keyword)):
+                suffix = keyword[i:]
+                if any(len(other) > len(suffix) and other.startswith(suffix) for other in keyword_table):
+                    offset = i
+                    break
+            self.resume_offset[keyword] = offset
+
+        self.pattern = re.compile(_trie_pattern(keyword_table))
+
+    def classify(self, line):
+        """返回一行（或一段）日志的类别标志"""
+        flags = 0
+        text = line.lower()
+        search = self.pattern.search
+        flags_by_keyword = self.flags_by_keyword
+        resume_offset = self.resume_offset
+        match = search(text)
+        while match:
+            keyword = match.group()
+            flags |= flags_by_keyword[keyword]
+            match = search(text, match.start() + resume_offset[keyword])
+        return flags
+
+
+def ui_tag(flags):
+    """根据类别标志返回日志文本框使用的颜色标签"""
+    if flags & WARNING_MASK:
+        return "warning"
+    if flags & SUCCESS_MASK:
+        return "success"
+    if flags & IMPORTANT:
+        return "important"
+    if flags & HASHRATE:
+        return "hashrate"
+    return None
+
+
+# 界面和连接监测共用的默认分类器
+default_classifier = LogClassifier()
+classify_line = default_classifier.classify
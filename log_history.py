@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+
+from log_writer import open_segment, rotated_segments
+
+
+class LogHistoryPager:
+    """从日志文件末尾向前分页读取历史日志，不需要把整个文件读入内存。
+    当前日志读完后接着读取轮转后的分段（从新到旧），压缩的分段先解压到临时文件再分页读取"""
+
+    def __init__(self, log_file_path, encoding='utf-8', block_size=64 * 1024):
+        self.log_file_path = log_file_path
+        self.encoding = encoding
+        self.block_size = block_size
+        # 还没有读取的较早分段，最后一个是最新的
+        self._segments = rotated_segments(log_file_path)
+        self.source = log_file_path  # 正在读取的文件
+        self._temp = None  # 压缩分段解压后的临时文件
+        # 尚未读取部分的结束位置（第一次读取时为文件末尾）
+        try:
+            self.offset = os.path.getsize(log_file_path)
+        except OSError:
+            self.offset = 0
+
+    @property
+    def has_more(self):
+        return self.offset > 0 or bool(self._segments)
+
+    def close(self):
+        if self._temp is not None:
+            self._temp.close()
+            self._temp = None
+
+    def read_previous(self, line_count):
+        """返回当前位置之前的最多 line_count 行（按时间顺序），并把位置前移；
+        当前文件不够一页时从更早的分段补足"""
+        lines = []
+        while len(lines) < line_count and (self.offset > 0 or self._next_segment()):
+            lines = self._read_source(line_count - len(lines)) + lines
+        return lines
+
+    def _next_segment(self):
+        """切换到下一个较早的分段，没有更多分段时返回False"""
+        self.close()
+        while self._segments:
+            path = self._segments.pop()
+            if not os.path.exists(path):
+                # 列出分段之后刚被后台压缩
+                path = next((path + suffix for suffix in ('.gz', '.zst') if os.path.exists(path + suffix)), path)
+            try:
+                if path.endswith(('.gz', '.zst')):
+                    temp = tempfile.TemporaryFile()
+                    with open_segment(path) as source:
+                        shutil.copyfileobj(source, temp, 1024 * 1024)
+                    self._temp = temp
+                    self.offset = temp.tell()
+                else:
+                    self.offset = os.path.getsize(path)
+            except (OSError, EOFError, RuntimeError):
+                # 分段已被删除、正在压缩或无法解压时跳过
+                self.close()
+                continue
+            self.source = path
+            if self.offset > 0:
+                return True
+        self.offset = 0
+        return False
+
+    def _read_source(self, line_count):
+        if self.offset <= 0 or line_count <= 0:
+            return []
+
+        chunks = []
+        newline_count = 0
+        position = self.offset
+        try:
+            f = self._temp if self._temp is not None else open(self.source, 'rb')
+            try:
+                # 向前按块读取，直到凑够所需的行数或到达文件开头
+                while position > 0 and newline_count <= line_count:
+                    read_size = min(self.block_size, position)
+                    position -= read_size
+                    f.seek(position)
+                    chunk = f.read(read_size)
+                    chunks.append(chunk)
+                    newline_count += chunk.count(b"\n")
+            finally:
+                if f is not self._temp:
+                    f.close()
+        except OSError:
+            self.offset = 0
+            return []
+
+        data = b"".join(reversed(chunks))
+        lines = data.split(b"\n")
+        if data.endswith(b"\n"):
+            lines.pop()
+
+        if len(lines) > line_count:
+            # 最前面的行可能不完整或超出本页，只保留最后 line_count 行，其余留给下一页
+            kept = lines[-line_count:]
+            consumed = sum(len(line) + 1 for line in kept)
+            if not data.endswith(b"\n"):
+                consumed -= 1
+            self.offset = position + len(data) - consumed
+            lines = kept
+        else:
+            self.offset = position
+
+        return [line.decode(self.encoding, errors='replace').rstrip("\r") for line in lines]
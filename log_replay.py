@@ -0,0 +1,328 @@
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import miner_config
+from log_writer import open_segment
+from mining_session import MiningOutputPipeline, LOG_FILE_PATH
+
+SESSION_START_RE = re.compile(r'^=== 挖矿会话开始于 (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ===$')
+SESSION_END_RE = re.compile(r'^=== 挖矿会话结束于 (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ===$')
+LINE_RE = re.compile(r'^\[(\d{2}):(\d{2}):(\d{2})\] ?(.*)$')
+INSTANCE_RE = re.compile(r'^\[([ns]\d+)\] (.*)$')  # 多实例时日志行带有实例名（见 multi_instance）
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+BATCH_LINES = 256  # 同一秒内的输出最多合并成这么多行一批，与读取线程的批量处理相近
+STAGES = ('display', 'classify', 'parse', 'dispatch', 'write')
+STAGE_NAMES = {
+    'display': "显示",
+    'classify': "分类",
+    'parse': "解析",
+    'dispatch': "事件分发(统计/监测)",
+    'write': "写日志",
+}
+
+
+class ReplaySession:
+    """日志文件中的一次挖矿会话：开始时间和按时间顺序的 (时间戳, 实例名, 行)"""
+
+    def __init__(self, index, started_at):
+        self.index = index
+        self.started_at = started_at
+        self.ended_at = None
+        self.records = []
+
+    @property
+    def names(self):
+        names = sorted({name for _, name, _ in self.records if name is not None})
+        return names or [None]
+
+    @property
+    def span(self):
+        """日志记录覆盖的时长（秒）"""
+        if not self.records:
+            return 0.0
+        return self.records[-1][0] - self.records[0][0]
+
+
+def open_log(path):
+    """打开挖矿日志，支持轮转后压缩的 .gz / .zst 文件"""
+    return io.TextIOWrapper(open_segment(path), encoding='utf-8', errors='replace')
+
+
+def read_sessions(path):
+    """按会话标记把日志文件拆分为会话；日志只记录了时分秒，日期取自会话开始标记，跨过午夜时顺延一天"""
+    sessions = []
+    session = None
+    last_time = None
+    with open_log(path) as f:
+        for raw in f:
+            line = raw.rstrip('\r\n')
+            if not line.strip():
+                continue
+            match = SESSION_START_RE.match(line)
+            if match:
+                started_at = datetime.strptime(match.group(1), TIME_FORMAT)
+                session = ReplaySession(len(sessions), started_at)
+                sessions.append(session)
+                last_time = started_at
+                continue
+            match = SESSION_END_RE.match(line)
+            if match:
+                if session is not None:
+                    session.ended_at = datetime.strptime(match.group(1), TIME_FORMAT)
+                continue
+            match = LINE_RE.match(line)
+            if not match:
+                continue
+            if session is None:
+                # 文件开头没有会话标记（例如轮转后的日志），日期按文件修改时间推算
+                started_at = datetime.fromtimestamp(os.path.getmtime(path)).replace(
+                    hour=int(match.group(1)), minute=int(match.group(2)), second=int(match.group(3)))
+                session = ReplaySession(len(sessions), started_at)
+                sessions.append(session)
+                last_time = started_at
+            moment = last_time.replace(hour=int(match.group(1)), minute=int(match.group(2)),
+                                       second=int(match.group(3)))
+            if moment < last_time:
+                moment += timedelta(days=1)
+            last_time = moment
+            text = match.group(4)
+            instance = INSTANCE_RE.match(text)
+            name = None
+            if instance:
+                name, text = instance.group(1), instance.group(2)
+            session.records.append((moment.timestamp(), name, text))
+    return sessions
+
+
+class StageTimer:
+    """累计流水线各阶段的耗时"""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.lines = 0
+
+    def wrap(self, stage, func):
+        totals = self.totals
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                totals[stage] += perf_counter() - started
+        return timed
+
+    def to_dict(self):
+        total = sum(self.totals.values())
+        return {
+            stage: {
+                'total_ms': round(seconds * 1000, 3),
+                'per_line_us': round(seconds * 1e6 / self.lines, 3) if self.lines else None,
+                'share': round(seconds / total, 4) if total else None,
+            }
+            for stage, seconds in self.totals.items()
+        }
+
+
+class LogReplayer:
+    """把已有的挖矿日志按原来的时间间隔（可加速）重新送入挖矿输出流水线，
+    与真实挖矿使用同一个 MiningOutputPipeline：显示、分类、解析、统计和监测、写日志，并统计各阶段耗时"""
+
+    def __init__(self, config, display=print, log=print, speed=None, output_path=None, on_session=None):
+        self.config = config
+        self.display = display
+        self.log = log
+        self.speed = speed  # 回放倍速；None或0表示不等待，尽可能快
+        self.output_path = output_path  # 回放时写入的日志文件，None时写入临时文件并在结束后删除
+        self.on_session = on_session  # on_session(pipeline)，每个会话开始回放时调用
+        self.clock = None  # 当前回放到的日志时间
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _instrument(self, pipeline, timer):
+        """给流水线的各个阶段加上计时（只替换本次回放的实例属性，流水线代码本身不变）"""
+        pipeline.display = timer.wrap('display', pipeline.display)
+        pipeline.writer.write_line = timer.wrap('write', pipeline.writer.write_line)
+        totals = timer.totals
+        perf_counter = time.perf_counter
+
+        for parser in pipeline.parsers.values():
+            def feed_line(line, timestamp=None, flags=None, parser=parser):
+                # 与 MinerOutputParser.feed_line 相同，只是分开计时；事件时间使用日志中记录的时间
+                started = perf_counter()
+                if flags is None:
+                    flags = parser.classifier.classify(line)
+                classified = perf_counter()
+                events = parser.parse_line(line, self.clock if timestamp is None else timestamp, flags)
+                parsed = perf_counter()
+                for event in events:
+                    parser.publish(event)
+                totals['classify'] += classified - started
+                totals['parse'] += parsed - classified
+                totals['dispatch'] += perf_counter() - parsed
+                timer.lines += 1
+                return events
+            parser.feed_line = feed_line
+
+    def replay_session(self, session):
+        """回放一个会话，返回回放报告"""
+        scratch = None
+        output_path = self.output_path
+        if output_path is None:
+            fd, scratch = tempfile.mkstemp(prefix="scash-replay-", suffix=".txt")
+            os.close(fd)
+            output_path = scratch
+        pipeline = MiningOutputPipeline(self.config, display=self.display, log=self.log,
+                                        log_file_path=output_path, names=session.names)
+        timer = StageTimer()
+        self._instrument(pipeline, timer)
+        events = Counter()
+        pipeline.parser.subscribe(lambda event: events.update((type(event).__name__,)))
+        if self.on_session is not None:
+            self.on_session(pipeline)
+
+        pipeline.open()
+        records = session.records
+        first = records[0][0] if records else 0.0
+        max_lag = 0.0
+        batch = []
+        batch_key = None
+        started = time.perf_counter()
+        try:
+            for timestamp, name, line in records:
+                if self._stop_event.is_set():
+                    break
+                key = (timestamp, name)
+                if batch and (key != batch_key or len(batch) >= BATCH_LINES):
+                    pipeline.handle_lines(batch, batch_key[1])
+                    batch = []
+                if self.speed:
+                    # 按原来的时间间隔（除以倍速）等待；流水线处理不过来时记录落后了多少
+                    delay = (timestamp - first) / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        if self._stop_event.wait(delay):
+                            break
+                    else:
+                        max_lag = max(max_lag, -delay)
+                self.clock = timestamp
+                batch_key = key
+                batch.append(line)
+            if batch and not self._stop_event.is_set():
+                pipeline.handle_lines(batch, batch_key[1])
+            elapsed = time.perf_counter() - started
+        finally:
+            pipeline.close()
+            if scratch is not None:
+                try:
+                    os.remove(scratch)
+                except OSError:
+                    pass
+
+        return {
+            'session': session.index,
+            'started_at': session.started_at.strftime(TIME_FORMAT),
+            'instances': [name for name in session.names if name is not None],
+            'lines': timer.lines,
+            'log_span': round(session.span, 1),
+            'speed': self.speed or 'max',
+            'elapsed': round(elapsed, 3),
+            'lines_per_sec': round(timer.lines / elapsed, 1) if elapsed > 0 else None,
+            'max_lag': round(max_lag, 3),
+            'events': dict(events),
+            'stats': pipeline.stats.summary(),
+            'stages': timer.to_dict(),
+        }
+
+    def replay_file(self, path, session_index=None):
+        """回放日志文件中的全部会话或指定的会话（负数表示倒数第几个），返回每个会话的报告"""
+        sessions = read_sessions(path)
+        if session_index is not None:
+            try:
+                sessions = [sessions[session_index]]
+            except IndexError:
+                raise ValueError(f"日志中只有 {len(sessions)} 个会话，没有第 {session_index} 个")
+        reports = []
+        for session in sessions:
+            if self._stop_event.is_set():
+                break
+            if not session.records:
+                continue
+            self.log(f"▶️ 回放会话 #{session.index}（开始于 {session.started_at.strftime(TIME_FORMAT)}，"
+                     f"{len(session.records)} 行，倍速 {self.speed or '最快'}）")
+            reports.append(self.replay_session(session))
+        return reports
+
+
+def format_report(reports):
+    """把回放报告整理成便于阅读的文本行"""
+    lines = []
+    for report in reports:
+        lines.append(f"📊 会话 #{report['session']}: {report['lines']} 行（日志时长 {report['log_span']} 秒），"
+                     f"用时 {report['elapsed']} 秒，{report['lines_per_sec']} 行/秒，最大落后 {report['max_lag']} 秒")
+        lines.append(f"   统计: {report['stats']}；事件: "
+                     + (", ".join(f"{name} {count}" for name, count in sorted(report['events'].items())) or "无"))
+        for stage, timing in report['stages'].items():
+            if timing['per_line_us'] is None:
+                continue
+            lines.append(f"   {STAGE_NAMES[stage]}: {timing['total_ms']:.1f} ms，每行 {timing['per_line_us']:.1f} µs"
+                         f"（{timing['share'] * 100 if timing['share'] is not None else 0:.1f}%）")
+    return lines
+
+
+def parse_speed(text):
+    """回放倍速：数字或 max（不等待）"""
+    if text.lower() in ('max', '0'):
+        return None
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("倍速必须大于0")
+    return speed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="把已有的挖矿日志重新送入输出处理流水线，用于复现问题和测量吞吐量")
+    parser.add_argument('--replay', dest='path', default=LOG_FILE_PATH, help="要回放的日志文件（支持 .gz/.zst）")
+    parser.add_argument('--speed', type=parse_speed, default=None, help="回放倍速，如 1、100；max 表示尽可能快（默认）")
+    parser.add_argument('--session', type=int, help="只回放第几个会话（从0开始，-1 表示最后一个）")
+    parser.add_argument('--config', default=miner_config.CONFIG_PATH, help="配置文件路径（日志写入参数）")
+    parser.add_argument('--output', help="回放时写入的日志文件（默认写入临时文件并删除）")
+    parser.add_argument('--quiet', action='store_true', help="不输出回放的挖矿日志行，只输出监测信息和报告")
+    parser.add_argument('--json', dest='json_path', help="把回放报告写入JSON文件")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = miner_config.load_config(args.config)
+    display = (lambda line: None) if args.quiet else print
+    replayer = LogReplayer(config, display=display, log=print, speed=args.speed, output_path=args.output)
+    try:
+        reports = replayer.replay_file(args.path, args.session)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"回放失败: {str(e)}")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    for line in format_report(reports):
+        print(line)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import gzip
+import os
+import re
+import shutil
+import threading
+import time
+
+# 尝试导入zstandard库，如果失败则只支持gzip压缩
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 轮转方式
+ROTATE_NONE = 'none'
+ROTATE_SIZE = 'size'
+ROTATE_DAILY = 'daily'
+
+COMPRESSION_SUFFIX = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+    'none': '',
+}
+
+
+def segment_pattern(log_file_path):
+    """轮转后的文件名: mining_log.20250907-223933.txt[.gz]"""
+    base, ext = os.path.splitext(log_file_path)
+    return re.compile(re.escape(os.path.basename(base)) + r'\.\d{8}-\d{6}(?:-\d+)?'
+                      + re.escape(ext) + r'(?:\.gz|\.zst)?$')
+
+
+def _matching_segments(log_file_path):
+    pattern = segment_pattern(log_file_path)
+    directory = os.path.dirname(os.path.abspath(log_file_path))
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(os.path.join(directory, name) for name in names if pattern.match(name))
+
+
+def rotated_segments(log_file_path):
+    """返回日志文件轮转后的分段路径（包括已压缩的），按时间从早到晚排列。
+    压缩文件就位到删除原文件之间（或压缩中途退出后）同一分段会有两个文件，只返回压缩后的那个"""
+    paths = _matching_segments(log_file_path)
+    existing = set(paths)
+    return [path for path in paths
+            if not any(path + suffix in existing for suffix in COMPRESSION_SUFFIX.values() if suffix)]
+
+
+def open_segment(path):
+    """以二进制方式打开日志分段，.gz/.zst 分段返回解压后的数据流"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("读取 .zst 日志需要 zstandard 库: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    return open(path, 'rb')
+
+
+class MiningLogWriter:
+    """挖矿日志写入器：后台按时间/大小批量刷新，按大小或按天轮转，
+    轮转后的日志在后台压缩，并只保留最近的若干个"""
+
+    def __init__(self, log_file_path, flush_interval=1.0, flush_bytes=64 * 1024,
+                 rotate=ROTATE_SIZE, max_bytes=50 * 1024 * 1024, backup_count=7,
+                 compression='gzip', encoding='utf-8'):
+        if rotate not in (ROTATE_NONE, ROTATE_SIZE, ROTATE_DAILY):
+            raise ValueError(f"未知的日志轮转方式: {rotate}")
+        if compression not in COMPRESSION_SUFFIX:
+            raise ValueError(f"未知的日志压缩方式: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            # 没有安装zstandard时退回gzip
+            compression = 'gzip'
+
+        self.log_file_path = log_file_path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compression = compression
+        self.encoding = encoding
+
+        base, ext = os.path.splitext(log_file_path)
+        self._base = base
+        self._ext = ext
+
+        self._pending = []
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._file = None
+        self._file_size = 0
+        self._opened_day = None
+        self._closed = True
+        self._flush_thread = None
+        self._compress_threads = []
+
+        # 统计数据
+        self.lines_written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """打开日志文件并启动后台刷新线程"""
+        with self._io_lock:
+            self._open_file()
+        self._closed = False
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="MiningLogWriter", daemon=True)
+        self._flush_thread.start()
+        # 上次运行时未来得及压缩的轮转日志
+        self._start_compression(self._uncompressed_segments())
+
+    def _open_file(self):
+        self._file = open(self.log_file_path, 'ab')
+        self._file_size = self._file.tell()
+        # 接着写已有的日志时按文件最后修改的日期计算，昨天留下的日志今天第一次写入时就会轮转
+        modified = os.fstat(self._file.fileno()).st_mtime if self._file_size else time.time()
+        self._opened_day = time.strftime('%Y%m%d', time.localtime(modified))
+
+    def write_line(self, line, timestamp=None):
+        """写入一行挖矿输出（带时间戳），实际写盘由后台线程批量完成"""
+        if timestamp is None:
+            timestamp = time.time()
+        data = f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}] {line}\n".encode(self.encoding)
+        with self._cond:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            self.lines_written += 1
+            if self._pending_bytes >= self.flush_bytes:
+                self._cond.notify()
+
+    def write_marker(self, text):
+        """写入会话开始/结束标记，并立即刷新到磁盘"""
+        with self._cond:
+            self._pending.append(text.encode(self.encoding))
+            self._pending_bytes += len(self._pending[-1])
+        self.flush()
+
+    def flush(self):
+        """把缓冲的内容立即写入磁盘。取出缓冲和写盘都在 _io_lock 内完成，
+        两个线程同时刷新时先取出的内容一定先写入（例如会话结束标记不会写在最后几行之前）"""
+        with self._io_lock:
+            with self._cond:
+                pending = self._pending
+                self._pending = []
+                self._pending_bytes = 0
+            if pending:
+                self._write(b"".join(pending))
+
+    def close(self):
+        """刷新剩余内容并关闭文件（后台压缩会继续完成）"""
+        if self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def wait_for_compression(self, timeout=None):
+        """等待后台压缩完成（主要用于退出前和测试）"""
+        for thread in list(self._compress_threads):
+            thread.join(timeout)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending_bytes < self.flush_bytes:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _write(self, data):
+        """写入一批数据（调用时持有 _io_lock）"""
+        if self._file is None:
+            self._open_file()
+        if self._should_rotate(len(data)):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._file_size += len(data)
+        self.flushes += 1
+
+    def _should_rotate(self, incoming_bytes):
+        if self._file_size == 0:
+            return False
+        if self.rotate == ROTATE_SIZE:
+            return self._file_size + incoming_bytes > self.max_bytes
+        if self.rotate == ROTATE_DAILY:
+            return time.strftime('%Y%m%d') != self._opened_day
+        return False
+
+    def _rotate(self):
+        """把当前日志文件改名为带时间戳的分段，并重新打开新文件"""
+        self._file.close()
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        segment_path = f"{self._base}.{stamp}{self._ext}"
+        index = 1
+        while os.path.exists(segment_path) or os.path.exists(segment_path + COMPRESSION_SUFFIX[self.compression]):
+            segment_path = f"{self._base}.{stamp}-{index}{self._ext}"
+            index += 1
+        try:
+            os.replace(self.log_file_path, segment_path)
+            self.rotations += 1
+        except OSError:
+            segment_path = None
+        self._open_file()
+        if segment_path:
+            self._start_compression([segment_path])
+
+    def _segments(self):
+        return rotated_segments(self.log_file_path)
+
+    def _uncompressed_segments(self):
+        if self.compression == 'none':
+            return []
+        return [path for path in _matching_segments(self.log_file_path) if path.endswith(self._ext)]
+
+    def _start_compression(self, segment_paths):
+        if not segment_paths and self.backup_count is None:
+            return
+        thread = threading.Thread(target=self._compress_segments, args=(segment_paths,),
+                                  name="MiningLogCompressor", daemon=True)
+        self._compress_threads = [t for t in self._compress_threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _compress_segments(self, segment_paths):
+        for segment_path in segment_paths:
+            if self.compression != 'none':
+                try:
+                    self._compress_file(segment_path)
+                except OSError:
+                    pass
+        self._apply_retention()
+
+    def _compress_file(self, segment_path):
+        """先压缩到临时文件再改名，中途退出也不会留下损坏的压缩文件"""
+        target_path = segment_path + COMPRESSION_SUFFIX[self.compression]
+        temp_path = target_path + ".tmp"
+        with open(segment_path, 'rb') as source:
+            if self.compression == 'zstd':
+                with open(temp_path, 'wb') as target:
+                    zstandard.ZstdCompressor().copy_stream(source, target)
+            else:
+                with gzip.open(temp_path, 'wb') as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(temp_path, target_path)
+        os.remove(segment_path)
+
+    def _apply_retention(self):
+        """只保留最近的 backup_count 个轮转日志"""
+        if self.backup_count is None:
+            return
+        segments = self._segments()
+        excess = len(segments) - self.backup_count
+        for segment_path in segments[:max(excess, 0)]:
+            try:
+                os.remove(segment_path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """返回写入统计"""
+        return {
+            'lines': self.lines_written,
+            'flushes': self.flushes,
+            'rotations': self.rotations,
+            'pending_bytes': self._pending_bytes,
+            'file_size': self._file_size,
+        }
@@ -1,5 +1,3 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
 import subprocess
 import json
 import os
@@ -7,8 +5,35 @@ import sys
 import threading
 import time
 import platform
-import socket
-import re
+
+# 尝试导入tkinter库，服务器上没有图形界面时可以使用 --headless 模式
+try:
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, messagebox
+    import hashrate_chart
+    TK_AVAILABLE = True
+except ImportError:
+    TK_AVAILABLE = False
+
+import cpu_topology
+import diagnostics
+import hashrate_history
+import host_advisor
+import hugepages
+import log_classifier
+import log_replay
+import miner_config
+import pool_probe
+import pool_selector
+import stratum_monitor
+from log_buffer import LogBuffer
+from log_history import LogHistoryPager
+import multi_instance
+from miner_events import format_hashrate
+from miner_supervisor import MinerGroup
+from mining_session import MiningOutputPipeline, LOG_FILE_PATH
+from session_state import SessionStateMachine, IDLE, PROBING, STARTING, MINING, STOPPING
+from ui_dispatcher import UIDispatcher
 
 # 尝试导入PIL库，如果失败则设置标志
 try:
@@ -18,6 +43,11 @@ except ImportError:
     PIL_AVAILABLE = False
     print("警告: 未找到PIL库，将无法显示logo图片。您可以通过 'pip install Pillow' 安装。")
 
+# 日志刷新：有新日志时通过虚拟事件唤醒主线程，空闲时只保留低频兜底定时器
+LOG_PUMP_EVENT = "<<LogPending>>"
+LOG_PUMP_MIN_INTERVAL = 0.05  # 两次刷新之间的最小间隔（秒），突发日志在此期间合并为一批
+LOG_PUMP_IDLE_INTERVAL_MS = 1000  # 兜底刷新间隔（毫秒）
+
 class ScashMinerGUI:
     def __init__(self, root):
         self.root = root
@@ -29,16 +59,44 @@ class ScashMinerGUI:
         self.setup_fonts()
         
         # 挖矿进程控制
-        self.mining_process = None
-        self.is_mining = False
+        self.supervisor = MinerGroup()  # 在后台asyncio事件循环中管理挖矿进程（可按NUMA节点启动多个）
+        self.session_state = SessionStateMachine()  # 挖矿会话状态（空闲/检测/启动/挖矿/停止中）
+        self.restart_settings = None  # 停止完成后立即用这些参数重新开始挖矿（None表示不重启）
+        self.closing = False  # 停止完成后是否关闭窗口
         self.mining_thread = None
-        self.log_queue = []  # 日志队列，用于在主线程中更新UI
-        self.log_lock = threading.Lock()  # 用于保护日志队列的锁
-        self.pre_network_test_passed = False  # 启动前网络检测是否通过
+        self.log_queue = LogBuffer()  # 有界日志队列（线程安全），用于在主线程中更新UI
+        self.reported_dropped = 0  # 已在界面上提示过的丢弃消息数
+        self.pool_selector = None  # 配置了多个矿池时按延迟排序并持续检测
+        self.stratum_monitor = None  # 独立的矿池监测连接（每次挖矿会话新建）
+        self.mining_stats = None  # 本次挖矿会话的统计数据
+        self.hashrate_history = hashrate_history.HashrateHistory()  # 最近24小时的算力（跨会话保留）
+        self.last_stats_summary = None
+        self.log_pump_ready = False  # 日志刷新事件是否已绑定
+        self.log_pump_after = None  # 已安排的日志刷新定时器
+        self.last_log_pump = 0.0
+        self.self_monitor = None  # 程序自身的运行数据（界面延迟、队列长度、内存等）
+        self.profiler = None  # 运行时开启的性能分析
         
         # 读取配置文件
         self.config = self.load_config()
         
+        # 读取CPU拓扑（仅Linux），用于推荐线程数和检查明显不合理的设置
+        self.cpu_topology = cpu_topology.read_topology()
+        
+        # 日志显示区域最多保留的行数，更早的日志可从日志文件中查看
+        try:
+            self.log_max_lines = max(100, int(self.config.get('log_max_lines', 5000)))
+        except (TypeError, ValueError):
+            self.log_max_lines = 5000
+        self.trimmed_line_count = 0  # 已从显示区域移除的行数
+        
+        # 日志队列容量和溢出策略
+        try:
+            self.log_queue.configure(int(self.config.get('log_queue_size', 10000)),
+                                     self.config.get('log_queue_overflow', 'drop_oldest'))
+        except (TypeError, ValueError) as e:
+            self.log_message(f"日志队列配置无效，使用默认值: {str(e)}")
+        
         # 加载和设置软件图标
         if PIL_AVAILABLE:
             self.load_app_icon()
@@ -49,9 +107,21 @@ class ScashMinerGUI:
         # 初始化配置输入框
         self.init_config_fields()
         
-        # 启动日志更新定时器
+        # 后台线程的界面更新统一交给主线程执行
+        self.ui = UIDispatcher(self.root)
+        self.session_state.add_listener(
+            lambda old_state, new_state, detail: self.ui.call(self._apply_session_state, new_state, detail))
+        
+        # 绑定日志唤醒事件并进行首次刷新
+        self.root.bind(LOG_PUMP_EVENT, self.update_log_display)
+        self.log_pump_ready = True
         self.update_log_display()
         
+        # 记录界面事件循环延迟、日志队列长度等运行数据，界面变卡时可在"运行诊断"中查看和导出
+        if self.config.get('self_monitor', True):
+            self.self_monitor = diagnostics.SelfMonitor(self.root.after, self.log_queue, self.supervisor.stats,
+                                                        lambda: self.supervisor.pids).start()
+        
         # 设置窗口关闭事件处理
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
@@ -134,71 +204,21 @@ class ScashMinerGUI:
     
     def load_config(self):
         """优先从config.json加载配置，如果不存在则创建默认配置"""
-        config_path = "config.json"
-        
-        # 默认配置，与项目规范文档一致，增加新的优化参数
-        default_config = {
-            "wallet_address": "scash1qtvj3eryz8p46e9nu7zzn7yfg49j7lkns4t2698",
-            "worker_name": "x",
-            "cpu_threads": "20",
-            "pool_address": "stratum+tcp://scash.work:9601",
-            "use_tls": True,
-            "use_keepalive": True,
-            "use_wallet_worker_format": True,
-            "retry_time": "30",
-            "send_stales": False
-        }
-        
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 确保所有必要的配置项都存在，添加新参数
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                    return config
-            except Exception as e:
-                self.log_message(f"读取配置文件失败: {str(e)}")
-                # 即使读取失败，也尝试创建一个新的配置文件
-                try:
-                    with open(config_path, 'w', encoding='utf-8') as f:
-                        json.dump(default_config, f, ensure_ascii=False, indent=4)
-                    self.log_message("已创建新的配置文件")
-                except Exception as e2:
-                    self.log_message(f"创建配置文件失败: {str(e2)}")
-                return default_config
-        else:
-            # 如果配置文件不存在，创建默认配置文件
-            try:
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(default_config, f, ensure_ascii=False, indent=4)
-                self.log_message("已创建默认配置文件")
-            except Exception as e:
-                self.log_message(f"创建默认配置文件失败: {str(e)}")
-            return default_config
+        return miner_config.load_config(log=self.log_message)
     
     def save_config(self):
-        config_path = "config.json"
+        config_path = miner_config.CONFIG_PATH
         try:
             # 获取当前配置以保持新参数
             current_config = self.load_config()
             
-            # 更新用户修改的参数（移除TLS和Keepalive）
-            current_config.update({
-                "wallet_address": self.wallet_entry.get(),
-                "worker_name": self.worker_entry.get(),
-                "cpu_threads": self.threads_entry.get(),
-                "pool_address": self.pool_entry.get(),
-                "use_wallet_worker_format": self.wallet_worker_var.get()
-            })
-            
-            # 移除TLS和Keepalive配置（因为影响挖矿）
-            current_config.pop('use_tls', None)
-            current_config.pop('use_keepalive', None)
-            
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(current_config, f, ensure_ascii=False, indent=4)
+            # 更新用户修改的参数（保存时会移除影响挖矿的TLS和Keepalive）
+            settings = self._read_settings()
+            current_config.update(settings)
+            if miner_config.host_name() in (current_config.get('cpu_threads_by_host') or {}):
+                # 本机已有自动调优的线程数时，一并更新，否则界面上的修改不会生效
+                miner_config.set_host_cpu_threads(current_config, settings['cpu_threads'])
+            miner_config.save_config(current_config, config_path)
             self.log_message("配置已保存")
             messagebox.showinfo("成功", "配置已保存")
         except Exception as e:
@@ -208,7 +228,12 @@ class ScashMinerGUI:
     def on_closing(self):
         """处理窗口关闭事件，确保挖矿进程被正确停止"""
         try:
-            if self.is_mining and self.mining_process:
+            if self.session_state.state == STOPPING:
+                # 正在停止中，停止完成后关闭窗口
+                self.closing = True
+                return
+            
+            if self.session_state.active:
                 # 如果正在挖矿，先问用户是否确认关闭
                 result = messagebox.askyesno(
                     "确认关闭",
@@ -217,43 +242,13 @@ class ScashMinerGUI:
                 if not result:
                     return  # 用户取消关闭
                 
-                # 用户确认关闭，停止挖矿进程
+                # 用户确认关闭，停止挖矿进程，停止完成后再关闭窗口
                 self.log_message("📴 用户关闭GUI，正在停止挖矿进程...")
-                self.is_mining = False
-                
-                # 停止挖矿进程
-                if self.mining_process and self.mining_process.poll() is None:
-                    try:
-                        # 尝试优雅地终止进程
-                        self.mining_process.terminate()
-                        self.mining_process.wait(timeout=2)
-                        self.log_message("✅ 挖矿进程已优雅停止")
-                    except subprocess.TimeoutExpired:
-                        # 如果超时，强制终止
-                        try:
-                            self.mining_process.kill()
-                            self.log_message("⚠️ 挖矿进程已强制终止")
-                        except Exception as e:
-                            self.log_message(f"❌ 终止进程失败: {str(e)}")
-                    except Exception as e:
-                        self.log_message(f"❌ 停止进程时出错: {str(e)}")
-                
-                # 使用taskkill命令清理所有相关进程
-                try:
-                    result = subprocess.run(["taskkill", "/F", "/IM", "SRBMiner-MULTI.exe", "/T"],
-                                           stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                           text=True, check=False, timeout=5)
-                    if result.returncode == 0:
-                        self.log_message("🧹 已清理所有SRBMiner-MULTI进程")
-                    else:
-                        if "not found" not in result.stderr:
-                            self.log_message(f"⚠️ 清理进程时出现问题: {result.stderr.strip()}")
-                except Exception as e:
-                    self.log_message(f"❌ 执行taskkill命令失败: {str(e)}")
+                self.closing = True
+                self.stop_mining()
+                return
             
-            # 关闭窗口
-            self.root.quit()
-            self.root.destroy()
+            self._finish_closing()
             
         except Exception as e:
             self.log_message(f"❌ 关闭窗口时出错: {str(e)}")
@@ -264,128 +259,31 @@ class ScashMinerGUI:
             except:
                 pass
     
-    def test_pool_connectivity(self, pool_address):
-        """测试矿池连通性，返回(is_reachable, test_results)"""
+    def _finish_closing(self, cleanup=False):
+        """挖矿已停止后关闭窗口（在主线程中执行）"""
         try:
-            # 解析矿池地址
-            if pool_address.startswith('stratum+tcp://'):
-                pool_url = pool_address.replace('stratum+tcp://', '')
-            else:
-                pool_url = pool_address
-            
-            if ':' in pool_url:
-                host, port = pool_url.split(':', 1)
-                port = int(port)
-            else:
-                host = pool_url
-                port = 4444  # 默认端口
-            
-            test_results = {
-                'host': host,
-                'port': port,
-                'ping_success': False,
-                'socket_success': False,
-                'dns_success': False,
-                'error_messages': []
-            }
-            
-            self.log_message(f"🔍 开始测试矿池连通性: {host}:{port}")
-            
-            # 1. DNS解析测试
-            try:
-                socket.gethostbyname(host)
-                test_results['dns_success'] = True
-                self.log_message(f"✅ DNS解析成功: {host}")
-            except socket.gaierror as e:
-                test_results['error_messages'].append(f"DNS解析失败: {str(e)}")
-                self.log_message(f"❌ DNS解析失败: {host} - {str(e)}")
-            
-            # 2. Ping测试
-            try:
-                ping_cmd = ['ping', '-n', '3', host] if platform.system().lower() == 'windows' else ['ping', '-c', '3', host]
-                
-                # 隐藏cmd窗口的配置
-                startupinfo = None
-                creationflags = 0
-                if platform.system().lower() == 'windows':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = subprocess.SW_HIDE
-                    creationflags = subprocess.CREATE_NO_WINDOW
-                
-                result = subprocess.run(
-                    ping_cmd, 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=10,
-                    startupinfo=startupinfo,
-                    creationflags=creationflags
-                )
-                
-                if result.returncode == 0:
-                    test_results['ping_success'] = True
-                    # 提取ping的平均响应时间
-                    if platform.system().lower() == 'windows':
-                        # Windows ping输出解析
-                        if '平均' in result.stdout or 'Average' in result.stdout:
-                            avg_time = re.search(r'\d+ms', result.stdout.split('平均')[-1] or result.stdout.split('Average')[-1])
-                            if avg_time:
-                                self.log_message(f"✅ Ping成功: 平均响应时间 {avg_time.group()}")
-                            else:
-                                self.log_message(f"✅ Ping成功: {host}")
-                        else:
-                            self.log_message(f"✅ Ping成功: {host}")
-                    else:
-                        self.log_message(f"✅ Ping成功: {host}")
-                else:
-                    ping_error = result.stderr.strip() or result.stdout.strip()
-                    test_results['error_messages'].append(f"Ping失败: {ping_error}")
-                    self.log_message(f"❌ Ping失败: {host} - {ping_error}")
-                    
-            except subprocess.TimeoutExpired:
-                test_results['error_messages'].append("Ping超时")
-                self.log_message(f"❌ Ping超时: {host}")
-            except Exception as e:
-                test_results['error_messages'].append(f"Ping错误: {str(e)}")
-                self.log_message(f"❌ Ping错误: {host} - {str(e)}")
-            
-            # 3. TCP连接测试
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(5)  # 5秒超时
-                result = sock.connect_ex((host, port))
-                
-                if result == 0:
-                    test_results['socket_success'] = True
-                    self.log_message(f"✅ TCP连接成功: {host}:{port}")
-                else:
-                    error_msg = f"TCP连接失败: 端口 {port} 不可达"
-                    test_results['error_messages'].append(error_msg)
-                    self.log_message(f"❌ {error_msg}")
-                
-                sock.close()
-                
-            except socket.timeout:
-                test_results['error_messages'].append("TCP连接超时")
-                self.log_message(f"❌ TCP连接超时: {host}:{port}")
-            except Exception as e:
-                test_results['error_messages'].append(f"TCP连接错误: {str(e)}")
-                self.log_message(f"❌ TCP连接错误: {host}:{port} - {str(e)}")
-            
-            # 判断总体连通性
-            is_reachable = test_results['dns_success'] and (test_results['ping_success'] or test_results['socket_success'])
-            
-            if is_reachable:
-                self.log_message(f"✅ 矿池网络连通性测试通过: {pool_address}")
-            else:
-                self.log_message(f"❌ 矿池网络连通性测试失败: {pool_address}")
-                self.log_message(f"⚠️ 错误详情: {"; ".join(test_results['error_messages'])}")
+            if cleanup:
+                # 使用taskkill命令清理所有相关进程
+                self._taskkill_miner()
             
-            return is_reachable, test_results
+            # 关闭前保存尚未停止的性能分析
+            self.stop_profiling()
             
+            # 结束挖矿监督线程
+            self.supervisor.shutdown()
         except Exception as e:
-            self.log_message(f"❌ 矿池连通性测试异常: {str(e)}")
-            return False, {'error': str(e)}
+            self.log_message(f"❌ 关闭窗口时出错: {str(e)}")
+        
+        # 关闭窗口
+        try:
+            self.root.quit()
+            self.root.destroy()
+        except:
+            pass
+    
+    def test_pool_connectivity(self, pool_address):
+        """测试矿池连通性，返回(is_reachable, test_results)"""
+        return pool_probe.test_pool_connectivity(pool_address, log=self.log_message)
     
     def create_widgets(self):
         # 创建主框架
@@ -420,8 +318,16 @@ class ScashMinerGUI:
         
         # CPU核心数
         ttk.Label(left_frame, text="CPU核心数:\n(CPU Threads)", font=("SimHei", 10)).grid(row=2, column=0, sticky=tk.NW, pady=5)
-        self.threads_entry = ttk.Entry(left_frame, width=35)  # 进一步减小宽度到35
-        self.threads_entry.grid(row=2, column=1, sticky=tk.EW, pady=5, padx=(5, 0))
+        threads_frame = ttk.Frame(left_frame)
+        threads_frame.grid(row=2, column=1, sticky=tk.EW, pady=5, padx=(5, 0))
+        self.threads_entry = ttk.Entry(threads_frame, width=28)
+        self.threads_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 按CPU拓扑推荐线程数
+        recommend_button = tk.Button(threads_frame, text="推荐", font=('SimHei', 8),
+                                     cursor="hand2", fg="#8B00FF", bg="white", relief="flat",
+                                     command=self._fill_recommended_threads)
+        recommend_button.pack(side=tk.LEFT, padx=(5, 0))
         
         # 矿池地址
         ttk.Label(left_frame, text="矿池地址:\n(Pool Address)", font=("SimHei", 10)).grid(row=3, column=0, sticky=tk.NW, pady=5)
@@ -432,7 +338,7 @@ class ScashMinerGUI:
         pool_tip_frame = tk.Frame(left_frame)
         pool_tip_frame.grid(row=4, column=1, sticky=tk.W, pady=(2, 5), padx=(5, 0))
         
-        pool_tip_label = tk.Label(pool_tip_frame, text="社区矿池地址: stratum+tcp://scash.work:9601", 
+        pool_tip_label = tk.Label(pool_tip_frame, text=f"社区矿池地址: {miner_config.COMMUNITY_POOL}", 
                                  font=('SimHei', 9), cursor="hand2", fg="#8B00FF")
         pool_tip_label.pack(side=tk.LEFT)
         pool_tip_label.bind("<Button-1>", lambda e: self._auto_fill_pool_address())
@@ -553,6 +459,15 @@ class ScashMinerGUI:
         self.status_label = ttk.Label(status_frame, textvariable=self.status_var, font=("SimHei", 12))
         self.status_label.pack(pady=10)
         
+        # 挖矿统计（哈希率、份额）
+        self.stats_var = tk.StringVar(value="")
+        self.stats_label = ttk.Label(status_frame, textvariable=self.stats_var, font=("SimHei", 10))
+        self.stats_label.pack()
+        
+        # 算力曲线（只在有新数据时增量更新）
+        self.hashrate_chart = hashrate_chart.HashrateChart(status_frame, self.hashrate_history)
+        self.hashrate_chart.pack(fill=tk.X, pady=(5, 0))
+        
         # 日志显示区域
         log_frame = ttk.LabelFrame(right_frame, text="挖矿日志\n(Mining Log)", padding="10")
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -562,6 +477,16 @@ class ScashMinerGUI:
         self.log_text.pack(fill=tk.BOTH, expand=True)
         self.log_text.config(state=tk.DISABLED)
         
+        # 设置日志文本框的标签样式（只需配置一次）
+        self.log_text.tag_config("important", foreground="blue", font=('SimHei', 9, 'bold'))
+        self.log_text.tag_config("warning", foreground="red", font=('SimHei', 9, 'bold'))
+        self.log_text.tag_config("success", foreground="green", font=('SimHei', 9, 'bold'))
+        self.log_text.tag_config("hashrate", foreground="purple", font=('SimHei', 9, 'bold'))
+        
+        # 查看历史日志按钮（显示区域只保留最近的日志）
+        history_button = ttk.Button(log_frame, text="查看历史日志 (Log History)", command=self.show_log_history)
+        history_button.pack(fill=tk.X, pady=(5, 0))
+        
         # 创建菜单
         self.create_menu()
     
@@ -571,6 +496,8 @@ class ScashMinerGUI:
         
         # 创建帮助菜单
         help_menu = tk.Menu(menubar, tearoff=0)
+        help_menu.add_command(label="主机诊断 (Host Diagnostics)", command=self.show_host_diagnostics)
+        help_menu.add_command(label="运行诊断 (Runtime Diagnostics)", command=self.show_runtime_diagnostics)
         help_menu.add_command(label="关于", command=self.show_about)
         help_menu.add_command(label="项目信息", command=self.show_project_info)
         menubar.add_cascade(label="帮助", menu=help_menu)
@@ -578,6 +505,114 @@ class ScashMinerGUI:
         # 设置菜单栏
         self.root.config(menu=menubar)
     
+    def show_host_diagnostics(self):
+        """显示主机调优诊断（调频策略、大页、透明大页、SMT、MSR），可导出JSON报告"""
+        window = tk.Toplevel(self.root)
+        window.title("主机诊断")
+        window.geometry("800x500")
+        window.transient(self.root)
+        
+        button_frame = ttk.Frame(window, padding="5")
+        button_frame.pack(fill=tk.X)
+        
+        report_text = scrolledtext.ScrolledText(window, wrap=tk.WORD)
+        report_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        report = {}
+        
+        def run_diagnostics():
+            try:
+                threads = int(self.threads_entry.get().strip())
+            except ValueError:
+                threads = None
+            report.clear()
+            report.update(host_advisor.diagnose(threads))
+            report_text.config(state=tk.NORMAL)
+            report_text.delete("1.0", tk.END)
+            report_text.insert(tk.END, host_advisor.format_report(report))
+            report_text.config(state=tk.DISABLED)
+        
+        def export_report():
+            path = f"host_report_{report['host']}.json"
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                self.log_message(f"主机诊断报告已保存: {os.path.abspath(path)}")
+            except Exception as e:
+                self.log_message(f"保存主机诊断报告失败: {str(e)}")
+        
+        ttk.Button(button_frame, text="重新检查 (Refresh)", command=run_diagnostics).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="导出JSON (Export)", command=export_report).pack(side=tk.LEFT, padx=(5, 0))
+        
+        run_diagnostics()
+    
+    def show_runtime_diagnostics(self):
+        """显示程序自身的运行数据，可导出到文件，并可在运行时开启/停止性能分析"""
+        window = tk.Toplevel(self.root)
+        window.title("运行诊断")
+        window.geometry("700x300")
+        window.transient(self.root)
+        
+        button_frame = ttk.Frame(window, padding="5")
+        button_frame.pack(fill=tk.X)
+        
+        info_var = tk.StringVar()
+        ttk.Label(window, textvariable=info_var, justify=tk.LEFT, padding="10").pack(fill=tk.BOTH, expand=True)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            if self.self_monitor is None:
+                info_var.set("运行数据记录已关闭（config.json 中 self_monitor 为 false）")
+            else:
+                info_var.set("\n".join(self.self_monitor.format_lines()))
+            refresh_button_state()
+            window.after(diagnostics.SAMPLE_INTERVAL_MS, refresh)
+        
+        def dump():
+            if self.self_monitor is None:
+                return
+            path = f"diagnostics_{time.strftime('%Y%m%d_%H%M%S')}.json"
+            try:
+                self.self_monitor.dump(path, self.profiler)
+                self.log_message(f"运行诊断数据已保存: {os.path.abspath(path)}")
+            except Exception as e:
+                self.log_message(f"保存运行诊断数据失败: {str(e)}")
+        
+        def toggle_profiling():
+            if self.profiler is None:
+                self.profiler = diagnostics.RuntimeProfiler(profile_mode.get()).start()
+                self.log_message(f"🔬 已开始性能分析（{self.profiler.mode}）")
+            else:
+                self.stop_profiling()
+            refresh_button_state()
+        
+        def refresh_button_state():
+            profile_button.config(text=f"停止{self.profiler.mode}分析并保存 (Stop Profiling)"
+                                  if self.profiler is not None else "开始性能分析 (Start Profiling)")
+        
+        ttk.Button(button_frame, text="导出 (Dump)", command=dump).pack(side=tk.LEFT)
+        profile_mode = tk.StringVar(value="sampling")
+        ttk.Radiobutton(button_frame, text="采样（所有线程）", variable=profile_mode,
+                        value="sampling").pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Radiobutton(button_frame, text="cProfile（界面线程）", variable=profile_mode,
+                        value="cprofile").pack(side=tk.LEFT, padx=(5, 0))
+        profile_button = ttk.Button(button_frame, command=toggle_profiling)
+        profile_button.pack(side=tk.LEFT, padx=(5, 0))
+        
+        refresh()
+    
+    def stop_profiling(self):
+        """停止运行时性能分析并保存报告"""
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return
+        try:
+            paths = profiler.stop(f"profile_{profiler.mode}_{time.strftime('%Y%m%d_%H%M%S')}")
+            self.log_message(f"🔬 性能分析报告已保存: {', '.join(os.path.abspath(path) for path in paths)}")
+        except Exception as e:
+            self.log_message(f"保存性能分析报告失败: {str(e)}")
+    
     def show_about(self):
         messagebox.showinfo("关于", "Scash Miner\n版本: v1.8.1\n\n这是一个用于SatoshiCash挖矿的可视化工具，\n基于SRBMiner-Multi开发。\n\n由Scash社区爱好者开发")
     
@@ -688,121 +723,301 @@ class ScashMinerGUI:
         # 初始化配置输入框
         self.wallet_entry.insert(0, self.config["wallet_address"])
         self.worker_entry.insert(0, self.config["worker_name"])
-        self.threads_entry.insert(0, self.config["cpu_threads"])
+        self.threads_entry.insert(0, miner_config.host_cpu_threads(self.config))
         self.pool_entry.insert(0, self.config["pool_address"])
         
         # 初始化高级配置选项（只保留Wallet.Worker格式）
         self.wallet_worker_var.set(self.config.get('use_wallet_worker_format', True))
+        
+        # 本机没有调优结果且配置的线程数明显不合理时，预填按CPU拓扑推荐的线程数
+        if self.cpu_topology is not None:
+            recommended = self.cpu_topology.recommended_threads()
+            self.log_message(f"🧩 CPU拓扑: {self.cpu_topology.describe()}，推荐线程数 {recommended}")
+            tuned = miner_config.host_name() in (self.config.get('cpu_threads_by_host') or {})
+            try:
+                warning = cpu_topology.check_threads(int(self.threads_entry.get().strip()), self.cpu_topology)
+            except ValueError:
+                warning = "CPU线程数不是数字"
+            if warning and not tuned:
+                self.log_message(f"⚠️ {warning}，已预填推荐值 {recommended}（保存配置后生效）")
+                self.threads_entry.delete(0, tk.END)
+                self.threads_entry.insert(0, str(recommended))
+    
+    def _fill_recommended_threads(self):
+        """按CPU拓扑填写推荐的线程数"""
+        if self.cpu_topology is None:
+            self.log_message("无法读取CPU拓扑（仅支持Linux），可运行 thread_tuner.py 测试最佳线程数")
+            return
+        recommended = self.cpu_topology.recommended_threads()
+        self.threads_entry.delete(0, tk.END)
+        self.threads_entry.insert(0, str(recommended))
+        self.log_message(f"已填写推荐线程数 {recommended}（{self.cpu_topology.describe()}）")
     
     def _auto_fill_pool_address(self):
-        """自动填写社区矿池地址"""
+        """填写矿池地址：有矿池检测结果时填写延迟最低的矿池，否则填写社区矿池"""
+        pool = miner_config.COMMUNITY_POOL
+        if self.pool_selector is not None and self.pool_selector.reachable():
+            pool = self.pool_selector.ranking()[0]
         self.pool_entry.delete(0, tk.END)
-        self.pool_entry.insert(0, "stratum+tcp://scash.work:9601")
-        self.log_message("已自动填写社区矿池地址")
+        self.pool_entry.insert(0, pool)
+        if pool == miner_config.COMMUNITY_POOL:
+            self.log_message("已自动填写社区矿池地址")
+        else:
+            self.log_message(f"已填写延迟最低的矿池: {pool}")
     
     def log_message(self, message):
-        # 使用线程安全的方式添加日志消息到队列
-        with self.log_lock:
-            self.log_queue.append(message)
+        # 使用线程安全的方式添加日志消息到队列（队列有界，重复消息会被合并）
+        was_empty = self.log_queue.append(message)
+        # 队列由空变为非空时唤醒主线程刷新日志，之后的消息会合并到同一批
+        if was_empty and self.log_pump_ready:
+            try:
+                self.root.event_generate(LOG_PUMP_EVENT, when="tail")
+            except (tk.TclError, RuntimeError):
+                pass  # 窗口已关闭或主循环未运行，由兜底定时器刷新
     
-    def update_log_display(self):
+    def start_replay(self, path, speed=None, session_index=None):
+        """把已有的挖矿日志按指定倍速回放到日志窗口和统计栏，用于复现问题和测量界面能承受的输出速率"""
+        if self.session_state.state != IDLE:
+            self.log_message("⚠️ 挖矿进行中，不能回放日志")
+            return
+        
+        def on_session(pipeline):
+            self.mining_stats = pipeline.stats
+            self.hashrate_history.attach(pipeline)
+        
+        def run():
+            replayer = log_replay.LogReplayer(self.config, display=self.log_message, log=self.log_message,
+                                              speed=speed, on_session=on_session)
+            try:
+                reports = replayer.replay_file(path, session_index)
+            except (OSError, RuntimeError, ValueError) as e:
+                self.log_message(f"回放失败: {str(e)}")
+                return
+            for line in log_replay.format_report(reports):
+                self.log_message(line)
+            # 界面来不及显示时日志队列会丢弃消息
+            self.log_message(f"日志队列: 丢弃 {self.log_queue.dropped} 条，合并重复消息 {self.log_queue.coalesced} 条")
+        
+        threading.Thread(target=run, name="LogReplay", daemon=True).start()
+    
+    def update_log_display(self, event=None):
         # 在主线程中更新日志显示
-        with self.log_lock:
-            # 获取队列中的所有消息并清空队列
-            messages = self.log_queue.copy()
-            self.log_queue.clear()
+        if self.log_pump_after is not None:
+            self.root.after_cancel(self.log_pump_after)
+            self.log_pump_after = None
+        
+        # 距离上次刷新太近时延后一点，让突发的日志合并成一批插入
+        wait_ms = int((self.last_log_pump + LOG_PUMP_MIN_INTERVAL - time.monotonic()) * 1000)
+        if wait_ms > 0:
+            self.log_pump_after = self.root.after(wait_ms, self.update_log_display)
+            return
+        self.last_log_pump = time.monotonic()
         
-        if messages:
-            self.log_text.config(state=tk.NORMAL)
-            for message in messages:
-                # 插入消息到日志显示区域
-                self.log_text.insert(tk.END, f"[{time.strftime('%H:%M:%S')}] {message}\n")
-                
-                # 特别标记重要信息
-                important_keywords = [
-                    'connected', 'disconnected', 'difficulty', 'hashrate', 'hash rate', 
-                    'accepted', 'rejected', 'cpu result', 'job received', 'shares',
-                    'pool', 'algorithm', 'error', 'failed', 'success'
-                ]
-                
-                warning_keywords = ['error', 'failed', 'rejected', 'disconnected']
-                success_keywords = ['accepted', 'connected', 'initialized']
-                
-                message_lower = message.lower()
-                
-                # 获取最后一行的位置
-                last_line_start = self.log_text.index(tk.END + "-2l")
-                last_line_end = self.log_text.index(tk.END + "-1l")
-                
-                # 根据关键词应用不同的颜色标签
-                if any(keyword in message_lower for keyword in warning_keywords):
-                    self.log_text.tag_add("warning", last_line_start, last_line_end)
-                elif any(keyword in message_lower for keyword in success_keywords):
-                    self.log_text.tag_add("success", last_line_start, last_line_end)
-                elif any(keyword in message_lower for keyword in important_keywords):
-                    self.log_text.tag_add("important", last_line_start, last_line_end)
-                elif 'h/s' in message_lower:  # 哈希率信息
-                    self.log_text.tag_add("hashrate", last_line_start, last_line_end)
-            
-            # 自动滚动到最新的日志
-            self.log_text.see(tk.END)
-            self.log_text.config(state=tk.DISABLED)
+        # 获取队列中的所有消息并清空队列
+        messages = self.log_queue.drain()
         
-        # 设置日志文本框的标签样式
-        self.log_text.tag_config("important", foreground="blue", font=('SimHei', 9, 'bold'))
-        self.log_text.tag_config("warning", foreground="red", font=('SimHei', 9, 'bold'))
-        self.log_text.tag_config("success", foreground="green", font=('SimHei', 9, 'bold'))
-        self.log_text.tag_config("hashrate", foreground="purple", font=('SimHei', 9, 'bold'))
+        # 队列溢出时提示丢弃的消息数
+        dropped = self.log_queue.dropped
+        if dropped != self.reported_dropped:
+            messages.append(f"⚠️ 日志队列已满，丢弃了 {dropped - self.reported_dropped} 条消息"
+                            f"（累计 {dropped} 条，合并重复消息 {self.log_queue.coalesced} 条）")
+            self.reported_dropped = dropped
+        
+        if messages:
+            started = time.perf_counter()
+            self.render_log_batch(messages)
+            if self.self_monitor is not None:
+                self.self_monitor.record_batch(len(messages), time.perf_counter() - started)
+        
+        # 更新挖矿统计显示
+        if self.mining_stats is not None:
+            summary = self.mining_stats.summary()
+            average = self.hashrate_history.average(3600)
+            if average is not None:
+                summary = f"{summary} | 1小时平均 {format_hashrate(average)}"
+            if self.stratum_monitor is not None:
+                summary = f"{summary} | {self.stratum_monitor.summary()}"
+            if summary != self.last_stats_summary:
+                self.last_stats_summary = summary
+                self.stats_var.set(summary)
+        
+        # 有新的算力数据时更新曲线
+        self.hashrate_chart.update()
+        
+        # 兜底定时器：唤醒事件丢失时也能定期刷新，空闲时几乎不占用CPU
+        self.log_pump_after = self.root.after(LOG_PUMP_IDLE_INTERVAL_MS, self.update_log_display)
+    
+    def render_log_batch(self, messages):
+        """把一批日志消息按颜色标签合并成连续片段，一次性插入文本框"""
+        timestamp = time.strftime('%H:%M:%S')
+        insert_args = []
+        run_texts = []
+        run_tag = None
+        for message in messages:
+            # 一次扫描得到行的类别，按类别应用不同的颜色标签
+            tag = log_classifier.ui_tag(log_classifier.classify_line(message))
+            if tag != run_tag and run_texts:
+                insert_args.append("".join(run_texts))
+                insert_args.append((run_tag,) if run_tag else ())
+                run_texts = []
+            run_tag = tag
+            run_texts.append(f"[{timestamp}] {message}\n")
+        insert_args.append("".join(run_texts))
+        insert_args.append((run_tag,) if run_tag else ())
+        
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, *insert_args)
+        
+        # 超出最大行数时从头部删除旧日志（标签范围随文本一起删除）
+        self.trim_log_text()
+        
+        # 自动滚动到最新的日志
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
+    
+    def trim_log_text(self):
+        """只保留最近的 log_max_lines 行日志"""
+        line_count = int(self.log_text.index("end-1c").split('.')[0])
+        # 超出10%后再批量删除，避免每次插入都触发删除
+        if line_count > self.log_max_lines + self.log_max_lines // 10:
+            excess = line_count - self.log_max_lines
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.trimmed_line_count += excess
+    
+    def show_log_history(self, log_file_path=LOG_FILE_PATH, page_size=500):
+        """打开历史日志窗口，按需从日志文件中分页加载更早的日志"""
+        history_window = tk.Toplevel(self.root)
+        history_window.title("历史日志")
+        history_window.geometry("900x600")
+        history_window.transient(self.root)
+        
+        pager = LogHistoryPager(log_file_path)
+        
+        button_frame = ttk.Frame(history_window, padding="5")
+        button_frame.pack(fill=tk.X)
+        
+        info_var = tk.StringVar(value="")
+        ttk.Label(button_frame, textvariable=info_var, font=("SimHei", 9)).pack(side=tk.RIGHT)
+        
+        history_text = scrolledtext.ScrolledText(history_window, wrap=tk.WORD)
+        history_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        loaded = [0]
+        
+        def load_previous_page():
+            lines = pager.read_previous(page_size)
+            if lines:
+                history_text.config(state=tk.NORMAL)
+                history_text.insert("1.0", "\n".join(lines) + "\n")
+                history_text.config(state=tk.DISABLED)
+                loaded[0] += len(lines)
+            if not pager.has_more:
+                load_button.config(state=tk.DISABLED)
+            source = os.path.basename(pager.source)
+            info_var.set(f"已加载 {loaded[0]} 行，当前文件 {source}" + ("" if pager.has_more else "（已到最早的日志）"))
+        
+        load_button = ttk.Button(button_frame, text="加载更早的日志 (Load Older)", command=load_previous_page)
+        load_button.pack(side=tk.LEFT)
+        
+        # 窗口关闭时删除解压轮转日志用的临时文件
+        history_window.bind("<Destroy>", lambda event: pager.close() if event.widget is history_window else None)
+        
+        if not pager.has_more:
+            info_var.set(f"未找到日志文件: {log_file_path}")
+            load_button.config(state=tk.DISABLED)
+            return
         
-        # 每50毫秒更新一次日志显示（提高实时性）
-        self.root.after(50, self.update_log_display)
+        load_previous_page()
+        history_text.see(tk.END)
     
     def start_mining(self):
         # 验证输入参数
         if not self.validate_inputs():
             return
         
-        # 重置网络检测标志
-        self.pre_network_test_passed = False
-        
-        # 开始挖矿前更新按钮状态
-        self.start_button.config(state=tk.DISABLED)
-        self.stop_button.config(state=tk.NORMAL)
-        self.restart_button.config(state=tk.NORMAL)
-        self.save_button.config(state=tk.DISABLED)
+        # 在主线程中读取界面参数，后台线程不再访问Tk控件
+        self._begin_mining(self._read_settings())
+    
+    def _begin_mining(self, settings):
+        """用已验证的参数开始挖矿（自动重启也走这里，不弹出对话框）"""
+        # 开始新的挖矿会话（按钮和状态由状态机监听器更新）
+        session = self.session_state.begin()
+        if session is None:
+            return
         
         # 开始挖矿线程
-        self.is_mining = True
-        self.mining_thread = threading.Thread(target=self._mining_thread_func)
+        self.mining_thread = threading.Thread(target=self._mining_thread_func, args=(session, settings))
         self.mining_thread.daemon = True
         self.mining_thread.start()
     
-    def _mining_thread_func(self):
-        try:
-            # 获取配置参数
-            wallet_address = self.wallet_entry.get()
-            worker_name = self.worker_entry.get()
-            cpu_threads = self.threads_entry.get()
-            pool_address = self.pool_entry.get()
-            
+    def _read_settings(self):
+        """读取界面上的挖矿参数（在主线程中执行）"""
+        return {
+            'wallet_address': self.wallet_entry.get(),
+            'worker_name': self.worker_entry.get(),
+            'cpu_threads': self.threads_entry.get(),
+            'pool_address': self.pool_entry.get(),
             # 获取GUI中的优化参数配置（移除TLS和Keepalive）
-            use_wallet_worker_format = self.wallet_worker_var.get()
+            'use_wallet_worker_format': self.wallet_worker_var.get(),
+        }
+    
+    def _apply_session_state(self, state, detail=None):
+        """根据会话状态更新状态栏和按钮（在主线程中执行）"""
+        default_status = {
+            IDLE: "挖矿已停止",
+            PROBING: "网络检测中",
+            STARTING: "正在启动挖矿",
+            MINING: "挖矿中",
+            STOPPING: "正在停止挖矿",
+        }
+        self.status_var.set(detail or default_status[state])
+        if state in (IDLE, STOPPING):
+            if self.pool_selector is not None:
+                self.pool_selector.stop()
+            if self.stratum_monitor is not None:
+                self.stratum_monitor.stop()
+                self.stratum_monitor = None
+        if state == IDLE:
+            self.reset_buttons()
+        elif state == STOPPING:
+            # 停止过程中禁止再次操作，直到进程真正退出
+            self.start_button.config(state=tk.DISABLED)
+            self.stop_button.config(state=tk.DISABLED)
+            self.restart_button.config(state=tk.DISABLED)
+            self.save_button.config(state=tk.DISABLED)
+        else:
+            self.start_button.config(state=tk.DISABLED)
+            self.stop_button.config(state=tk.NORMAL)
+            self.restart_button.config(state=tk.NORMAL)
+            self.save_button.config(state=tk.DISABLED)
+    
+    def _mining_thread_func(self, session, settings):
+        base_settings = settings  # 自动重启时使用，矿池顺序在重启时重新检测
+        try:
+            pool_address = settings['pool_address']
             
             # 加载配置文件获取其他参数
             config = self.load_config()
-            retry_time = config.get('retry_time', '30')
-            send_stales = config.get('send_stales', False)
             
             # 日志记录开始挖矿的线程信息
             self.log_message(f"开始挖矿线程: {threading.current_thread().name}")
             
-            # ⭐ 在启动挖矿前先进行网络连通性测试
+            # ⭐ 在启动挖矿前先进行网络连通性测试；配置了备用矿池时检测所有矿池并按延迟排序
             self.log_message("🔍 开始启动前网络检测...")
-            is_reachable, test_results = self.test_pool_connectivity(pool_address)
+            pools = miner_config.pool_list(settings, config, log=self.log_message)
+            if len(pools) > 1:
+                if self.pool_selector is None or self.pool_selector.pools != pools:
+                    self.pool_selector = pool_selector.create_selector(pools, config, log=self.log_message)
+                # 自动切换矿池后重启时直接使用刚才的检测结果
+                is_reachable = self.pool_selector.rank(max_age=self.pool_selector.interval)
+                test_results = self.pool_selector.health[pools[0]].last_result
+                settings = dict(settings, pools=list(self.pool_selector.order))
+            else:
+                self.pool_selector = None
+                is_reachable, test_results = self.test_pool_connectivity(pool_address)
             
             if not is_reachable:
                 # 网络不可达，立即提示VPN问题
-                self.pre_network_test_passed = False
                 self.log_message("❌ 矿池网络不可达，无法开始挖矿")
                 self.log_message("⚠️ 请检查以下问题:")
                 self.log_message("1. 是否已经启用VPN网络")
@@ -810,288 +1025,94 @@ class ScashMinerGUI:
                 self.log_message("3. 防火墙设置是否阻止连接")
                 
                 # 显示立即的VPN警告
-                self._show_immediate_vpn_warning(test_results)
+                self._show_immediate_vpn_warning(test_results, pool_address)
                 
-                # 停止挖矿并重置状态
-                self.is_mining = False
-                self.status_var.set("矿池连接失败")
-                self.reset_buttons()
+                # 停止挖矿并重置状态（会话已被用户停止时不再改变状态）
+                self.session_state.transition(IDLE, session, detail="矿池连接失败")
                 return
             
             # 网络连通性测试通过，继续启动挖矿
-            self.pre_network_test_passed = True
             self.log_message("✅ 矿池网络可达，开始启动挖矿程序...")
             
-            # 构建钱包地址，根据配置决定是否使用 wallet.worker 格式
-            if use_wallet_worker_format and worker_name.strip():
-                # 使用 wallet.worker 格式（推荐）
-                full_wallet_address = f"{wallet_address}.{worker_name}"
-                self.log_message(f"💼 使用 wallet.worker 格式: {full_wallet_address}")
-                password_param = "x"  # 传统密码参数用默认值
-            else:
-                # 使用传统的分离格式
-                full_wallet_address = wallet_address
-                password_param = worker_name if worker_name.strip() else "x"
-                self.log_message(f"💼 使用传统格式: wallet={full_wallet_address}, password={password_param}")
+            # 构建挖矿命令（与无界面模式共用）；多实例模式下每个NUMA节点/CPU组一个进程
+            instances = multi_instance.build_instances(config, settings, self.cpu_topology, log=self.log_message)
             
-            # 构建挖矿命令，移除TLS和Keepalive参数
-            cmd = [
-                "SRBMiner-MULTI.exe",
-                "--algorithm", "randomscash",
-                "--pool", pool_address,
-                "--wallet", full_wallet_address,
-                "--password", password_param,
-                "--cpu-threads", cpu_threads,
-                "--randomx-use-largepages",
-                "--send-stales", str(send_stales).lower(),
-                "--retry-time", retry_time,
-                "--gpu-off"
-            ]
+            # 检查 --randomx-use-largepages 需要的大页是否足够，按配置可自动预留（需要root权限）
+            hugepages.preflight(int(settings['cpu_threads']), len(instances),
+                                reserve=bool(config.get('hugepages_reserve')), log=self.log_message)
             
-            self.log_message(f"开始挖矿: {' '.join(cmd)}")
-            self.status_var.set("挖矿中")
+            # 网络检测期间用户可能已经点击了停止
+            if not self.session_state.transition(STARTING, session):
+                self.log_message("挖矿已在启动前被停止")
+                return
             
-            # 使用固定的日志文件
-            log_file_path = "mining_log.txt"
-            self.log_message(f"挖矿日志将于5分钟左右显示在界面上")
+            for name, cmd, _ in instances:
+                self.log_message(f"开始挖矿{f' [{name}]' if name else ''}: {' '.join(cmd)}")
             
-            # 启动挖矿进程，隐藏cmd窗口，并配置输出捕获
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW  # 隐藏窗口
-            startupinfo.wShowWindow = subprocess.SW_HIDE
+            self.log_message(f"挖矿日志将于5分钟左右显示在界面上")
             
-            # 在Windows上，使用优化的进程创建参数
-            creationflags = 0
-            if sys.platform == 'win32':
-                creationflags = subprocess.CREATE_NO_WINDOW
+            # 挖矿输出流水线：显示、解析为事件（统计和连接监测订阅这些事件）、写入日志文件
+            pipeline = MiningOutputPipeline(config, display=self.log_message, log=self.log_message,
+                                            names=[name for name, _, _ in instances])
+            self.mining_stats = pipeline.stats
+            self.hashrate_history.attach(pipeline)
+            pipeline.open()
+            self.log_message("开始捕获挖矿输出，预计5分钟显示挖矿日志")
             
-            # 使用优化的参数启动进程，确保实时捕获输出
-            self.mining_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,  # 将标准错误也重定向到标准输出
-                text=True,
-                bufsize=0,  # 无缓冲模式，实时捕获输出
-                universal_newlines=True,
-                shell=False,
-                startupinfo=startupinfo,
-                creationflags=creationflags,
-                close_fds=True
-            )
+            # 由监督线程的asyncio事件循环启动进程、读取输出，进程退出时立即回调
+            try:
+                pids = self.supervisor.start(
+                    instances,
+                    on_lines=pipeline.handle_instance_lines,
+                    on_exit=lambda returncode, stop_requested: self._on_mining_process_exit(
+                        returncode, stop_requested, pipeline, session),
+                    on_instance_exit=pipeline.instance_exited
+                ).result()
+            except Exception:
+                pipeline.close(self.supervisor.stats())
+                raise
             
             # 记录进程启动信息
-            self.log_message(f"挖矿进程已启动，PID: {self.mining_process.pid}")
-            
-            # 启动连接监测线程
-            connection_thread = threading.Thread(target=self._monitor_mining_connection)
-            connection_thread.daemon = True
-            connection_thread.start()
+            self.log_message(f"挖矿进程已启动，PID: {', '.join(str(pid) for pid in pids)}")
             
-            # 启动日志读取线程
-            log_thread = threading.Thread(target=self._read_mining_output, args=(log_file_path,))
-            log_thread.daemon = True
-            log_thread.start()
+            # 矿池检测和监测连接在进入MINING之前启动：之后的停止由状态监听器负责停止它们，
+            # 启动期间用户已点击停止时在这里停止，不会留下后台线程。回调都绑定本次会话
+            selector = self.pool_selector if len(settings.get('pools', ())) > 1 else None
+            if selector is not None:
+                # 持续检测所有矿池，当前矿池变差时按新的顺序重启挖矿程序
+                selector.start(lambda order: self.ui.call(
+                    self._auto_restart, session, base_settings, "当前矿池变差，按新的矿池顺序重启挖矿"))
+            # 自己连接矿池接收任务，与挖矿程序报告的任务比对，挖矿连接卡住时重启挖矿程序
+            monitor = stratum_monitor.create_monitor(
+                pipeline, settings, config, log=self.log_message,
+                on_stuck=lambda name: self.ui.call(
+                    self._auto_restart, session, base_settings, "挖矿连接卡住，重启挖矿程序"))
+            self.stratum_monitor = monitor
+            # 启动期间用户点击了停止时，停止请求会在启动完成后由监督线程处理
+            if not self.session_state.transition(MINING, session):
+                if selector is not None:
+                    selector.stop()
+                if monitor is not None:
+                    monitor.stop()
             
-            # 等待进程结束或被停止
-            while self.is_mining and self.mining_process.poll() is None:
-                time.sleep(0.1)  # 检查进程状态
-            
-            # 进程结束后的处理
-            if self.mining_process and self.mining_process.poll() is not None:
-                self.log_message(f"挖矿进程结束，退出代码: {self.mining_process.returncode}")
-                if self.is_mining:  # 如果不是主动停止的
-                    self.status_var.set("挖矿意外停止")
-                    self.reset_buttons()
-                    
+
         except Exception as e:
             self.log_message(f"挖矿过程中发生错误: {str(e)}")
             print(f"详细错误: {repr(e)}")
             import traceback
             traceback.print_exc()
-            self.status_var.set("挖矿已停止")
-            self.reset_buttons()
+            self.session_state.transition(IDLE, session, detail="挖矿已停止")
     
-    def _read_mining_output(self, log_file_path):
-        """独立线程读取挖矿输出，确保实时性"""
-        try:
-            with open(log_file_path, 'a', encoding='utf-8') as log_file:
-                # 添加时间戳标记新的挖矿会话开始
-                session_start = f"\n=== 挖矿会话开始于 {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n"
-                log_file.write(session_start)
-                log_file.flush()
-                
-                self.log_message("开始捕获挖矿输出，预计5分钟显示挖矿日志")
-                
-                while self.is_mining and self.mining_process and self.mining_process.poll() is None:
-                    try:
-                        # 使用非阻塞方式读取输出
-                        import select
-                        import io
-                        
-                        if sys.platform == 'win32':
-                            # Windows下直接读取，设置小的超时时间
-                            try:
-                                # 使用非阻塞读取模式
-                                import msvcrt
-                                import os
-                                
-                                # 尝试读取一行
-                                line = self.mining_process.stdout.readline()
-                                if line:
-                                    line = line.strip()
-                                    if line:  # 只处理非空行
-                                        # 在GUI中显示日志（线程安全）
-                                        self.log_message(line)
-                                        # 立即写入日志文件
-                                        log_file.write(f"[{time.strftime('%H:%M:%S')}] {line}\n")
-                                        log_file.flush()  # 强制刷新到磁盘
-                                        
-                                        # 强制GUI更新（在主线程中执行）
-                                        self.root.after_idle(lambda: None)
-                                else:
-                                    # 没有输出时短暂休眠
-                                    time.sleep(0.001)  # 1毫秒
-                            except Exception as read_error:
-                                if "temporarily unavailable" not in str(read_error).lower():
-                                    self.log_message(f"读取输出异常: {str(read_error)}")
-                                time.sleep(0.01)
-                        else:
-                            # 非Windows系统使用select
-                            ready, _, _ = select.select([self.mining_process.stdout], [], [], 0.1)
-                            if ready:
-                                line = self.mining_process.stdout.readline()
-                                if line:
-                                    line = line.strip()
-                                    if line:
-                                        self.log_message(line)
-                                        log_file.write(f"[{time.strftime('%H:%M:%S')}] {line}\n")
-                                        log_file.flush()
-                                        
-                    except Exception as e:
-                        error_msg = str(e)
-                        if "temporarily unavailable" not in error_msg.lower() and "broken pipe" not in error_msg.lower():
-                            self.log_message(f"读取输出时出错: {error_msg}")
-                        time.sleep(0.01)
-                
-                # 添加时间戳标记挖矿会话结束
-                session_end = f"=== 挖矿会话结束于 {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n\n"
-                log_file.write(session_end)
-                log_file.flush()
-                
-        except Exception as e:
-            self.log_message(f"日志读取线程异常: {str(e)}")
-    
-    def _monitor_mining_connection(self):
-        """监测挖矿连接状态，检测是否需要VPN"""
-        connection_timeout = 120  # 2分钟超时
-        start_time = time.time()
-        connection_established = False
-        vpn_warning_shown = False
-        cpu_activity_detected = False
-        
-        self.log_message("🔍 开始监测矿池连接状态...")
-        
-        while self.is_mining and self.mining_process and self.mining_process.poll() is None:
-            current_time = time.time()
-            elapsed_time = current_time - start_time
-            
-            # 检查是否已经连接成功
-            if not connection_established:
-                # 检查日志中是否有连接成功的标志
-                try:
-                    if os.path.exists("mining_log.txt"):
-                        with open("mining_log.txt", 'r', encoding='utf-8') as f:
-                            log_content = f.read().lower()
-                            
-                            # 更严格的连接成功检测 - 只有当真正开始挖矿时才认为成功
-                            real_mining_indicators = [
-                                'job received', 'new job', 'difficulty set to',
-                                'share accepted', 'accepted share', 'cpu result',
-                                'hash rate', 'hashrate', 'h/s', 'mh/s', 'kh/s',
-                                'randomscash algorithm', 'mining started',
-                                '接受任务', '开始挖矿', '哈希率',
-                                'result accepted', 'shares: '
-                            ]
-                            
-                            # 检查是否真正开始挖矿（有实际工作输出）
-                            if any(indicator in log_content for indicator in real_mining_indicators):
-                                connection_established = True
-                                cpu_activity_detected = True
-                                self.log_message("✅ 矿池连接成功，已开始正常挖矿作业")
-                                break
-                            
-                            # 检查连接失败的标志
-                            connection_error_indicators = [
-                                'connection failed', 'connection refused', 'connection timeout',
-                                'failed to connect', 'unable to connect', 'network unreachable',
-                                'host unreachable', 'connection reset', 'socket error',
-                                'getaddrinfo failed', 'name resolution failed', 'dns lookup failed',
-                                'connection timed out', 'no route to host', 'network is unreachable',
-                                'pool connection error', 'pool not reachable', 'connect error',
-                                '连接失败', '连接被拒绝', '连接超时', '网络不可达',
-                                'error: failed to', 'cannot connect to', 'connection lost'
-                            ]
-                            
-                            # 检查devfee相关错误（特殊处理）
-                            devfee_error_indicators = [
-                                'couldn\'t get active devfee pools', 'devfee pool connection failed',
-                                'devfee pool error', 'devfee network error', 'devfee pools - check your internet',
-                                'devfee pools - check your firewall', 'couldn\'t get active devfee pools - check your internet/firewall!',
-                                'devfee connection failed', 'devfee - check your internet', 'devfee - check your firewall',
-                                'couldn\'t connect to devfee', 'devfee pools unreachable', 'devfee timeout'
-                            ]
-                            
-                            # 检查是否有devfee相关错误
-                            if any(error in log_content for error in devfee_error_indicators):
-                                if not vpn_warning_shown:
-                                    vpn_warning_shown = True
-                                    self.log_message("⚠️ 检测到SRBMiner的devfee池连接问题")
-                                    self.log_message("💡 这是开发费功能，连接失败不会影响您的挖矿收益")
-                                    self.log_message("🔧 提示：可以启用VPN或检查防火墙设置，但不影响正常挖矿")
-                                    self.log_message("📌 重要：程序会继续运行，SRBMiner会自己处理这个问题")
-                                    self.log_message("✅ 您的挖矿收益不会受到任何影响，请放心继续挖矿")
-                                # 特别注意：devfee错误绝对不能导致挖矿退出，继续监控
-                            
-                            # 检查是否有明确的连接错误（仅提示，不终止挖矿）
-                            elif any(error in log_content for error in connection_error_indicators):
-                                if not vpn_warning_shown:
-                                    vpn_warning_shown = True
-                                    self.log_message("🚫 检测到连接错误，可能是网络波动或该矿池需要VPN")
-                                    self.log_message("💡 提示：如果连接问题持续，建议检查VPN设置或等待网络恢复")
-                                    # 不再主动终止挖矿，让SRBMiner自己处理网络问题
-                                # 继续监控而不是break
-                                
-                except Exception as e:
-                    pass  # 忽略读取错误
-            
-            time.sleep(5)  # 每5秒检查一次
+    def _on_mining_process_exit(self, returncode, stop_requested, pipeline, session):
+        """挖矿进程退出后立即执行（在监督线程中执行）"""
+        pipeline.close(self.supervisor.stats())
+        self.log_message(f"挖矿进程结束，退出代码: {returncode}")
+        if not stop_requested:  # 如果不是主动停止的
+            self.session_state.transition(IDLE, session, detail="挖矿意外停止")
     
-    def _show_vpn_warning(self):
-        """显示VPN警告信息（仅提示，不终止挖矿）"""
-        current_pool = self.pool_entry.get().strip()
-        warning_msg = (
-            "⚠️ 矿池连接警告\n\n"
-            "检测到可能的连接问题，但继续运行挖矿程序\n"
-            "（SRBMiner会自动处理网络波动和重连）\n\n"
-            "🔍 可能的原因：\n"
-            "1. 网络临时波动（通常会自动恢复）\n"
-            "2. 矿池需要VPN网络才能访问\n"
-            "3. 本地网络限制或防火墙阻止\n"
-            "4. 矿池服务器维护或不可用\n\n"
-            "💡 建议：\n"
-            "- 如果是临时网络问题，请等待自动恢复\n"
-            "- 如果问题持续，可考虑启用VPN或更换矿池\n"
-            "- 避免频繁重启，让挖矿程序自行处理\n\n"
-            f"📝 当前矿池: {current_pool}\n"
-            f"🕰 检测时间: {time.strftime('%H:%M:%S')}"
-        )
-        
-        self.log_message(warning_msg)
-        # 移除弹窗和主动停止挖矿的逻辑，只记录日志
-    
-    def _show_immediate_vpn_warning(self, test_results):
+    def _show_immediate_vpn_warning(self, test_results, pool_address):
         """立即显示VPN警告，用于启动前网络测试失败"""
-        current_pool = self.pool_entry.get().strip()
+        current_pool = pool_address.strip()
         
         # 生成详细的错误信息
         error_details = ""
@@ -1104,7 +1125,6 @@ class ScashMinerGUI:
             f"🕰 测试时间: {time.strftime('%H:%M:%S')}\n\n"
             "🔍 网络测试结果:\n"
             f"DNS解析: {'✅ 成功' if test_results.get('dns_success') else '❌ 失败'}\n"
-            f"Ping测试: {'✅ 成功' if test_results.get('ping_success') else '❌ 失败'}\n"
             f"TCP连接: {'✅ 成功' if test_results.get('socket_success') else '❌ 失败'}\n\n"
         )
         
@@ -1130,7 +1150,6 @@ class ScashMinerGUI:
                     f"矿池地址: {current_pool}\n\n"
                     "🔍 网络测试结果:\n"
                     f"DNS解析: {'✅' if test_results.get('dns_success') else '❌'}\n"
-                    f"Ping测试: {'✅' if test_results.get('ping_success') else '❌'}\n"
                     f"TCP连接: {'✅' if test_results.get('socket_success') else '❌'}\n\n"
                     "🔧 建议解决方案:\n"
                     "1. 先启用VPN网络后再尝试\n"
@@ -1140,86 +1159,94 @@ class ScashMinerGUI:
             except Exception as e:
                 pass  # 忽略弹窗错误
         
-        # 使用after在主线程中调用
-        self.root.after(100, show_immediate_warning_dialog)
+        # 在主线程中显示弹窗
+        self.ui.call(show_immediate_warning_dialog)
 
-    def stop_mining(self):
-        # 停止挖矿
+    def stop_mining(self, session=None, restart_settings=None):
+        # 停止挖矿（不阻塞界面，进程真正退出后再更新状态）；指定session时只停止该会话
+        if not self.session_state.transition(STOPPING, session):
+            return False
+        self.restart_settings = restart_settings
         self.log_message("开始停止挖矿操作")
-        self.is_mining = False
-        
-        success = False  # 记录是否成功停止
         
         # 等待线程状态变更
         if hasattr(self, 'mining_thread') and self.mining_thread and self.mining_thread.is_alive():
             self.log_message(f"挖矿线程状态: 仍在运行中，等待停止...")
         
-        # 终止主挖矿进程
-        if self.mining_process is not None:
-            try:
-                proc_id = self.mining_process.pid if hasattr(self.mining_process, 'pid') else "未知"
-                self.log_message(f"尝试终止挖矿进程 (PID: {proc_id})")
-                
-                if self.mining_process.poll() is None:
-                    try:
-                        # 尝试优雅地终止进程
-                        self.mining_process.terminate()
-                        # 等待进程终止，最多等待3秒
-                        self.mining_process.wait(timeout=3)
-                        self.log_message("挖矿进程已优雅终止")
-                        success = True
-                    except subprocess.TimeoutExpired:
-                        # 如果超时，强制终止进程
-                        try:
-                            self.mining_process.kill()
-                            self.log_message("挖矿进程已被强制终止")
-                            success = True
-                        except Exception as e:
-                            self.log_message(f"终止挖矿进程失败: {str(e)}")
-                else:
-                    self.log_message(f"挖矿进程已结束，退出代码: {self.mining_process.returncode}")
-                    success = True
-            except Exception as e:
-                self.log_message(f"处理挖矿进程时出错: {str(e)}")
-        else:
-            self.log_message("没有活跃的挖矿进程")
+        if self.supervisor.running:
+            self.log_message(f"尝试终止挖矿进程 (PID: {', '.join(str(pid) for pid in self.supervisor.pids)})")
+        
+        # 终止主挖矿进程（由监督线程先优雅终止，超时后强制终止），完成后回调
+        self.supervisor.stop(timeout=3).add_done_callback(
+            lambda future: threading.Thread(target=self._finish_stop, args=(future,), daemon=True).start())
+        return True
+    
+    def _finish_stop(self, future):
+        """挖矿进程停止后执行（在后台线程中执行，避免阻塞界面和监督线程）"""
+        success = False  # 记录是否成功停止
+        try:
+            stop_result = future.result()
+            if stop_result == 'killed':
+                self.log_message("挖矿进程已被强制终止")
+            elif stop_result == 'terminated':
+                self.log_message("挖矿进程已优雅终止")
+            else:
+                self.log_message("没有活跃的挖矿进程")
             success = True
+        except Exception as e:
+            self.log_message(f"终止挖矿进程失败: {str(e)}")
         
-        # 如果上面的方法都失败，尝试使用taskkill命令
+        # 如果上面的方法失败，尝试使用taskkill命令
         if not success:
-            try:
-                self.log_message("尝试使用taskkill命令强制清理SRBMiner-MULTI进程")
-                # 使用taskkill命令强制终止所有相关进程
-                result = subprocess.run(["taskkill", "/F", "/IM", "SRBMiner-MULTI.exe", "/T"], 
-                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                                       text=True, check=False)
-                
-                if result.returncode == 0:
-                    self.log_message("成功清理SRBMiner-MULTI进程")
-                    if result.stdout.strip():
-                        self.log_message(f"清理结果: {result.stdout.strip()}")
-                else:
-                    # 返回代码不为0可能表示没有找到进程或其他错误
-                    if "ERROR: The process \"SRBMiner-MULTI.exe\" not found" in result.stderr:
-                        self.log_message("没有找到运行中的SRBMiner-MULTI进程（已经停止）")
-                    else:
-                        self.log_message(f"清理进程时出现问题: {result.stderr.strip()}")
-                        
-            except Exception as e:
-                self.log_message(f"执行taskkill命令时出错: {str(e)}")
-        
-        # 重置挖矿进程引用
-        self.mining_process = None
+            self.log_message("尝试使用taskkill命令强制清理SRBMiner-MULTI进程")
+            self._taskkill_miner()
         
         # 更新状态和按钮
-        self.status_var.set("挖矿已停止")
-        self.reset_buttons()
+        self.session_state.transition(IDLE, detail="挖矿已停止")
+        
+        if self.closing:
+            self.ui.call(self._finish_closing, True)
+        elif self.restart_settings is not None:
+            # 旧进程已退出，立即重新开始挖矿
+            settings, self.restart_settings = self.restart_settings, None
+            self.ui.call(self._begin_mining, settings)
+    
+    def _taskkill_miner(self):
+        """使用taskkill命令强制终止所有SRBMiner-MULTI进程"""
+        try:
+            image_name = miner_config.miner_image_name(self.config)
+            result = subprocess.run(["taskkill", "/F", "/IM", image_name, "/T"], 
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
+                                   text=True, check=False, timeout=5)
+            
+            if result.returncode == 0:
+                self.log_message("🧹 已清理所有SRBMiner-MULTI进程")
+                if result.stdout.strip():
+                    self.log_message(f"清理结果: {result.stdout.strip()}")
+            else:
+                # 返回代码不为0可能表示没有找到进程或其他错误
+                if "not found" not in result.stderr:
+                    self.log_message(f"⚠️ 清理进程时出现问题: {result.stderr.strip()}")
+                    
+        except Exception as e:
+            self.log_message(f"❌ 执行taskkill命令失败: {str(e)}")
     
     def restart_mining(self):
-        # 重启挖矿
-        self.stop_mining()
-        # 等待1秒后重新开始挖矿
-        self.root.after(1000, self.start_mining)
+        # 重启挖矿：等旧进程真正退出后立即重新开始
+        if self.session_state.state == IDLE:
+            self.start_mining()
+            return
+        if not self.validate_inputs():
+            return
+        self.stop_mining(restart_settings=self._read_settings())
+    
+    def _auto_restart(self, session, settings, reason):
+        """矿池检测或监测连接要求重启（在主线程中执行）：只在该会话仍在挖矿时重启，
+        用会话开始时的参数直接重启，不弹出对话框，无人值守时也不会卡住"""
+        if self.session_state.session != session or self.session_state.state != MINING:
+            return
+        if self.stop_mining(session, restart_settings=settings):
+            self.log_message(f"🔄 {reason}")
     
     def reset_buttons(self):
         # 重置按钮状态
@@ -1229,45 +1256,47 @@ class ScashMinerGUI:
         self.save_button.config(state=tk.NORMAL)
     
     def validate_inputs(self):
-        # 验证钱包地址
-        wallet_address = self.wallet_entry.get().strip()
-        if not wallet_address.startswith("scash"):
-            messagebox.showerror("错误", "钱包地址格式不正确，应该以'scash'开头")
-            return False
-        
-        # 验证矿工名称
-        worker_name = self.worker_entry.get().strip()
-        if not worker_name:
-            messagebox.showerror("错误", "矿工名称不能为空")
-            return False
-        
-        # 验证CPU核心数
-        try:
-            threads = int(self.threads_entry.get().strip())
-            if threads <= 0:
-                messagebox.showerror("错误", "CPU核心数必须大于0")
-                return False
-        except ValueError:
-            messagebox.showerror("错误", "CPU核心数必须是数字")
+        # 验证钱包地址、矿工名称、CPU核心数和矿池地址
+        settings = self._read_settings()
+        error = miner_config.validate_settings(settings)
+        if error:
+            messagebox.showerror("错误", error)
             return False
         
-        # 验证矿池地址
-        pool_address = self.pool_entry.get().strip()
-        if not pool_address.startswith("stratum+tcp://"):
-            messagebox.showerror("错误", "矿池地址格式不正确，应该以'stratum+tcp://'开头")
-            return False
+        # 线程数明显不合理时提示（例如超过逻辑CPU数），由用户决定是否继续
+        warning = cpu_topology.check_threads(int(settings['cpu_threads'].strip()), self.cpu_topology)
+        if warning:
+            return messagebox.askyesno(
+                "线程数提示",
+                f"{warning}。\n\n推荐线程数: {self.cpu_topology.recommended_threads()}\n\n是否仍然继续？"
+            )
         
         return True
 
 if __name__ == "__main__":
+    # 主机诊断：检查RandomX相关的主机设置并输出报告
+    if '--diagnose' in sys.argv[1:]:
+        sys.exit(host_advisor.main([arg for arg in sys.argv[1:] if arg != '--diagnose']))
+    
+    # 局域网stratum代理：多台矿机通过本机的一条或几条上游连接挖矿
+    if '--proxy' in sys.argv[1:]:
+        import stratum_proxy
+        sys.exit(stratum_proxy.main([arg for arg in sys.argv[1:] if arg != '--proxy']))
+    
+    # 日志回放：把已有的挖矿日志重新送入输出处理流水线，无界面时直接输出回放报告
+    replay_args = None
+    if '--replay' in sys.argv[1:]:
+        if '--headless' in sys.argv[1:] or not TK_AVAILABLE:
+            sys.exit(log_replay.main([arg for arg in sys.argv[1:] if arg != '--headless']))
+        replay_args = log_replay.build_parser().parse_args(sys.argv[1:])
+    
+    # 无界面模式：不创建Tk窗口，日志输出到标准输出
+    if '--headless' in sys.argv[1:] or not TK_AVAILABLE:
+        import headless
+        sys.exit(headless.main([arg for arg in sys.argv[1:] if arg != '--headless']))
+    
     # 打印调试信息
-    print(f"Python版本: {platform.python_version()}")
-    print(f"操作系统: {platform.system()} {platform.release()} {platform.architecture()}")
-    print(f"当前工作目录: {os.getcwd()}")
-    print(f"Python解释器路径: {sys.executable}")
-    print(f"是否打包: {'是' if hasattr(sys, 'frozen') else '否'}")
-    if hasattr(sys, '_MEIPASS'):
-        print(f"MEIPASS路径: {sys._MEIPASS}")
+    host_advisor.print_environment_info()
     
     # 检查scash-logo.png文件是否存在
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1291,4 +1320,6 @@ if __name__ == "__main__":
     
     root = tk.Tk()
     app = ScashMinerGUI(root)
+    if replay_args is not None:
+        root.after(500, lambda: app.start_replay(replay_args.path, replay_args.speed, replay_args.session))
     root.mainloop()
\ No newline at end of file
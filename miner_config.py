@@ -0,0 +1,212 @@
+import copy
+import json
+import os
+import socket
+import subprocess
+import sys
+
+CONFIG_PATH = "config.json"
+MINER_EXECUTABLE = "SRBMiner-MULTI.exe"
+COMMUNITY_POOL = "stratum+tcp://scash.work:9601"
+
+# 默认配置，与项目规范文档一致，增加新的优化参数
+DEFAULT_CONFIG = {
+    "wallet_address": "scash1qtvj3eryz8p46e9nu7zzn7yfg49j7lkns4t2698",
+    "worker_name": "x",
+    "cpu_threads": "20",
+    "cpu_threads_by_host": {},
+    "pool_address": COMMUNITY_POOL,
+    "pools": [],
+    "pool_probe_interval": "60",
+    "stratum_monitor": False,
+    "proxy_listen": "0.0.0.0:3333",
+    "proxy_upstreams": "1",
+    "use_tls": True,
+    "use_keepalive": True,
+    "use_wallet_worker_format": True,
+    "retry_time": "30",
+    "send_stales": False,
+    "miner_path": MINER_EXECUTABLE,
+    "hugepages_reserve": False,
+    "multi_instance": "off",
+    "cpu_sets": [],
+    "log_max_lines": "5000",
+    "log_queue_size": "10000",
+    "log_queue_overflow": "drop_oldest",
+    "self_monitor": True,
+    "log_rotate": "size",
+    "log_max_mb": "50",
+    "log_backup_count": "7",
+    "log_compression": "gzip",
+    "log_flush_interval": "1"
+}
+
+# 启动挖矿时需要的参数（GUI中可编辑的部分）
+SETTING_KEYS = ("wallet_address", "worker_name", "cpu_threads", "pool_address", "use_wallet_worker_format")
+
+
+def _write_config(config, config_path):
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+
+
+def load_config(config_path=CONFIG_PATH, log=print):
+    """优先从config.json加载配置，如果不存在则创建默认配置"""
+    default_config = copy.deepcopy(DEFAULT_CONFIG)
+
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+                # 确保所有必要的配置项都存在，添加新参数
+                for key, value in default_config.items():
+                    if key not in config:
+                        config[key] = value
+                return config
+        except Exception as e:
+            log(f"读取配置文件失败: {str(e)}")
+            # 即使读取失败，也尝试创建一个新的配置文件
+            try:
+                _write_config(default_config, config_path)
+                log("已创建新的配置文件")
+            except Exception as e2:
+                log(f"创建配置文件失败: {str(e2)}")
+            return default_config
+    else:
+        # 如果配置文件不存在，创建默认配置文件
+        try:
+            _write_config(default_config, config_path)
+            log("已创建默认配置文件")
+        except Exception as e:
+            log(f"创建默认配置文件失败: {str(e)}")
+        return default_config
+
+
+def save_config(config, config_path=CONFIG_PATH):
+    """保存配置（移除会影响挖矿的TLS和Keepalive配置）"""
+    config = dict(config)
+    config.pop('use_tls', None)
+    config.pop('use_keepalive', None)
+    _write_config(config, config_path)
+    return config
+
+
+def host_name():
+    """当前主机名，用于按主机保存的配置"""
+    return socket.gethostname()
+
+
+def host_cpu_threads(config, host=None):
+    """本机的CPU线程数：优先使用自动调优为本机保存的值"""
+    by_host = config.get('cpu_threads_by_host') or {}
+    return str(by_host.get(host or host_name(), config.get('cpu_threads', DEFAULT_CONFIG['cpu_threads'])))
+
+
+def set_host_cpu_threads(config, threads, host=None):
+    """为本机保存CPU线程数（多台矿机可共用同一个config.json）"""
+    by_host = config.get('cpu_threads_by_host') or {}
+    by_host[host or host_name()] = str(threads)
+    config['cpu_threads_by_host'] = by_host
+    return config
+
+
+def settings_from_config(config):
+    """从配置中取出启动挖矿需要的参数"""
+    settings = {key: config.get(key, DEFAULT_CONFIG[key]) for key in SETTING_KEYS}
+    settings['cpu_threads'] = host_cpu_threads(config)
+    return settings
+
+
+def miner_command_prefix(miner_path):
+    """挖矿程序的启动命令；.py 结尾时用当前Python解释器运行（用于模拟挖矿程序）"""
+    if miner_path.endswith('.py'):
+        return [sys.executable, miner_path]
+    return [miner_path]
+
+
+def miner_image_name(config):
+    """挖矿程序的进程映像名，用于taskkill清理"""
+    return os.path.basename(config.get('miner_path') or MINER_EXECUTABLE)
+
+
+def validate_settings(settings):
+    """检查挖矿参数，有问题时返回错误提示，否则返回None"""
+    # 验证钱包地址
+    if not str(settings.get('wallet_address', '')).strip().startswith("scash"):
+        return "钱包地址格式不正确，应该以'scash'开头"
+
+    # 验证矿工名称
+    if not str(settings.get('worker_name', '')).strip():
+        return "矿工名称不能为空"
+
+    # 验证CPU核心数
+    try:
+        if int(str(settings.get('cpu_threads', '')).strip()) <= 0:
+            return "CPU核心数必须大于0"
+    except ValueError:
+        return "CPU核心数必须是数字"
+
+    # 验证矿池地址
+    if not str(settings.get('pool_address', '')).strip().startswith("stratum+tcp://"):
+        return "矿池地址格式不正确，应该以'stratum+tcp://'开头"
+
+    return None
+
+
+def pool_list(settings, config, log=print):
+    """首选矿池加上配置中的备用矿池（去重，忽略格式不正确的地址）"""
+    pools = []
+    for pool in [settings['pool_address']] + list(config.get('pools') or []):
+        pool = str(pool).strip()
+        if not pool.startswith("stratum+tcp://"):
+            log(f"⚠️ 忽略格式不正确的备用矿池: {pool}")
+            continue
+        if pool not in pools:
+            pools.append(pool)
+    return pools
+
+
+def build_miner_command(settings, config, log=print):
+    """根据挖矿参数和配置构建SRBMiner命令行"""
+    wallet_address = settings['wallet_address']
+    worker_name = settings['worker_name']
+
+    # 构建钱包地址，根据配置决定是否使用 wallet.worker 格式
+    if settings['use_wallet_worker_format'] and worker_name.strip():
+        # 使用 wallet.worker 格式（推荐）
+        full_wallet_address = f"{wallet_address}.{worker_name}"
+        log(f"💼 使用 wallet.worker 格式: {full_wallet_address}")
+        password_param = "x"  # 传统密码参数用默认值
+    else:
+        # 使用传统的分离格式
+        full_wallet_address = wallet_address
+        password_param = worker_name if worker_name.strip() else "x"
+        log(f"💼 使用传统格式: wallet={full_wallet_address}, password={password_param}")
+
+    # 有多个矿池时按排名顺序用逗号分隔传给SRBMiner作为故障转移矿池，每个矿池对应一组钱包和密码
+    pools = settings.get('pools') or [settings['pool_address']]
+
+    # 构建挖矿命令，移除TLS和Keepalive参数
+    return miner_command_prefix(config.get('miner_path') or MINER_EXECUTABLE) + [
+        "--algorithm", "randomscash",
+        "--pool", ",".join(pools),
+        "--wallet", ",".join([full_wallet_address] * len(pools)),
+        "--password", ",".join([password_param] * len(pools)),
+        "--cpu-threads", str(settings['cpu_threads']),
+        "--randomx-use-largepages",
+        "--send-stales", str(config.get('send_stales', False)).lower(),
+        "--retry-time", str(config.get('retry_time', '30')),
+        "--gpu-off"
+    ]
+
+
+def hidden_window_kwargs():
+    """启动子进程时隐藏cmd窗口的参数（仅Windows）"""
+    popen_kwargs = {}
+    if sys.platform == 'win32':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW  # 隐藏窗口
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        popen_kwargs['startupinfo'] = startupinfo
+        popen_kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    return popen_kwargs
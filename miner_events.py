@@ -0,0 +1,399 @@
+import re
+import threading
+import time
+
+import log_classifier
+
+# 哈希率单位换算为 H/s
+HASHRATE_UNITS = {
+    'h/s': 1.0,
+    'kh/s': 1e3,
+    'mh/s': 1e6,
+    'gh/s': 1e9,
+    'th/s': 1e12,
+}
+
+
+class MinerEvent:
+    """SRBMiner输出解析得到的事件基类"""
+    __slots__ = ('timestamp',)
+    kind = 'event'
+
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields())
+        return f"{self.__class__.__name__}({fields})"
+
+    @classmethod
+    def _fields(cls):
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(getattr(klass, '__slots__', ()))
+        return fields
+
+    def to_dict(self):
+        """转换为字典，便于导出"""
+        data = {'kind': self.kind}
+        for name in self._fields():
+            data[name] = getattr(self, name)
+        return data
+
+
+class HashrateEvent(MinerEvent):
+    """哈希率输出，values为 统计窗口 -> H/s（窗口未知时键为None）"""
+    __slots__ = ('values',)
+    kind = 'hashrate'
+
+    def __init__(self, timestamp, values):
+        super().__init__(timestamp)
+        self.values = values
+
+    @property
+    def hashrate(self):
+        """优先返回最短统计窗口的哈希率"""
+        if not self.values:
+            return None
+        return self.values[min(self.values, key=_window_seconds)]
+
+
+class ShareEvent(MinerEvent):
+    """份额提交结果"""
+    __slots__ = ('accepted', 'latency_ms', 'reason')
+    kind = 'share'
+
+    def __init__(self, timestamp, accepted, latency_ms=None, reason=None):
+        super().__init__(timestamp)
+        self.accepted = accepted
+        self.latency_ms = latency_ms
+        self.reason = reason
+
+
+class JobEvent(MinerEvent):
+    """收到矿池下发的新任务"""
+    __slots__ = ('difficulty', 'height')
+    kind = 'job'
+
+    def __init__(self, timestamp, difficulty=None, height=None):
+        super().__init__(timestamp)
+        self.difficulty = difficulty
+        self.height = height
+
+
+class DifficultyEvent(MinerEvent):
+    """矿池难度变化"""
+    __slots__ = ('difficulty',)
+    kind = 'difficulty'
+
+    def __init__(self, timestamp, difficulty):
+        super().__init__(timestamp)
+        self.difficulty = difficulty
+
+
+class PoolEvent(MinerEvent):
+    """矿池连接/断开"""
+    __slots__ = ('connected', 'pool', 'reason')
+    kind = 'pool'
+
+    def __init__(self, timestamp, connected, pool=None, reason=None):
+        super().__init__(timestamp)
+        self.connected = connected
+        self.pool = pool
+        self.reason = reason
+
+
+class DevfeeEvent(MinerEvent):
+    """devfee切换或错误，state为 'start' / 'end' / 'error'"""
+    __slots__ = ('state', 'message')
+    kind = 'devfee'
+
+    def __init__(self, timestamp, state, message=None):
+        super().__init__(timestamp)
+        self.state = state
+        self.message = message
+
+
+class LargePagesEvent(MinerEvent):
+    """挖矿程序报告的大页使用情况"""
+    __slots__ = ('enabled', 'message')
+    kind = 'large_pages'
+
+    def __init__(self, timestamp, enabled, message=None):
+        super().__init__(timestamp)
+        self.enabled = enabled
+        self.message = message
+
+
+def _window_seconds(window):
+    """把 '10s' / '1m' / '1h' 之类的统计窗口转换为秒，未知窗口排在最后"""
+    if window is None:
+        return float('inf')
+    value, unit = int(window[:-1]), window[-1]
+    return value * {'s': 1, 'm': 60, 'h': 3600}[unit]
+
+
+# 各类事件的解析正则（输入均为小写）
+HASHRATE_VALUE_RE = re.compile(r'(?:\b(\d+[smh])\b\s*[:=]?\s*)?(\d+(?:\.\d+)?)\s*([kmgt]?h/s)')
+LATENCY_RE = re.compile(r'(\d+(?:\.\d+)?)\s*ms\b')
+REJECT_REASON_RE = re.compile(r'rejected!?\s*[\[(]?\s*(?:reason:?\s*)?([^\])]+)')
+DIFFICULTY_RE = re.compile(r'\bdiff(?:iculty)?(?:\s+set\s+to|\s*[:=])?\s*(\d+(?:\.\d+)?)\s*([kmgt]?)\b')
+HEIGHT_RE = re.compile(r'\bheight\s*[:=]?\s*(\d+)')
+POOL_CONNECTED_RE = re.compile(r'\bconnected to\s+(?:pool\s+)?\[?([\w.\-]+(?::\d+)?)')
+POOL_ADDRESS_RE = re.compile(r'([a-z0-9][\w.\-]*\.[a-z]{2,}(?::\d+)?|\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?)')
+DEVFEE_START_RE = re.compile(r'devfee.*\b(?:start|started|starting|switch(?:ing)? to|mining)\b|switch(?:ing)? to devfee')
+LARGE_PAGES_RE = re.compile(r'\b(?:large|huge)[\s\-]?pages?\b')
+LARGE_PAGES_FAIL_RE = re.compile(r"fail|unable|could ?n[o']t|cannot|can't|not (?:available|enabled|supported|allocated)"
+                                 r"|error|disabled|without|\b0%")
+LARGE_PAGES_OK_RE = re.compile(r'enabled|allocated|using|success|\bok\b|\byes\b|100%')
+DEVFEE_END_RE = re.compile(r'devfee.*\b(?:end|ended|finished|done|stopped)\b|switch(?:ing)? back')
+
+DIFFICULTY_SUFFIX = {'': 1, 'k': 1e3, 'm': 1e6, 'g': 1e9, 't': 1e12}
+
+
+def _parse_difficulty(text):
+    match = DIFFICULTY_RE.search(text)
+    if not match:
+        return None
+    return float(match.group(1)) * DIFFICULTY_SUFFIX[match.group(2)]
+
+
+class MinerOutputParser:
+    """把SRBMiner-MULTI的输出行解析为事件，并分发给订阅者"""
+
+    def __init__(self, classifier=None):
+        self.classifier = classifier or log_classifier.default_classifier
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, event_types=None):
+        """订阅事件；event_types为事件类的元组，None表示订阅全部事件"""
+        with self._lock:
+            self._subscribers = self._subscribers + [(callback, event_types)]
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [item for item in self._subscribers if item[0] != callback]
+
+    def feed_line(self, line, timestamp=None, flags=None):
+        """解析一行输出，返回解析出的事件列表并通知订阅者"""
+        events = self.parse_line(line, timestamp, flags)
+        for event in events:
+            self.publish(event)
+        return events
+
+    def publish(self, event):
+        """把一个事件通知给订阅者（也用于把多个挖矿实例的事件汇总到同一个解析器）"""
+        for callback, event_types in self._subscribers:
+            if event_types is None or isinstance(event, event_types):
+                try:
+                    callback(event)
+                except Exception:
+                    # 订阅者的错误不能影响输出读取
+                    pass
+
+    def parse_line(self, line, timestamp=None, flags=None):
+        """解析一行输出，返回事件列表（不通知订阅者）"""
+        if flags is None:
+            flags = self.classifier.classify(line)
+        text = line.lower()
+        devfee = 'devfee' in text
+        large_pages = 'pages' in text and LARGE_PAGES_RE.search(text)
+        # 先用分类器的结果过滤，只有相关的行才运行对应的正则
+        if not flags and not devfee and not large_pages:
+            return []
+        if timestamp is None:
+            timestamp = time.time()
+
+        events = []
+
+        if devfee:
+            if flags & (log_classifier.DEVFEE | log_classifier.ERROR | log_classifier.CONNECTION_ERROR):
+                events.append(DevfeeEvent(timestamp, 'error', line))
+            elif DEVFEE_END_RE.search(text):
+                events.append(DevfeeEvent(timestamp, 'end', line))
+            elif DEVFEE_START_RE.search(text):
+                events.append(DevfeeEvent(timestamp, 'start', line))
+            # devfee相关的行不计入用户矿池的统计
+            return events
+
+        if large_pages:
+            if LARGE_PAGES_FAIL_RE.search(text):
+                events.append(LargePagesEvent(timestamp, False, line))
+            elif LARGE_PAGES_OK_RE.search(text):
+                events.append(LargePagesEvent(timestamp, True, line))
+
+        if flags & (log_classifier.ACCEPTED | log_classifier.REJECTED):
+            latency = LATENCY_RE.search(text)
+            latency_ms = float(latency.group(1)) if latency else None
+            if flags & log_classifier.REJECTED:
+                reason = REJECT_REASON_RE.search(text)
+                events.append(ShareEvent(timestamp, False, latency_ms,
+                                         reason.group(1).strip() if reason else None))
+            else:
+                events.append(ShareEvent(timestamp, True, latency_ms))
+
+        if flags & log_classifier.HASHRATE:
+            values = {}
+            for window, value, unit in HASHRATE_VALUE_RE.findall(text):
+                values[window or None] = float(value) * HASHRATE_UNITS[unit]
+            if values:
+                events.append(HashrateEvent(timestamp, values))
+
+        if flags & log_classifier.JOB and ('job' in text or '接受任务' in text):
+            height = HEIGHT_RE.search(text)
+            events.append(JobEvent(timestamp, _parse_difficulty(text),
+                                   int(height.group(1)) if height else None))
+        elif 'difficulty' in text:
+            difficulty = _parse_difficulty(text)
+            if difficulty is not None:
+                events.append(DifficultyEvent(timestamp, difficulty))
+
+        if flags & (log_classifier.DISCONNECTED | log_classifier.CONNECTION_ERROR):
+            pool = POOL_ADDRESS_RE.search(text)
+            events.append(PoolEvent(timestamp, False, pool.group(1) if pool else None, line))
+        elif flags & log_classifier.CONNECTED:
+            pool = POOL_CONNECTED_RE.search(text)
+            events.append(PoolEvent(timestamp, True, pool.group(1) if pool else None))
+
+        return events
+
+
+class MiningStatistics:
+    """订阅挖矿事件，汇总本次会话的统计数据"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.hashrate = None
+        self.accepted = 0
+        self.rejected = 0
+        self.latency_total_ms = 0.0
+        self.latency_count = 0
+        self.jobs = 0
+        self.difficulty = None
+        self.pool_connected = False
+        self.disconnects = 0
+        self.large_pages = None  # 挖矿程序是否使用了大页（未报告时为None）
+        self.last_event_at = None
+
+    def attach(self, parser):
+        parser.subscribe(self.on_event)
+        return self
+
+    def on_event(self, event):
+        self.last_event_at = event.timestamp
+        if isinstance(event, HashrateEvent):
+            self.hashrate = event.hashrate
+        elif isinstance(event, ShareEvent):
+            if event.accepted:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            if event.latency_ms is not None:
+                self.latency_total_ms += event.latency_ms
+                self.latency_count += 1
+        elif isinstance(event, JobEvent):
+            self.jobs += 1
+            if event.difficulty is not None:
+                self.difficulty = event.difficulty
+        elif isinstance(event, DifficultyEvent):
+            self.difficulty = event.difficulty
+        elif isinstance(event, PoolEvent):
+            if event.connected:
+                self.pool_connected = True
+            elif self.pool_connected:
+                self.pool_connected = False
+                self.disconnects += 1
+        elif isinstance(event, LargePagesEvent):
+            # 任何一次分配失败都视为没有完全使用大页
+            self.large_pages = event.enabled if self.large_pages is None else (self.large_pages and event.enabled)
+
+    @property
+    def average_latency_ms(self):
+        if not self.latency_count:
+            return None
+        return self.latency_total_ms / self.latency_count
+
+    def summary(self):
+        """返回状态栏使用的简短统计文本"""
+        parts = []
+        if self.hashrate is not None:
+            parts.append(format_hashrate(self.hashrate))
+        parts.append(f"接受 {self.accepted} / 拒绝 {self.rejected}")
+        return " | ".join(parts)
+
+
+class RigStatistics:
+    """多个挖矿实例作为一台矿机的汇总统计：算力为各实例最新算力之和，份额数相加"""
+
+    def __init__(self, names):
+        self.started_at = time.time()
+        self.instances = {name: MiningStatistics() for name in names}
+
+    def attach(self, parser, name):
+        self.instances[name].attach(parser)
+        return self
+
+    @property
+    def hashrate(self):
+        values = [stats.hashrate for stats in self.instances.values() if stats.hashrate is not None]
+        return sum(values) if values else None
+
+    @property
+    def accepted(self):
+        return sum(stats.accepted for stats in self.instances.values())
+
+    @property
+    def rejected(self):
+        return sum(stats.rejected for stats in self.instances.values())
+
+    @property
+    def jobs(self):
+        return sum(stats.jobs for stats in self.instances.values())
+
+    @property
+    def disconnects(self):
+        return sum(stats.disconnects for stats in self.instances.values())
+
+    @property
+    def pool_connected(self):
+        return any(stats.pool_connected for stats in self.instances.values())
+
+    @property
+    def difficulty(self):
+        return next((stats.difficulty for stats in self.instances.values() if stats.difficulty is not None), None)
+
+    @property
+    def large_pages(self):
+        values = [stats.large_pages for stats in self.instances.values()]
+        if False in values:
+            return False
+        return True if values and all(values) else None
+
+    @property
+    def last_event_at(self):
+        return max((stats.last_event_at for stats in self.instances.values() if stats.last_event_at), default=None)
+
+    @property
+    def average_latency_ms(self):
+        count = sum(stats.latency_count for stats in self.instances.values())
+        if not count:
+            return None
+        return sum(stats.latency_total_ms for stats in self.instances.values()) / count
+
+    def summary(self):
+        """返回状态栏使用的简短统计文本"""
+        parts = [f"{len(self.instances)} 个实例"]
+        if self.hashrate is not None:
+            parts.append(format_hashrate(self.hashrate))
+        parts.append(f"接受 {self.accepted} / 拒绝 {self.rejected}")
+        return " | ".join(parts)
+
+
+def format_hashrate(value):
+    """把 H/s 数值格式化为易读的字符串"""
+    for unit, scale in (('TH/s', 1e12), ('GH/s', 1e9), ('MH/s', 1e6), ('KH/s', 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.2f} H/s"
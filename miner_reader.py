@@ -0,0 +1,28 @@
+import codecs
+
+
+class LineSplitter:
+    """增量解码字节流并按行切分，跨块的半行和多字节字符会保留到下一次"""
+
+    def __init__(self, encoding='utf-8', errors='replace'):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        self._partial = ""
+
+    def feed(self, data):
+        """输入一块字节数据，返回其中完整的行（不含换行符）"""
+        text = self._partial + self._decoder.decode(data)
+        # \r\n可能被拆在两块之间，末尾的\r留到下一块再处理
+        hold = ""
+        if text.endswith("\r"):
+            text, hold = text[:-1], "\r"
+        # SRBMiner在Windows下输出\r\n，也可能用单独的\r刷新同一行
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._partial = lines.pop() + hold
+        return lines
+
+    def flush(self):
+        """输出结束时返回剩余的半行"""
+        text = (self._partial + self._decoder.decode(b"", final=True)).rstrip("\r")
+        self._partial = ""
+        return [text] if text else []
+
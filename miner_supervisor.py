@@ -0,0 +1,363 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from miner_reader import LineSplitter
+
+
+class SupervisorLoop:
+    """在一个后台线程中运行的asyncio事件循环（第一次使用时启动），可由多个监督器共用"""
+
+    def __init__(self, name="MinerSupervisor"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._loop is not None
+
+    def ensure(self):
+        """返回事件循环，尚未启动时启动线程"""
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            ready = threading.Event()
+
+            def run_loop():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                ready.set()
+                loop.run_forever()
+                loop.close()
+
+            self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            return self._loop
+
+    def submit(self, coro):
+        """在事件循环线程中执行协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.ensure())
+
+    def shutdown(self, timeout=5.0):
+        """结束事件循环线程"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+class MinerSupervisor:
+    """在一个后台线程的asyncio事件循环中管理挖矿子进程：
+    启动、读取输出、立即感知退出、停止和重启。
+    传入 loop 时在该共用的事件循环中运行（多实例时全部实例共用一个线程），否则使用自己的"""
+
+    def __init__(self, chunk_size=64 * 1024, stop_timeout=3.0, loop=None):
+        self.chunk_size = chunk_size
+        self.stop_timeout = stop_timeout
+        self._owns_loop = loop is None
+        self._loop = SupervisorLoop() if loop is None else loop
+        self._process = None
+        self._task = None
+        self._op_lock = None  # 串行化启动/停止操作（在事件循环中创建）
+        self._stop_requested = False
+        # 当前会话的读取统计
+        self._started_at = None
+        self.bytes_read = 0
+        self.lines_read = 0
+
+    def _submit(self, coro):
+        """在监督线程中执行协程，返回 concurrent.futures.Future"""
+        return self._loop.submit(coro)
+
+    def shutdown(self, timeout=5.0):
+        """停止子进程；事件循环是自己的时同时结束事件循环线程"""
+        if not self._loop.running:
+            return
+        try:
+            self.stop().result(timeout)
+        except Exception:
+            pass
+        # 下次启动时事件循环可能已经换了，锁在新的事件循环中重新创建
+        self._op_lock = None
+        if self._owns_loop:
+            self._loop.shutdown(timeout)
+
+    # ---- 对外接口（可在任意线程调用）----
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def pid(self):
+        return self._process.pid if self._process is not None else None
+
+    def start(self, cmd, on_lines=None, on_exit=None, **popen_kwargs):
+        """启动挖矿进程；Future的结果为进程PID。
+        on_lines(lines) 在每读到一批输出行时调用，
+        on_exit(returncode, stop_requested) 在进程退出且输出读完后立即调用，
+        两个回调都在监督线程中执行"""
+        return self._submit(self._start(cmd, on_lines, on_exit, popen_kwargs))
+
+    def stop(self, timeout=None):
+        """停止挖矿进程；Future的结果为 'terminated' / 'killed' / 'not_running'"""
+        return self._submit(self._stop(self.stop_timeout if timeout is None else timeout))
+
+    def restart(self, cmd, on_lines=None, on_exit=None, **popen_kwargs):
+        """等旧进程真正退出后再启动新进程；Future的结果为新进程PID"""
+        return self._submit(self._restart(cmd, on_lines, on_exit, popen_kwargs))
+
+    def stats(self):
+        """返回当前会话的输出读取统计"""
+        elapsed = max(time.monotonic() - self._started_at, 1e-9) if self._started_at else 0.0
+        return {
+            'elapsed': elapsed,
+            'bytes': self.bytes_read,
+            'lines': self.lines_read,
+            'bytes_per_sec': self.bytes_read / elapsed if elapsed else 0.0,
+            'lines_per_sec': self.lines_read / elapsed if elapsed else 0.0,
+        }
+
+    # ---- 监督线程内部实现 ----
+
+    def _lock(self):
+        if self._op_lock is None:
+            self._op_lock = asyncio.Lock()
+        return self._op_lock
+
+    async def _start(self, cmd, on_lines, on_exit, popen_kwargs):
+        # 启动和停止按提交顺序执行，启动过程中收到的停止请求会在启动完成后处理
+        async with self._lock():
+            return await self._start_locked(cmd, on_lines, on_exit, popen_kwargs)
+
+    async def _start_locked(self, cmd, on_lines, on_exit, popen_kwargs):
+        if self.running:
+            raise RuntimeError(f"挖矿进程已在运行中 (PID: {self._process.pid})")
+        if self._task is not None:
+            # 上一个进程的输出可能还没读完，先等它结束
+            await self._task
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            **popen_kwargs
+        )
+        self._process = process
+        self._stop_requested = False
+        self._started_at = time.monotonic()
+        self.bytes_read = 0
+        self.lines_read = 0
+        self._task = asyncio.ensure_future(self._supervise(process, on_lines, on_exit))
+        return process.pid
+
+    async def _supervise(self, process, on_lines, on_exit):
+        """读取进程输出，进程一退出就通知，不等下一次轮询"""
+        reader = asyncio.ensure_future(self._read_output(process, on_lines))
+        returncode = await process.wait()
+        try:
+            # 给剩余输出一点时间读完；如果子进程的子进程仍占用管道，则不再等待
+            await asyncio.wait_for(reader, 1.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        if on_exit is not None:
+            try:
+                on_exit(returncode, self._stop_requested)
+            except Exception:
+                pass
+
+    async def _read_output(self, process, on_lines):
+        splitter = LineSplitter()
+        try:
+            while True:
+                data = await process.stdout.read(self.chunk_size)
+                if not data:
+                    lines = splitter.flush()
+                else:
+                    self.bytes_read += len(data)
+                    lines = splitter.feed(data)
+                if lines:
+                    self.lines_read += len(lines)
+                    if on_lines is not None:
+                        try:
+                            on_lines(lines)
+                        except Exception:
+                            pass
+                if not data:
+                    return
+        except Exception:
+            pass
+
+    async def _stop(self, timeout):
+        async with self._lock():
+            return await self._stop_locked(timeout)
+
+    async def _stop_locked(self, timeout):
+        process = self._process
+        if process is None or process.returncode is not None:
+            if self._task is not None:
+                await self._task
+            return 'not_running'
+
+        self._stop_requested = True
+        result = 'terminated'
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            pass
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            # 超时后强制终止
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            result = 'killed'
+
+        # 等待输出读完、退出回调执行完毕
+        if self._task is not None:
+            await self._task
+        return result
+
+    async def _restart(self, cmd, on_lines, on_exit, popen_kwargs):
+        async with self._lock():
+            await self._stop_locked(self.stop_timeout)
+            return await self._start_locked(cmd, on_lines, on_exit, popen_kwargs)
+
+
+def _combine_futures(futures, combine):
+    """所有Future完成后，用combine合并它们的结果"""
+    result = concurrent.futures.Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            result.set_result(combine([future.result() for future in futures]))
+        except Exception as e:
+            result.set_exception(e)
+
+    if not futures:
+        result.set_result(combine([]))
+    for future in futures:
+        future.add_done_callback(on_done)
+    return result
+
+
+class MinerGroup:
+    """把一个或多个挖矿进程（例如每个NUMA节点一个）作为一台矿机管理，
+    每个实例由各自的 MinerSupervisor 监督，全部实例共用一个事件循环线程"""
+
+    def __init__(self, chunk_size=64 * 1024, stop_timeout=3.0):
+        self.chunk_size = chunk_size
+        self.stop_timeout = stop_timeout
+        self._loop = SupervisorLoop()
+        self._supervisors = []
+        self._names = []
+
+    @property
+    def running(self):
+        return any(supervisor.running for supervisor in self._supervisors)
+
+    @property
+    def pids(self):
+        return [supervisor.pid for supervisor in self._supervisors if supervisor.running]
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def start(self, instances, on_lines=None, on_exit=None, on_instance_exit=None):
+        """启动全部实例；instances为 [(名称, 命令, popen参数)]，Future的结果为各实例的PID列表。
+        on_lines(name, lines) 在读到某个实例的输出时调用，
+        on_instance_exit(name, returncode, stop_requested) 在每个实例退出时调用，
+        on_exit(returncode, stop_requested) 在最后一个实例退出后调用一次"""
+        while len(self._supervisors) < len(instances):
+            self._supervisors.append(MinerSupervisor(self.chunk_size, self.stop_timeout, loop=self._loop))
+        self._names = [name for name, _, _ in instances]
+        remaining = [len(instances)]
+        results = []
+        failed = []
+        lock = threading.Lock()
+
+        def instance_exit(name, returncode, stop_requested):
+            if on_instance_exit is not None:
+                on_instance_exit(name, returncode, stop_requested)
+            with lock:
+                results.append((returncode, stop_requested))
+                remaining[0] -= 1
+                if remaining[0] or failed:
+                    return
+            if on_exit is not None:
+                # 全部实例都退出后只通知一次；有任何实例不是主动停止的都视为意外退出
+                unexpected = [code for code, requested in results if not requested]
+                on_exit(unexpected[0] if unexpected else results[-1][0], not unexpected)
+
+        futures = []
+        for supervisor, (name, cmd, popen_kwargs) in zip(self._supervisors, instances):
+            handler = None
+            if on_lines is not None:
+                handler = (lambda lines, name=name: on_lines(name, lines))
+            futures.append(supervisor.start(
+                cmd, on_lines=handler,
+                on_exit=lambda returncode, stop_requested, name=name: instance_exit(name, returncode, stop_requested),
+                **popen_kwargs))
+        started = _combine_futures(futures, list)
+
+        def on_started(future):
+            if future.exception() is not None:
+                # 有实例启动失败时停止已经启动的实例，由调用方处理启动失败，不再通知退出
+                with lock:
+                    failed.append(future.exception())
+                self.stop()
+
+        started.add_done_callback(on_started)
+        return started
+
+    def stop(self, timeout=None):
+        """停止全部实例；Future的结果为最严重的停止方式 'killed' / 'terminated' / 'not_running'"""
+        futures = [supervisor.stop(timeout) for supervisor in self._supervisors]
+
+        def worst(results):
+            for result in ('killed', 'terminated'):
+                if result in results:
+                    return result
+            return 'not_running'
+
+        return _combine_futures(futures, worst)
+
+    def stats(self):
+        """返回全部实例输出读取统计之和"""
+        totals = {'elapsed': 0.0, 'bytes': 0, 'lines': 0, 'bytes_per_sec': 0.0, 'lines_per_sec': 0.0}
+        for supervisor in self._supervisors[:len(self._names)]:
+            stats = supervisor.stats()
+            totals['elapsed'] = max(totals['elapsed'], stats['elapsed'])
+            for key in ('bytes', 'lines', 'bytes_per_sec', 'lines_per_sec'):
+                totals[key] += stats[key]
+        return totals
+
+    def shutdown(self, timeout=5.0):
+        """停止全部实例后结束共用的事件循环线程"""
+        if not self._loop.running:
+            return
+        try:
+            self.stop().result(timeout)
+        except Exception:
+            pass
+        for supervisor in self._supervisors:
+            supervisor.shutdown(timeout)
+        self._loop.shutdown(timeout)
@@ -0,0 +1,150 @@
+import time
+
+from log_writer import MiningLogWriter
+from miner_events import (MinerOutputParser, MiningStatistics, RigStatistics, HashrateEvent,
+                          ShareEvent, JobEvent, DifficultyEvent, PoolEvent, DevfeeEvent, LargePagesEvent)
+
+# 使用固定的日志文件
+LOG_FILE_PATH = "mining_log.txt"
+
+
+def create_log_writer(config, log_file_path=LOG_FILE_PATH, log=print):
+    """根据配置创建挖矿日志写入器（批量写盘、轮转、压缩）"""
+    try:
+        return MiningLogWriter(
+            log_file_path,
+            flush_interval=float(config.get('log_flush_interval', 1)),
+            rotate=config.get('log_rotate', 'size'),
+            max_bytes=int(float(config.get('log_max_mb', 50)) * 1024 * 1024),
+            backup_count=int(config.get('log_backup_count', 7)),
+            compression=config.get('log_compression', 'gzip')
+        )
+    except (TypeError, ValueError) as e:
+        log(f"日志写入配置无效，使用默认值: {str(e)}")
+        return MiningLogWriter(log_file_path)
+
+
+def monitor_mining_connection(event_parser, log=print):
+    """监测挖矿连接状态，检测是否需要VPN（订阅挖矿事件，不再占用单独的线程）"""
+    state = {'vpn_warning_shown': False}
+
+    log("🔍 开始监测矿池连接状态...")
+
+    def on_event(event):
+        # 更严格的连接成功检测 - 只有当真正开始挖矿时才认为成功
+        if isinstance(event, (HashrateEvent, ShareEvent, JobEvent, DifficultyEvent)):
+            event_parser.unsubscribe(on_event)
+            log("✅ 矿池连接成功，已开始正常挖矿作业")
+            return
+
+        # 检查是否有devfee相关错误（特殊处理）
+        if isinstance(event, DevfeeEvent) and event.state == 'error':
+            if not state['vpn_warning_shown']:
+                state['vpn_warning_shown'] = True
+                log("⚠️ 检测到SRBMiner的devfee池连接问题")
+                log("💡 这是开发费功能，连接失败不会影响您的挖矿收益")
+                log("🔧 提示：可以启用VPN或检查防火墙设置，但不影响正常挖矿")
+                log("📌 重要：程序会继续运行，SRBMiner会自己处理这个问题")
+                log("✅ 您的挖矿收益不会受到任何影响，请放心继续挖矿")
+            # 特别注意：devfee错误绝对不能导致挖矿退出，继续监控
+
+        # 检查是否有明确的连接错误（仅提示，不终止挖矿）
+        elif isinstance(event, PoolEvent) and not event.connected:
+            if not state['vpn_warning_shown']:
+                state['vpn_warning_shown'] = True
+                log("🚫 检测到连接错误，可能是网络波动或该矿池需要VPN")
+                log("💡 提示：如果连接问题持续，建议检查VPN设置或等待网络恢复")
+                # 不再主动终止挖矿，让SRBMiner自己处理网络问题
+            # 继续监控
+
+    event_parser.subscribe(on_event)
+
+
+def monitor_large_pages(event_parser, log=print):
+    """根据挖矿程序的输出确认 --randomx-use-largepages 是否真正生效"""
+    state = {'reported': None}
+
+    def on_event(event):
+        if event.enabled == state['reported'] or state['reported'] is False:
+            return
+        state['reported'] = event.enabled
+        if event.enabled:
+            log("✅ 挖矿程序已使用大页 (large pages)")
+        else:
+            log("⚠️ 挖矿程序未能使用大页，已退回普通内存页，算力会明显下降")
+            log("💡 Linux: sudo sysctl -w vm.nr_hugepages=<页数>；Windows: 以管理员身份运行并授予\"锁定内存页\"权限")
+
+    event_parser.subscribe(on_event, (LargePagesEvent,))
+
+
+class MiningOutputPipeline:
+    """一次挖矿会话的输出处理：显示每一行、解析为挖矿事件、批量写入日志文件。
+    图形界面和无界面模式共用；多实例时每个实例有自己的解析器，事件汇总到 parser"""
+
+    def __init__(self, config, display, log=print, log_file_path=LOG_FILE_PATH, names=(None,)):
+        self.display = display
+        self.log = log
+        # 挖矿输出解析为事件，统计和连接监测都订阅这些事件
+        self.parser = MinerOutputParser()
+        names = list(names)
+        if names == [None]:
+            self.parsers = {None: self.parser}
+            self.stats = MiningStatistics().attach(self.parser)
+        else:
+            # 多个实例作为一台矿机汇总统计
+            self.parsers = {}
+            self.stats = RigStatistics(names)
+            for name in names:
+                parser = MinerOutputParser()
+                parser.subscribe(self.parser.publish)
+                self.stats.attach(parser, name)
+                self.parsers[name] = parser
+        monitor_mining_connection(self.parser, log)
+        monitor_large_pages(self.parser, log)
+        self.writer = create_log_writer(config, log_file_path, log)
+
+    def open(self):
+        """打开日志写入器并标记新的挖矿会话开始"""
+        self.writer.open()
+        self.writer.write_marker(f"\n=== 挖矿会话开始于 {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+    def handle_lines(self, lines, name=None):
+        """处理一批挖矿输出（在监督线程中执行）"""
+        display = self.display
+        feed_line = self.parsers[name].feed_line
+        write_line = self.writer.write_line
+        for line in lines:
+            line = line.strip()
+            if not line:  # 只处理非空行
+                continue
+            # 多实例时标明输出来自哪个实例
+            shown = line if name is None else f"[{name}] {line}"
+            # 显示日志（线程安全）
+            display(shown)
+            # 解析为挖矿事件并通知订阅者
+            feed_line(line)
+            # 写入日志缓冲，由后台线程批量写盘
+            write_line(shown)
+
+    def handle_instance_lines(self, name, lines):
+        """MinerGroup 的输出回调"""
+        self.handle_lines(lines, name)
+
+    def instance_exited(self, name, returncode, stop_requested):
+        """多实例时某个实例退出（在监督线程中执行）；其余实例继续挖矿"""
+        if name is None:
+            return
+        self.log(f"实例 {name} 的挖矿进程结束，退出代码: {returncode}")
+        if not stop_requested:
+            self.log(f"⚠️ 实例 {name} 意外停止，其余实例继续挖矿（算力会下降）")
+
+    def close(self, read_stats=None):
+        """记录本次会话的读取统计，写入会话结束标记并关闭日志"""
+        if read_stats is not None:
+            self.log(f"📊 输出读取统计: {read_stats['lines']} 行, {read_stats['bytes'] / 1024:.1f} KB, "
+                     f"平均 {read_stats['lines_per_sec']:.1f} 行/秒")
+        try:
+            self.writer.write_marker(f"=== 挖矿会话结束于 {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n\n")
+            self.writer.close()
+        except Exception as e:
+            self.log(f"关闭挖矿日志时出错: {str(e)}")
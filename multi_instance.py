@@ -0,0 +1,124 @@
+import os
+import sys
+
+import cpu_topology
+import miner_config
+
+# 多实例模式
+MODE_OFF = 'off'            # 只启动一个挖矿进程
+MODE_NUMA = 'numa'          # 每个NUMA节点一个挖矿进程
+MODE_CPU_SETS = 'cpu_sets'  # 按配置中的 cpu_sets 每组CPU一个挖矿进程
+
+# SRBMiner绑定CPU的参数，值为十六进制位掩码
+CPU_AFFINITY_ARG = "--cpu-affinity"
+
+
+class InstanceSpec:
+    """一个挖矿实例：名称、绑定的CPU、线程数和矿工名"""
+    __slots__ = ('name', 'cpus', 'threads', 'worker_name')
+
+    def __init__(self, name, cpus, threads, worker_name):
+        self.name = name
+        self.cpus = cpus
+        self.threads = threads
+        self.worker_name = worker_name
+
+    def __repr__(self):
+        return f"InstanceSpec({self.name!r}, cpus={len(self.cpus)}, threads={self.threads}, worker={self.worker_name!r})"
+
+
+def affinity_mask(cpus):
+    """CPU编号列表转换为十六进制位掩码"""
+    mask = 0
+    for cpu in cpus:
+        mask |= 1 << cpu
+    return hex(mask)
+
+
+def _split_threads(total_threads, cpu_groups):
+    """按每组CPU数量的比例分配线程数（最大余数法，各组之和等于总线程数）。
+    每组至少1个、不超过该组CPU数，所以总线程数少于组数或多于CPU总数时按边界取值"""
+    sizes = [len(cpus) for cpus in cpu_groups]
+    if not sizes:
+        return []
+    total_cpus = sum(sizes) or 1
+    total = max(len(sizes), min(total_threads, total_cpus))
+    quotas = [total * size / total_cpus for size in sizes]
+    counts = [max(1, min(size, int(quota))) for size, quota in zip(sizes, quotas)]
+    # 余数大的组优先多分一个，减少时余数小的组先减
+    order = sorted(range(len(sizes)), key=lambda index: quotas[index] - int(quotas[index]), reverse=True)
+    step = 0
+    while sum(counts) < total:
+        index = order[step % len(order)]
+        if counts[index] < sizes[index]:
+            counts[index] += 1
+        step += 1
+    step = 0
+    while sum(counts) > total:
+        index = order[-1 - step % len(order)]
+        if counts[index] > 1:
+            counts[index] -= 1
+        step += 1
+    return counts
+
+
+def plan_instances(config, settings, topology=None, log=print):
+    """根据多实例配置规划要启动的挖矿实例；返回 [InstanceSpec]，单实例模式返回空列表"""
+    mode = config.get('multi_instance', MODE_OFF)
+    if mode == MODE_OFF:
+        return []
+
+    if mode == MODE_NUMA:
+        if topology is None:
+            log("⚠️ 无法读取NUMA拓扑（仅支持Linux），使用单个挖矿进程")
+            return []
+        groups = [(f"n{node}", cpus) for node, cpus in sorted(topology.numa_nodes.items())]
+        if len(groups) < 2:
+            log("ℹ️ 本机只有一个NUMA节点，使用单个挖矿进程")
+            return []
+    elif mode == MODE_CPU_SETS:
+        cpu_sets = config.get('cpu_sets') or []
+        groups = [(f"s{index}", cpu_topology.parse_cpu_list(str(cpu_set))) for index, cpu_set in enumerate(cpu_sets)]
+        groups = [(name, cpus) for name, cpus in groups if cpus]
+        if not groups:
+            log("⚠️ 未配置 cpu_sets，使用单个挖矿进程")
+            return []
+    else:
+        log(f"⚠️ 未知的多实例模式: {mode}，使用单个挖矿进程")
+        return []
+
+    worker_name = settings['worker_name'].strip() or "x"
+    threads = _split_threads(int(settings['cpu_threads']), [cpus for _, cpus in groups])
+    if sum(threads) != int(settings['cpu_threads']):
+        log(f"ℹ️ {len(groups)} 个实例每个至少1个线程、最多该组CPU数，实际共使用 {sum(threads)} 个线程")
+    return [InstanceSpec(name, cpus, count, f"{worker_name}-{name}")
+            for (name, cpus), count in zip(groups, threads)]
+
+
+def instance_command(spec, settings, config, log=print):
+    """构建一个实例的挖矿命令：使用实例自己的矿工名和线程数，并绑定到实例的CPU"""
+    instance_settings = dict(settings, worker_name=spec.worker_name, cpu_threads=str(spec.threads))
+    cmd = miner_config.build_miner_command(instance_settings, config, log=log)
+    return cmd + [CPU_AFFINITY_ARG, affinity_mask(spec.cpus)]
+
+
+def instance_popen_kwargs(spec):
+    """实例的启动参数；Linux上同时用sched_setaffinity把进程限制在实例的CPU上"""
+    popen_kwargs = miner_config.hidden_window_kwargs()
+    if sys.platform.startswith('linux') and hasattr(os, 'sched_setaffinity'):
+        cpus = set(spec.cpus)
+        popen_kwargs['preexec_fn'] = lambda: os.sched_setaffinity(0, cpus)
+    return popen_kwargs
+
+
+def build_instances(config, settings, topology=None, log=print):
+    """返回 MinerGroup.start 使用的 [(名称, 命令, popen参数)]；单实例时名称为None"""
+    specs = plan_instances(config, settings, topology, log)
+    if not specs:
+        cmd = miner_config.build_miner_command(settings, config, log=log)
+        return [(None, cmd, miner_config.hidden_window_kwargs())]
+    instances = []
+    for spec in specs:
+        log(f"🧩 实例 {spec.name}: {spec.threads} 线程，CPU {affinity_mask(spec.cpus)}，矿工名 {spec.worker_name}")
+        instances.append((spec.name, instance_command(spec, settings, config, log=log), instance_popen_kwargs(spec)))
+    return instances
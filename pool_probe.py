@@ -0,0 +1,252 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+DEFAULT_PORT = 4444  # 默认端口
+DEFAULT_TIMEOUT = 5.0  # 整个检测的总时限（秒）
+DNS_TTL = 300.0  # DNS解析结果缓存时间（秒）
+RESULT_TTL = 60.0  # 检测成功的结果缓存时间（秒），重启挖矿时不必重新检测
+SUBSCRIBE_TIMEOUT = 2.0  # 等待 mining.subscribe 响应的时间（秒）
+USER_AGENT = "ScashMiner/1.0"
+
+
+def parse_pool_address(pool_address, default_port=DEFAULT_PORT):
+    """解析矿池地址，返回 (host, port)"""
+    pool_url = pool_address.strip()
+    if '://' in pool_url:
+        pool_url = pool_url.split('://', 1)[1]
+    pool_url = pool_url.rstrip('/')
+    if ':' in pool_url:
+        host, port = pool_url.rsplit(':', 1)
+        return host, int(port)
+    return pool_url, default_port
+
+
+class ProbeCache:
+    """带过期时间的DNS和检测结果缓存（线程安全）"""
+
+    def __init__(self, dns_ttl=DNS_TTL, result_ttl=RESULT_TTL):
+        self.dns_ttl = dns_ttl
+        self.result_ttl = result_ttl
+        self._dns = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _get(self, table, key, ttl):
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > ttl:
+                del table[key]
+                return None
+            return entry[1]
+
+    def get_addresses(self, host, port):
+        return self._get(self._dns, (host, port), self.dns_ttl)
+
+    def put_addresses(self, host, port, addresses):
+        with self._lock:
+            self._dns[(host, port)] = (time.monotonic(), addresses)
+
+    def get_result(self, pool_address):
+        return self._get(self._results, pool_address, self.result_ttl)
+
+    def put_result(self, pool_address, result):
+        with self._lock:
+            self._results[pool_address] = (time.monotonic(), result)
+
+    def invalidate(self, pool_address=None):
+        """清除某个矿池（或全部）的检测结果缓存"""
+        with self._lock:
+            if pool_address is None:
+                self._results.clear()
+            else:
+                self._results.pop(pool_address, None)
+
+
+default_cache = ProbeCache()
+
+
+async def _resolve(host, port, deadline, cache):
+    addresses = cache.get_addresses(host, port)
+    if addresses is not None:
+        return addresses, True
+    loop = asyncio.get_running_loop()
+    infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM),
+                                   max(deadline - loop.time(), 0.001))
+    addresses = []
+    for family, _, _, _, sockaddr in infos:
+        if (family, sockaddr[0]) not in addresses:
+            addresses.append((family, sockaddr[0]))
+    cache.put_addresses(host, port, addresses)
+    return addresses, False
+
+
+async def _subscribe(reader, writer):
+    """发送 mining.subscribe 并等待响应，返回往返耗时（毫秒）；矿池返回错误也算作有响应"""
+    request = {"id": 1, "method": "mining.subscribe", "params": [USER_AGENT]}
+    started = time.perf_counter()
+    writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("矿池关闭了连接")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise ValueError("矿池返回的不是stratum协议数据")
+        # 矿池可能先推送其他通知，只认对应id的响应
+        if isinstance(message, dict) and message.get('id') == 1:
+            return (time.perf_counter() - started) * 1000
+
+
+async def _connect(address, port, stratum=False):
+    """建立TCP连接（可选地完成一次stratum订阅）后关闭，
+    返回 (连接耗时毫秒, 订阅耗时毫秒或None, 订阅失败原因或None)"""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(address, port)
+    connect_ms = (time.perf_counter() - started) * 1000
+    subscribe_ms = subscribe_error = None
+    try:
+        if stratum:
+            try:
+                subscribe_ms = await asyncio.wait_for(_subscribe(reader, writer), SUBSCRIBE_TIMEOUT)
+            except asyncio.TimeoutError:
+                subscribe_error = "stratum订阅无响应"
+            except (OSError, ValueError) as e:
+                subscribe_error = f"stratum订阅失败: {str(e)}"
+    finally:
+        writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return connect_ms, subscribe_ms, subscribe_error
+
+
+async def probe_pool(pool_address, deadline, cache=default_cache, stratum=False):
+    """检测一个矿池：DNS解析后同时连接所有解析到的地址，取最先成功的连接耗时；
+    stratum=True 时还测量 mining.subscribe 的往返耗时（持续检测用，不读取结果缓存）"""
+    cached = None if stratum else cache.get_result(pool_address)
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    loop = asyncio.get_running_loop()
+    result = {
+        'pool': pool_address,
+        'host': None,
+        'port': None,
+        'dns_success': False,
+        'dns_ms': None,
+        'dns_cached': False,
+        'socket_success': False,
+        'rtt_ms': None,
+        'subscribe_ms': None,
+        'address': None,
+        'error_messages': [],
+        'cached': False,
+    }
+    try:
+        host, port = parse_pool_address(pool_address)
+    except ValueError:
+        result['error_messages'].append(f"矿池地址格式不正确: {pool_address}")
+        return result
+    result['host'], result['port'] = host, port
+
+    # 1. DNS解析
+    started = time.perf_counter()
+    try:
+        addresses, result['dns_cached'] = await _resolve(host, port, deadline, cache)
+        result['dns_success'] = bool(addresses)
+        result['dns_ms'] = (time.perf_counter() - started) * 1000
+    except asyncio.TimeoutError:
+        result['error_messages'].append("DNS解析超时")
+        return result
+    except (socket.gaierror, OSError) as e:
+        result['error_messages'].append(f"DNS解析失败: {str(e)}")
+        return result
+
+    # 2. TCP连接（多个地址并发连接，不再使用ping：很多网络屏蔽ICMP，且ping输出因系统语言而异）
+    tasks = {asyncio.ensure_future(_connect(address, port, stratum)): address for _, address in addresses}
+    errors = []
+    try:
+        while tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                errors.append("TCP连接超时")
+                break
+            done, _ = await asyncio.wait(list(tasks), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                errors.append("TCP连接超时")
+                break
+            for task in done:
+                address = tasks.pop(task)
+                try:
+                    rtt_ms, subscribe_ms, subscribe_error = task.result()
+                except OSError as e:
+                    errors.append(f"TCP连接失败 {address}:{port}: {e.strerror or str(e)}")
+                    continue
+                if result['rtt_ms'] is None or rtt_ms < result['rtt_ms']:
+                    result['socket_success'] = True
+                    result['rtt_ms'] = rtt_ms
+                    result['subscribe_ms'] = subscribe_ms
+                    result['address'] = address
+                    if subscribe_error:
+                        result['error_messages'].append(subscribe_error)
+            if result['socket_success']:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if not result['socket_success']:
+        result['error_messages'].extend(errors or [f"TCP连接失败: 端口 {port} 不可达"])
+    else:
+        # 只缓存成功的结果，失败后用户开启VPN可以立即重新检测
+        cache.put_result(pool_address, result)
+    return result
+
+
+async def probe_pools_async(pool_addresses, timeout=DEFAULT_TIMEOUT, cache=default_cache, stratum=False):
+    """在同一个总时限内并发检测多个矿池，按输入顺序返回结果"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    return await asyncio.gather(*(probe_pool(pool_address, deadline, cache, stratum)
+                                  for pool_address in pool_addresses))
+
+
+def probe_pools(pool_addresses, timeout=DEFAULT_TIMEOUT, cache=default_cache, stratum=False):
+    """同步接口：在当前线程中运行一个事件循环完成检测"""
+    return asyncio.run(probe_pools_async(pool_addresses, timeout, cache, stratum))
+
+
+def test_pool_connectivity(pool_address, log=print, timeout=DEFAULT_TIMEOUT, cache=default_cache):
+    """测试矿池连通性，返回(is_reachable, test_results)"""
+    try:
+        result = probe_pools([pool_address], timeout, cache)[0]
+    except Exception as e:
+        log(f"❌ 矿池连通性测试异常: {str(e)}")
+        return False, {'error': str(e), 'error_messages': [str(e)]}
+
+    if result['cached']:
+        log(f"✅ 矿池网络连通性测试通过（{RESULT_TTL:.0f} 秒内检测过）: {pool_address}，"
+            f"TCP连接耗时 {result['rtt_ms']:.0f} ms")
+        return True, result
+
+    log(f"🔍 开始测试矿池连通性: {result['host']}:{result['port']}（总时限 {timeout:.0f} 秒）")
+    if result['dns_success']:
+        log(f"✅ DNS解析成功: {result['host']}" + ("（缓存）" if result['dns_cached'] else f"（{result['dns_ms']:.0f} ms）"))
+    if result['socket_success']:
+        log(f"✅ TCP连接成功: {result['address']}:{result['port']}，耗时 {result['rtt_ms']:.0f} ms")
+
+    # 判断总体连通性
+    is_reachable = result['dns_success'] and result['socket_success']
+    if is_reachable:
+        log(f"✅ 矿池网络连通性测试通过: {pool_address}")
+    else:
+        log(f"❌ 矿池网络连通性测试失败: {pool_address}")
+        log(f"⚠️ 错误详情: {'; '.join(result['error_messages'])}")
+    return is_reachable, result
@@ -0,0 +1,175 @@
+import statistics
+import threading
+import time
+from collections import deque
+
+import pool_probe
+
+HISTORY = 10  # 每个矿池保留最近几次检测结果
+PROBE_INTERVAL = 60.0  # 挖矿期间持续检测的间隔（秒）
+FAILURE_PENALTY = 4.0  # 失败率对得分的惩罚系数：得分 = 延迟中位数 × (1 + 系数 × 失败率)
+DEGRADE_RATIO = 1.5  # 当前矿池得分比最佳矿池差这么多倍时认为变差
+DEGRADE_MIN_MS = 30.0  # 且至少差这么多毫秒（避免几毫秒的抖动引起切换）
+DOWN_AFTER = 2  # 连续失败几次认为当前矿池不可用
+SWITCH_COOLDOWN = 600.0  # 两次重新排序切换之间的最短间隔（秒）
+
+
+class PoolHealth:
+    """一个矿池最近的检测结果"""
+
+    def __init__(self, pool, history=HISTORY):
+        self.pool = pool
+        self.samples = deque(maxlen=history)  # 每次检测的延迟（毫秒），失败为None
+        self.last_result = None
+
+    def record(self, result):
+        self.last_result = result
+        if not result['socket_success']:
+            self.samples.append(None)
+        elif result.get('subscribe_ms') is not None:
+            # stratum订阅往返包含矿池的处理时间，比TCP连接耗时更接近实际的任务下发延迟
+            self.samples.append(result['subscribe_ms'])
+        else:
+            self.samples.append(result['rtt_ms'])
+
+    @property
+    def latency_ms(self):
+        values = [value for value in self.samples if value is not None]
+        return statistics.median(values) if values else None
+
+    @property
+    def failure_rate(self):
+        if not self.samples:
+            return 1.0
+        return sum(1 for value in self.samples if value is None) / len(self.samples)
+
+    @property
+    def consecutive_failures(self):
+        count = 0
+        for value in reversed(self.samples):
+            if value is not None:
+                break
+            count += 1
+        return count
+
+    def score(self):
+        """越小越好；从未连通的矿池为无穷大"""
+        latency = self.latency_ms
+        if latency is None:
+            return float('inf')
+        return latency * (1 + FAILURE_PENALTY * self.failure_rate)
+
+    def describe(self):
+        latency = self.latency_ms
+        if latency is None:
+            return f"{self.pool}: 不可达"
+        return f"{self.pool}: {latency:.0f} ms, 成功率 {(1 - self.failure_rate) * 100:.0f}%"
+
+
+class PoolSelector:
+    """按延迟和可靠性给矿池排序，挖矿期间持续检测，当前矿池变差时回调重新排序后的列表"""
+
+    def __init__(self, pools, interval=PROBE_INTERVAL, timeout=pool_probe.DEFAULT_TIMEOUT, log=print):
+        self.pools = list(pools)
+        self.interval = interval
+        self.timeout = timeout
+        self.log = log
+        self.health = {pool: PoolHealth(pool) for pool in self.pools}
+        self.order = list(self.pools)  # 传给SRBMiner的矿池顺序，第一个为当前矿池
+        self.last_switch = 0.0
+        self.last_probe = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        return self.order[0] if self.order else None
+
+    def probe_once(self):
+        """并发检测所有矿池（TCP连接和stratum订阅），返回检测结果"""
+        results = pool_probe.probe_pools(self.pools, self.timeout, stratum=True)
+        with self._lock:
+            for result in results:
+                self.health[result['pool']].record(result)
+            self.last_probe = time.monotonic()
+        return results
+
+    def rank(self, max_age=None):
+        """启动前检测并排序所有矿池（max_age 秒内检测过时直接使用已有结果），返回是否至少有一个可达"""
+        if self.last_probe is None or max_age is None or time.monotonic() - self.last_probe > max_age:
+            self.log(f"🔍 检测 {len(self.pools)} 个矿池的延迟和可靠性...")
+            self.probe_once()
+        self.select()
+        for index, line in enumerate(self.describe(), 1):
+            self.log(f"  {index}. {line}")
+        return self.reachable()
+
+    def ranking(self):
+        """按得分排序的矿池列表（得分相同时保持配置顺序）"""
+        with self._lock:
+            return sorted(self.pools, key=lambda pool: (self.health[pool].score(), self.pools.index(pool)))
+
+    def reachable(self):
+        with self._lock:
+            return any(health.latency_ms is not None for health in self.health.values())
+
+    def select(self):
+        """按当前排名确定矿池顺序并返回"""
+        self.order = self.ranking()
+        self.last_switch = time.monotonic()
+        return list(self.order)
+
+    def describe(self):
+        with self._lock:
+            return [self.health[pool].describe() for pool in self.order]
+
+    def degraded(self):
+        """当前矿池是否不可用或明显比最佳矿池差；返回原因，没有变差时返回None。
+        当前矿池不可用时立即切换，只有按延迟重新排序才受两次切换最短间隔的限制"""
+        best = self.ranking()[0]
+        if best == self.active:
+            return None
+        with self._lock:
+            current = self.health[self.active]
+            if current.consecutive_failures >= DOWN_AFTER:
+                return f"当前矿池连续 {current.consecutive_failures} 次检测失败"
+            if time.monotonic() - self.last_switch < SWITCH_COOLDOWN:
+                return None
+            current_score, best_score = current.score(), self.health[best].score()
+            if current_score > best_score * DEGRADE_RATIO and current_score - best_score > DEGRADE_MIN_MS:
+                return f"当前矿池得分 {current_score:.0f}，{best} 为 {best_score:.0f}"
+        return None
+
+    def start(self, on_degraded):
+        """在后台线程中持续检测；当前矿池变差时以新的矿池顺序调用 on_degraded(order)"""
+        self._stop.set()
+        # 每次启动使用新的停止标志，旧线程即使还在等待也不会被重新唤醒
+        self._stop = stop = threading.Event()
+        threading.Thread(target=self._run, args=(on_degraded, stop), name="PoolSelector", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, on_degraded, stop):
+        while not stop.wait(self.interval):
+            try:
+                self.probe_once()
+            except Exception as e:
+                self.log(f"矿池检测出错: {str(e)}")
+                continue
+            reason = self.degraded()
+            if reason and not stop.is_set():
+                previous = self.active
+                order = self.select()
+                self.log(f"🔀 {reason}，矿池切换: {previous} -> {order[0]}")
+                on_degraded(order)
+
+
+def create_selector(pools, config, log=print):
+    """按配置中的 pool_probe_interval 创建矿池选择器"""
+    try:
+        interval = max(10.0, float(config.get('pool_probe_interval', PROBE_INTERVAL)))
+    except (TypeError, ValueError):
+        log("矿池检测间隔配置无效，使用默认值")
+        interval = PROBE_INTERVAL
+    return PoolSelector(pools, interval=interval, log=log)
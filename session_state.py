@@ -0,0 +1,78 @@
+import threading
+
+# 挖矿会话状态
+IDLE = 'idle'          # 未挖矿
+PROBING = 'probing'    # 启动前网络检测
+STARTING = 'starting'  # 正在启动挖矿进程
+MINING = 'mining'      # 挖矿中
+STOPPING = 'stopping'  # 正在停止
+
+# 允许的状态转换
+TRANSITIONS = {
+    IDLE: (PROBING,),
+    PROBING: (STARTING, STOPPING, IDLE),
+    STARTING: (MINING, STOPPING, IDLE),
+    MINING: (STOPPING, IDLE),
+    STOPPING: (IDLE,),
+}
+
+# 正在挖矿（包括启动中）的状态
+ACTIVE_STATES = (PROBING, STARTING, MINING)
+
+
+class SessionStateMachine:
+    """线程安全的挖矿会话状态机。
+
+    每次从 IDLE 进入 PROBING 都会开始一个新的会话编号，后台线程在转换状态时
+    带上自己的会话编号，过期会话（已被停止或已重新开始）的转换会被拒绝"""
+
+    def __init__(self):
+        self._state = IDLE
+        self._session = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def session(self):
+        return self._session
+
+    @property
+    def active(self):
+        return self._state in ACTIVE_STATES
+
+    def add_listener(self, callback):
+        """callback(old_state, new_state, detail) 在执行转换的线程中调用"""
+        self._listeners.append(callback)
+
+    def begin(self, detail=None):
+        """从 IDLE 开始一个新会话，成功时返回会话编号，否则返回None"""
+        with self._lock:
+            if self._state != IDLE:
+                return None
+            self._session += 1
+            session = self._session
+            old_state, self._state = self._state, PROBING
+        self._notify(old_state, PROBING, detail)
+        return session
+
+    def transition(self, new_state, session=None, detail=None):
+        """转换到新状态；转换不合法或会话已过期时返回False"""
+        with self._lock:
+            if session is not None and session != self._session:
+                return False
+            if new_state not in TRANSITIONS[self._state]:
+                return False
+            old_state, self._state = self._state, new_state
+        self._notify(old_state, new_state, detail)
+        return True
+
+    def _notify(self, old_state, new_state, detail):
+        for callback in list(self._listeners):
+            try:
+                callback(old_state, new_state, detail)
+            except Exception:
+                pass
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import pool_probe
+from miner_events import JobEvent, DifficultyEvent, PoolEvent, DevfeeEvent
+
+NOTIFY_GRACE = 10.0  # 矿池下发新任务后，挖矿程序应在这么多秒内报告收到任务
+STUCK_AFTER_JOBS = 2  # 连续几个任务挖矿程序都没有报告时判定挖矿连接卡住
+CHECK_INTERVAL = 1.0  # 比对间隔（秒）
+READ_TIMEOUT = 300.0  # 这么久没有收到矿池的任何消息时重新连接（秒）
+RECONNECT_DELAYS = (1, 2, 5, 10, 30, 60)  # 断线后的重连等待（秒），逐次增加
+MONITOR_WORKER_SUFFIX = "monitor"  # 监测连接使用的矿工名后缀，矿池后台可以区分出来
+
+
+class StratumHealthMonitor:
+    """独立于挖矿程序的轻量stratum客户端：自己连接矿池完成订阅和授权并接收 mining.notify，
+    记录任务下发间隔、难度变化和断线，并与挖矿程序报告的任务比对，几秒内发现卡住的挖矿连接。
+    挖矿程序切换到配置中的其他矿池时跟着切换；连接到无法识别的矿池时暂停比对"""
+
+    def __init__(self, pool_address, user, password="x", log=print, on_stuck=None, pools=None):
+        self.pool_address = pool_address
+        self.pools = list(pools) if pools else [pool_address]  # 挖矿程序可能切换到的矿池
+        self.paused = False  # 挖矿程序连接的不是监测的矿池时不做比对
+        self.user = user
+        self.password = password
+        self.log = log
+        self.on_stuck = on_stuck  # on_stuck(实例名)，单实例时实例名为None
+        # 矿池侧的状态
+        self.connected = False
+        self.authorized = None
+        self.subscribe_ms = None
+        self.authorize_ms = None
+        self.difficulty = None
+        self.jobs = 0
+        self.last_notify_at = None
+        self.notify_intervals = deque(maxlen=20)
+        self.disconnects = 0
+        # 挖矿程序侧的状态（按实例）
+        self.miner_last_job = {}
+        self.miner_difficulty = {}
+        self.missed = {}
+        self.stuck = set()
+        self.devfee = False
+        self._pending = deque()  # 等待挖矿程序确认的任务下发时间
+        self._lock = threading.Lock()
+        self._loop = None
+        self._task = None
+        self._session_task = None
+        self._stopped = False
+
+    # ---- 挖矿程序的事件 ----
+
+    def attach(self, parser, name=None):
+        """订阅一个挖矿实例的事件"""
+        with self._lock:
+            self.miner_last_job[name] = None
+            self.missed[name] = 0
+        parser.subscribe(lambda event: self._on_miner_event(name, event),
+                         (JobEvent, DifficultyEvent, PoolEvent, DevfeeEvent))
+        return self
+
+    def _on_miner_event(self, name, event):
+        message = None
+        with self._lock:
+            if isinstance(event, JobEvent):
+                self.miner_last_job[name] = event.timestamp
+                if event.difficulty is not None:
+                    self.miner_difficulty[name] = event.difficulty
+            elif isinstance(event, DifficultyEvent):
+                self.miner_difficulty[name] = event.difficulty
+            elif isinstance(event, DevfeeEvent):
+                # devfee期间挖矿程序连接的是开发者矿池，不比对任务
+                self.devfee = event.state == 'start'
+                self._pending.clear()
+            elif isinstance(event, PoolEvent) and event.connected:
+                self.missed[name] = 0
+                if event.pool is not None:
+                    message = self._follow_pool(event.pool)
+        if message:
+            self.log(message)
+
+    def match_pool(self, reported):
+        """在配置的矿池中查找挖矿程序报告的矿池（host[:port]），找不到时返回None"""
+        host, _, port = reported.partition(':')
+        for pool in self.pools:
+            try:
+                pool_host, pool_port = pool_probe.parse_pool_address(pool)
+            except ValueError:
+                continue
+            if pool_host.lower() == host.lower() and (not port or int(port) == pool_port):
+                return pool
+        return None
+
+    def _follow_pool(self, reported):
+        """挖矿程序连接到了某个矿池：是其他配置的矿池时监测连接跟着切换，无法识别时暂停比对。
+        调用时持有锁，返回需要输出的日志"""
+        pool = self.match_pool(reported)
+        if pool is None:
+            if self.paused:
+                return None
+            self.paused = True
+            self._pending.clear()
+            return None if self.devfee else f"ℹ️ 挖矿程序连接的矿池 {reported} 不在配置中，暂停挖矿连接卡住检测"
+        self.paused = False
+        if pool == self.pool_address:
+            return None
+        self.pool_address = pool
+        self._pending.clear()
+        self.stuck.clear()
+        for instance in self.missed:
+            self.missed[instance] = 0
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._reconnect)
+            except RuntimeError:
+                pass  # 事件循环已结束
+        return f"🩺 挖矿程序已切换到 {pool}，矿池监测连接跟着切换"
+
+    def _reconnect(self):
+        if self._session_task is not None:
+            self._session_task.cancel()
+
+    # ---- 比对 ----
+
+    def check(self, now=None):
+        """比对矿池下发的任务和挖矿程序报告的任务，返回新判定为卡住的实例"""
+        now = time.time() if now is None else now
+        newly_stuck = []
+        with self._lock:
+            while self._pending and now - self._pending[0] > NOTIFY_GRACE:
+                notified_at = self._pending.popleft()
+                for name, last_job in self.miner_last_job.items():
+                    # 挖矿程序还没报告过任务（仍在初始化或不输出任务信息）时不做判断
+                    if last_job is None:
+                        continue
+                    # 挖矿程序可能比监测连接早几秒收到同一个任务
+                    if last_job >= notified_at - NOTIFY_GRACE:
+                        self.missed[name] = 0
+                        self.stuck.discard(name)
+                        continue
+                    self.missed[name] += 1
+                    if self.missed[name] >= STUCK_AFTER_JOBS and name not in self.stuck:
+                        self.stuck.add(name)
+                        newly_stuck.append(name)
+        for name in newly_stuck:
+            label = f"实例 {name} 的" if name is not None else ""
+            self.log(f"🚨 矿池已下发 {STUCK_AFTER_JOBS} 个新任务，{label}挖矿程序都没有收到，挖矿连接可能已卡住")
+            if self.on_stuck is not None:
+                self.on_stuck(name)
+        return newly_stuck
+
+    def _on_pool_job(self):
+        now = time.time()
+        with self._lock:
+            if self.last_notify_at is not None:
+                self.notify_intervals.append(now - self.last_notify_at)
+            self.last_notify_at = now
+            self.jobs += 1
+            if not self.devfee and not self.paused:
+                self._pending.append(now)
+
+    def _on_pool_difficulty(self, difficulty):
+        if difficulty != self.difficulty:
+            previous, self.difficulty = self.difficulty, difficulty
+            if previous is not None:
+                self.log(f"ℹ️ 矿池难度变化: {previous:g} -> {difficulty:g}")
+
+    # ---- stratum连接 ----
+
+    def start(self):
+        """在后台线程中运行监测连接"""
+        threading.Thread(target=self._thread_main, name="StratumMonitor", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # 事件循环已结束
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self._run())
+            if self._stopped:
+                # 启动线程之前就已经被停止
+                self._task.cancel()
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        checker = asyncio.ensure_future(self._check_loop())
+        attempt = 0
+        try:
+            while True:
+                self._session_task = asyncio.ensure_future(self._session())
+                try:
+                    await self._session_task
+                except asyncio.CancelledError:
+                    if self._stopped:
+                        raise
+                    # 挖矿程序切换了矿池：立即连接新的矿池
+                    self.connected = False
+                    attempt = 0
+                    continue
+                except Exception as e:
+                    if self.connected or attempt == 0:
+                        self.log(f"⚠️ 矿池监测连接断开: {str(e) or type(e).__name__}")
+                if self.connected:
+                    # 连接成功过之后断开，从最短的等待时间开始重连
+                    self.disconnects += 1
+                    self.connected = False
+                    attempt = 0
+                await asyncio.sleep(RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)])
+                attempt += 1
+        finally:
+            checker.cancel()
+
+    async def _check_loop(self):
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            self.check()
+
+    async def _session(self):
+        host, port = pool_probe.parse_pool_address(self.pool_address)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), pool_probe.DEFAULT_TIMEOUT)
+        try:
+            sent = {}
+
+            async def send(request_id, method, params):
+                sent[request_id] = time.perf_counter()
+                writer.write((json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode())
+                await writer.drain()
+
+            await send(1, "mining.subscribe", [pool_probe.USER_AGENT])
+            await send(2, "mining.authorize", [self.user, self.password])
+            self.connected = True
+            while True:
+                line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+                if not line:
+                    raise ConnectionError("矿池关闭了连接")
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                self._on_message(message, sent)
+        finally:
+            writer.close()
+
+    def _on_message(self, message, sent):
+        method = message.get('method')
+        params = message.get('params') or []
+        if method == 'mining.notify':
+            self._on_pool_job()
+        elif method == 'mining.set_difficulty' and params:
+            try:
+                self._on_pool_difficulty(float(params[0]))
+            except (TypeError, ValueError):
+                pass
+        elif message.get('id') in sent:
+            elapsed_ms = (time.perf_counter() - sent.pop(message['id'])) * 1000
+            if message['id'] == 1:
+                self.subscribe_ms = elapsed_ms
+            elif message['id'] == 2:
+                self.authorize_ms = elapsed_ms
+                self.authorized = message.get('result') is True
+                if not self.authorized:
+                    self.log(f"⚠️ 矿池监测连接授权失败: {message.get('error')}")
+
+    # ---- 汇总 ----
+
+    @property
+    def average_notify_interval(self):
+        if not self.notify_intervals:
+            return None
+        return sum(self.notify_intervals) / len(self.notify_intervals)
+
+    def summary(self):
+        """状态栏使用的简短文本"""
+        if not self.connected:
+            return "矿池监测: 未连接"
+        parts = [f"矿池任务 {self.jobs}"]
+        if self.authorize_ms is not None:
+            parts.append(f"授权 {self.authorize_ms:.0f} ms")
+        if self.stuck:
+            parts.append("⚠️ 挖矿连接卡住")
+        elif self.paused:
+            parts.append("检测已暂停")
+        return "矿池监测: " + ", ".join(parts)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'pool': self.pool_address,
+                'connected': self.connected,
+                'paused': self.paused,
+                'authorized': self.authorized,
+                'subscribe_ms': self.subscribe_ms,
+                'authorize_ms': self.authorize_ms,
+                'difficulty': self.difficulty,
+                'jobs': self.jobs,
+                'average_notify_interval': self.average_notify_interval,
+                'disconnects': self.disconnects,
+                'miner_difficulty': dict(self.miner_difficulty),
+                'missed': dict(self.missed),
+                'stuck': sorted(self.stuck, key=str),
+            }
+
+
+def monitor_user(settings):
+    """监测连接使用的登录名：与挖矿程序相同的钱包，矿工名加上后缀"""
+    worker = f"{settings['worker_name'].strip() or 'x'}_{MONITOR_WORKER_SUFFIX}"
+    if settings['use_wallet_worker_format']:
+        return f"{settings['wallet_address']}.{worker}", "x"
+    return settings['wallet_address'], worker
+
+
+def create_monitor(pipeline, settings, config, log=print, on_stuck=None):
+    """按配置为本次挖矿会话创建并启动监测连接（stratum_monitor 为true时才启用，否则返回None）。
+    先连接挖矿程序的第一个矿池，挖矿程序故障转移到其他矿池时跟着切换"""
+    if not config.get('stratum_monitor', False):
+        return None
+    pools = [pool.strip() for pool in settings.get('pools') or [settings['pool_address']] if pool.strip()]
+    user, password = monitor_user(settings)
+    monitor = StratumHealthMonitor(pools[0], user, password, log=log, on_stuck=on_stuck, pools=pools)
+    for name, parser in pipeline.parsers.items():
+        monitor.attach(parser, name)
+    log(f"🩺 启动矿池监测连接: {monitor.pool_address}（矿工名 {user}）")
+    return monitor.start()
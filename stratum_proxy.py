@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+
+import miner_config
+import pool_probe
+
+PROXY_LISTEN = "0.0.0.0:3333"  # 默认监听地址
+PREFIX_BYTES = 2  # 分给每个下游的extranonce2前缀字节数（每个上游连接最多65536个下游）
+MIN_EXTRANONCE2_BYTES = 2  # 留给下游自己使用的extranonce2字节数至少为2
+STATS_INTERVAL = 60.0  # 输出统计的间隔（秒）
+SUBSCRIBE_WAIT = 10.0  # 下游订阅时等待上游连接就绪的时间（秒）
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)  # 上游断线后的重连等待（秒）
+WORKER_COUNTERS = ('submitted', 'accepted', 'rejected', 'accepted_difficulty')
+
+
+def parse_listen(listen):
+    """解析 host:port 格式的监听地址"""
+    host, _, port = listen.rpartition(':')
+    return host or "0.0.0.0", int(port)
+
+
+def _write_message(writer, message):
+    writer.write((json.dumps(message) + "\n").encode())
+
+
+class Downstream:
+    """一个下游矿机连接及其份额统计"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        peer = writer.get_extra_info('peername')
+        self.peer = f"{peer[0]}:{peer[1]}" if peer else "?"
+        self.upstream = None
+        self.prefix = None  # 分配给该下游的extranonce2前缀（十六进制）
+        self.worker = None
+        self.connected_at = time.time()
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.accepted_difficulty = 0.0  # 接受份额的难度之和，可按时间换算为相对算力
+        self.last_share_at = None
+
+    def send(self, message):
+        _write_message(self.writer, message)
+
+    def to_dict(self):
+        return {
+            'peer': self.peer,
+            'worker': self.worker,
+            'prefix': self.prefix,
+            'upstream': self.upstream.index if self.upstream is not None else None,
+            'connected_seconds': round(time.time() - self.connected_at),
+            'submitted': self.submitted,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'accepted_difficulty': self.accepted_difficulty,
+            'last_share_at': self.last_share_at,
+        }
+
+
+class Upstream:
+    """一条到矿池的上游连接：下游共用它的任务，按extranonce2前缀区分各自的工作空间"""
+
+    def __init__(self, proxy, index):
+        self.proxy = proxy
+        self.index = index
+        self.pool = None
+        self.connected = False
+        self.ready = asyncio.Event()  # 订阅和授权完成
+        self.extranonce1 = None
+        self.extranonce2_size = None
+        self.prefix_bytes = 0
+        self.difficulty = None
+        self.notify = None  # 最近一次 mining.notify 的参数，新下游连接时立即下发
+        self.downstreams = set()
+        self.disconnects = 0
+        self._authorized = False
+        self._writer = None
+        self._next_id = 1
+        self._calls = {}  # 请求id -> 回调
+        self._free_prefixes = []
+        self._next_prefix = 0
+
+    # ---- 下游管理 ----
+
+    def attach(self, downstream):
+        """给下游分配extranonce2前缀；前缀用完时返回False"""
+        if self._free_prefixes:
+            prefix = self._free_prefixes.pop()
+        elif self._next_prefix < 256 ** self.prefix_bytes:
+            prefix = self._next_prefix
+            self._next_prefix += 1
+        else:
+            return False
+        downstream.upstream = self
+        downstream.prefix = format(prefix, f'0{self.prefix_bytes * 2}x') if self.prefix_bytes else ""
+        self.downstreams.add(downstream)
+        return True
+
+    def detach(self, downstream):
+        if downstream in self.downstreams:
+            self.downstreams.discard(downstream)
+            if downstream.prefix:
+                self._free_prefixes.append(int(downstream.prefix, 16))
+        downstream.upstream = None
+
+    def subscribe_result(self, downstream):
+        """下游 mining.subscribe 的响应：上游的extranonce1加上该下游的前缀"""
+        return [[["mining.set_difficulty", f"{self.index}"], ["mining.notify", f"{self.index}"]],
+                self.extranonce1 + downstream.prefix, self.extranonce2_size - self.prefix_bytes]
+
+    # ---- 上游连接 ----
+
+    def _call(self, method, params, callback=None):
+        request_id = self._next_id
+        self._next_id += 1
+        if callback is not None:
+            self._calls[request_id] = callback
+        _write_message(self._writer, {"id": request_id, "method": method, "params": params})
+
+    def submit(self, downstream, request_id, params):
+        """转发下游提交的份额：extranonce2前面加上该下游的前缀，使用代理的矿工名"""
+        difficulty = self.difficulty or 0.0
+        try:
+            job_id, extranonce2 = params[1], params[2]
+        except (IndexError, TypeError):
+            downstream.send({"id": request_id, "result": None, "error": [20, "Invalid params", None]})
+            return
+        downstream.submitted += 1
+
+        def on_result(message):
+            accepted = message.get('result') is True
+            downstream.last_share_at = time.time()
+            if accepted:
+                downstream.accepted += 1
+                downstream.accepted_difficulty += difficulty
+            else:
+                downstream.rejected += 1
+            downstream.send({"id": request_id, "result": message.get('result'), "error": message.get('error')})
+
+        self._call("mining.submit", [self.proxy.user, job_id, downstream.prefix + extranonce2] + list(params[3:]),
+                   on_result)
+
+    async def run(self):
+        """保持上游连接，断线后按顺序尝试各个矿池重连"""
+        attempt = 0
+        while True:
+            for pool in self.proxy.pools:
+                try:
+                    await self._session(pool)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.proxy.log(f"⚠️ 上游#{self.index} {pool} 连接断开: {str(e) or type(e).__name__}")
+                if self.connected:
+                    attempt = 0
+                    self.disconnects += 1
+                self._reset()
+            await asyncio.sleep(RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)])
+            attempt += 1
+
+    def _reset(self):
+        """上游断开：下游的extranonce已失效，断开所有下游让它们重新连接"""
+        self.connected = False
+        self.ready.clear()
+        self._authorized = False
+        self._calls.clear()
+        self.extranonce1 = None
+        self.notify = None
+        for downstream in list(self.downstreams):
+            downstream.writer.close()
+            self.detach(downstream)
+        self._free_prefixes = []
+        self._next_prefix = 0
+
+    async def _session(self, pool):
+        host, port = pool_probe.parse_pool_address(pool)
+        reader, self._writer = await asyncio.wait_for(asyncio.open_connection(host, port),
+                                                      pool_probe.DEFAULT_TIMEOUT)
+        self.pool = pool
+        self.connected = True
+        self.proxy.log(f"🔗 上游#{self.index} 已连接矿池: {pool}")
+        try:
+            self._call("mining.subscribe", [pool_probe.USER_AGENT], self._on_subscribed)
+            self._call("mining.authorize", [self.proxy.user, self.proxy.password], self._on_authorized)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("矿池关闭了连接")
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    self._on_message(message)
+        finally:
+            self._writer.close()
+
+    def _set_extranonce(self, extranonce1, extranonce2_size):
+        self.extranonce1, self.extranonce2_size = extranonce1, int(extranonce2_size)
+        self.prefix_bytes = max(0, min(PREFIX_BYTES, self.extranonce2_size - MIN_EXTRANONCE2_BYTES))
+        if not self.prefix_bytes:
+            self.proxy.log(f"⚠️ 上游#{self.index} 的extranonce2只有 {self.extranonce2_size} 字节，只能接入一个下游")
+
+    def _on_subscribed(self, message):
+        try:
+            _, extranonce1, extranonce2_size = message['result']
+            self._set_extranonce(extranonce1, extranonce2_size)
+        except (TypeError, ValueError, KeyError):
+            self.proxy.log(f"❌ 上游#{self.index} 订阅失败: {message.get('error')}")
+            self._writer.close()
+            return
+        # 订阅和授权的响应顺序不固定，两者都完成后才接入下游
+        if self._authorized:
+            self.ready.set()
+
+    def _on_authorized(self, message):
+        if message.get('result') is not True:
+            self.proxy.log(f"❌ 上游#{self.index} 授权失败: {message.get('error')}")
+            self._writer.close()
+            return
+        self._authorized = True
+        if self.extranonce1 is not None:
+            self.ready.set()
+
+    def _on_message(self, message):
+        method = message.get('method')
+        if method is None:
+            callback = self._calls.pop(message.get('id'), None)
+            if callback is not None:
+                callback(message)
+            return
+        params = message.get('params') or []
+        if method == 'mining.notify':
+            # 同一个任务下发给所有下游，各下游的extranonce2前缀不同，不会重复计算
+            self.notify = params
+            self.proxy.jobs += 1
+            for downstream in self.downstreams:
+                downstream.send(message)
+        elif method == 'mining.set_difficulty':
+            self.difficulty = float(params[0]) if params else None
+            for downstream in self.downstreams:
+                downstream.send(message)
+        elif method == 'mining.set_extranonce':
+            # 上游的extranonce变了，下游的工作空间随之失效，断开重新订阅
+            try:
+                self._set_extranonce(params[0], params[1])
+            except (TypeError, ValueError, IndexError):
+                self.proxy.log(f"⚠️ 上游#{self.index} 收到无效的 mining.set_extranonce，已忽略: {params}")
+                return
+            for downstream in list(self.downstreams):
+                downstream.writer.close()
+
+
+class StratumProxy:
+    """局域网stratum代理：接受多台矿机的连接，通过一条或几条上游连接转发到矿池，
+    给每个下游分配extranonce2前缀并按下游统计份额"""
+
+    def __init__(self, pools, user, password="x", listen=PROXY_LISTEN, upstream_count=1, log=print):
+        self.pools = list(pools)
+        self.user = user
+        self.password = password
+        self.listen = listen
+        self.log = log
+        self.upstreams = [Upstream(self, index) for index in range(max(1, upstream_count))]
+        self.downstreams = set()
+        self.finished = {}  # 已断开的下游按矿工名累计的份额统计
+        self.jobs = 0
+        self.port = None
+
+    def _pick_upstream(self):
+        """选择下游最少的已就绪上游"""
+        ready = [upstream for upstream in self.upstreams if upstream.ready.is_set()]
+        return min(ready, key=lambda upstream: len(upstream.downstreams)) if ready else None
+
+    async def _wait_upstream(self):
+        deadline = time.monotonic() + SUBSCRIBE_WAIT
+        while time.monotonic() < deadline:
+            upstream = self._pick_upstream()
+            if upstream is not None:
+                return upstream
+            await asyncio.sleep(0.1)
+        return None
+
+    async def _handle_downstream(self, reader, writer):
+        downstream = Downstream(writer)
+        self.downstreams.add(downstream)
+        self.log(f"➕ 下游已连接: {downstream.peer}")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    await self._on_downstream_message(downstream, message)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if downstream.upstream is not None:
+                downstream.upstream.detach(downstream)
+            self.downstreams.discard(downstream)
+            self._account(downstream)
+            writer.close()
+            self.log(f"➖ 下游已断开: {downstream.peer}（{downstream.worker or '未授权'}，"
+                     f"接受 {downstream.accepted} / 拒绝 {downstream.rejected}）")
+
+    async def _on_downstream_message(self, downstream, message):
+        request_id, method, params = message.get('id'), message.get('method'), message.get('params') or []
+        if method == 'mining.subscribe':
+            upstream = downstream.upstream or await self._wait_upstream()
+            if upstream is None or (downstream.upstream is None and not upstream.attach(downstream)):
+                downstream.send({"id": request_id, "result": None, "error": [20, "No upstream available", None]})
+                return
+            downstream.send({"id": request_id, "result": upstream.subscribe_result(downstream), "error": None})
+            # 立即下发当前难度和任务，下游不用等下一个任务
+            if upstream.difficulty is not None:
+                downstream.send({"id": None, "method": "mining.set_difficulty", "params": [upstream.difficulty]})
+            if upstream.notify is not None:
+                downstream.send({"id": None, "method": "mining.notify", "params": upstream.notify})
+        elif method == 'mining.authorize':
+            # 局域网内的矿机都接受，矿工名只用于统计
+            downstream.worker = str(params[0]) if params else None
+            downstream.send({"id": request_id, "result": True, "error": None})
+        elif method == 'mining.submit':
+            if downstream.upstream is None or not downstream.upstream.connected:
+                downstream.send({"id": request_id, "result": None, "error": [25, "Not subscribed", None]})
+                return
+            downstream.upstream.submit(downstream, request_id, params)
+        elif method == 'mining.extranonce.subscribe':
+            downstream.send({"id": request_id, "result": True, "error": None})
+        elif request_id is not None:
+            downstream.send({"id": request_id, "result": None, "error": [20, f"Unsupported method {method}", None]})
+
+    def _account(self, downstream):
+        """下游断开后把它的份额计入该矿工名的累计统计（矿机重连后统计不丢失）"""
+        totals = self.finished.setdefault(downstream.worker or downstream.peer, dict.fromkeys(WORKER_COUNTERS, 0))
+        for key in WORKER_COUNTERS:
+            totals[key] += getattr(downstream, key)
+
+    def worker_totals(self):
+        """按矿工名汇总的份额统计（包括已断开的连接）"""
+        totals = {worker: dict(values) for worker, values in self.finished.items()}
+        for downstream in self.downstreams:
+            values = totals.setdefault(downstream.worker or downstream.peer, dict.fromkeys(WORKER_COUNTERS, 0))
+            for key in WORKER_COUNTERS:
+                values[key] += getattr(downstream, key)
+        return totals
+
+    def stats(self):
+        """代理和每个下游的统计"""
+        return {
+            'listen': self.listen,
+            'jobs': self.jobs,
+            'upstreams': [{'index': upstream.index, 'pool': upstream.pool, 'connected': upstream.connected,
+                           'downstreams': len(upstream.downstreams), 'disconnects': upstream.disconnects}
+                          for upstream in self.upstreams],
+            'downstreams': [downstream.to_dict() for downstream in
+                            sorted(self.downstreams, key=lambda downstream: downstream.connected_at)],
+            'workers': self.worker_totals(),
+        }
+
+    def log_stats(self):
+        connected = sum(1 for upstream in self.upstreams if upstream.connected)
+        totals = self.worker_totals()
+        accepted = sum(values['accepted'] for values in totals.values())
+        rejected = sum(values['rejected'] for values in totals.values())
+        self.log(f"📊 代理: {len(self.downstreams)} 个下游，上游 {connected}/{len(self.upstreams)} 已连接，"
+                 f"任务 {self.jobs}，接受 {accepted} / 拒绝 {rejected}")
+        for worker, values in sorted(totals.items()):
+            self.log(f"    {worker}: 提交 {values['submitted']}，接受 {values['accepted']} / 拒绝 {values['rejected']}")
+
+    async def serve(self, stop_event, stats_interval=STATS_INTERVAL):
+        """运行代理直到 stop_event 被设置"""
+        host, port = parse_listen(self.listen)
+        server = await asyncio.start_server(self._handle_downstream, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.log(f"🔀 stratum代理已启动: {host}:{self.port} -> {', '.join(self.pools)}"
+                 f"（{len(self.upstreams)} 条上游连接）")
+        tasks = [asyncio.ensure_future(upstream.run()) for upstream in self.upstreams]
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), stats_interval)
+                    break
+                except asyncio.TimeoutError:
+                    self.log_stats()
+        finally:
+            server.close()
+            for task in tasks:
+                task.cancel()
+            for downstream in list(self.downstreams):
+                downstream.writer.close()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.log_stats()
+
+
+def create_proxy(config, listen=None, upstream_count=None, log=print):
+    """按配置创建代理：上游使用配置中的矿池和钱包"""
+    settings = miner_config.settings_from_config(config)
+    if settings['use_wallet_worker_format'] and settings['worker_name'].strip():
+        user, password = f"{settings['wallet_address']}.{settings['worker_name']}", "x"
+    else:
+        user, password = settings['wallet_address'], settings['worker_name'].strip() or "x"
+    return StratumProxy(miner_config.pool_list(settings, config, log=log), user, password,
+                        listen=listen or config.get('proxy_listen', PROXY_LISTEN),
+                        upstream_count=int(upstream_count or config.get('proxy_upstreams', 1)), log=log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scash Miner 局域网stratum代理")
+    parser.add_argument('--config', default=miner_config.CONFIG_PATH, help="配置文件路径")
+    parser.add_argument('--listen', help=f"监听地址（默认使用配置中的 proxy_listen，{PROXY_LISTEN}）")
+    parser.add_argument('--upstreams', type=int, help="上游连接数（默认使用配置中的 proxy_upstreams）")
+    parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL, help="输出统计的间隔（秒）")
+    args = parser.parse_args(argv)
+
+    config = miner_config.load_config(args.config)
+    proxy = create_proxy(config, args.listen, args.upstreams)
+
+    async def run():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+        await proxy.serve(stop_event, args.stats_interval)
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
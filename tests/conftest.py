@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(ROOT, "tools")
+sys.path[:0] = [ROOT, TOOLS]
+
+
+def write_tree(root, files):
+    """按 {相对路径: 内容} 创建文件，用于模拟 /proc 和 /sys"""
+    for relative, content in files.items():
+        path = os.path.join(str(root), relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+    return str(root)
+
+
+@pytest.fixture
+def fake_miner_path():
+    return os.path.join(TOOLS, "fake_miner.py")
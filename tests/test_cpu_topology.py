@@ -0,0 +1,68 @@
+from conftest import write_tree
+
+import cpu_topology
+from cpu_topology import check_threads, read_topology
+
+
+def smt_sysfs(root, l3_size="4096K"):
+    """8个逻辑CPU、4个物理核心（每核2个超线程），2个NUMA节点，每个节点一个L3缓存"""
+    files = {"devices/system/cpu/online": "0-7\n"}
+    for cpu in range(8):
+        core = cpu % 4
+        node = core // 2
+        base = f"devices/system/cpu/cpu{cpu}"
+        files[f"{base}/topology/physical_package_id"] = "0\n"
+        files[f"{base}/topology/core_id"] = f"{core}\n"
+        files[f"{base}/cache/index0/level"] = "1\n"
+        files[f"{base}/cache/index0/size"] = "32K\n"
+        files[f"{base}/cache/index3/level"] = "3\n"
+        files[f"{base}/cache/index3/size"] = f"{l3_size}\n"
+        files[f"{base}/cache/index3/shared_cpu_list"] = "0-1,4-5\n" if node == 0 else "2-3,6-7\n"
+    files["devices/system/node/node0/cpulist"] = "0-1,4-5\n"
+    files["devices/system/node/node1/cpulist"] = "2-3,6-7\n"
+    return write_tree(root, files)
+
+
+def test_parse_helpers():
+    assert cpu_topology.parse_cpu_list("0-3,8,10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert cpu_topology.parse_cache_size("32768K") == 32 * 1024 * 1024
+    assert cpu_topology.parse_cache_size("2M") == 2 * 1024 * 1024
+
+
+def test_read_topology(tmp_path):
+    topology = read_topology(smt_sysfs(tmp_path))
+    assert topology.logical_cpus == 8
+    assert topology.physical_cores == 4
+    assert topology.smt
+    assert topology.numa_nodes == {0: [0, 1, 4, 5], 1: [2, 3, 6, 7]}
+    # 共享同一个L3的CPU只记录一次
+    assert topology.l3_caches == [(4 * 1024 * 1024, [0, 1, 4, 5]), (4 * 1024 * 1024, [2, 3, 6, 7])]
+    assert "2 个NUMA节点" in topology.describe()
+
+
+def test_recommended_threads_limited_by_l3_and_cpus(tmp_path):
+    # 每个4MB的L3可容纳2个RandomX线程
+    assert read_topology(smt_sysfs(tmp_path / "small")).recommended_threads() == 4
+    # L3足够大时不超过共享该L3的逻辑CPU数
+    assert read_topology(smt_sysfs(tmp_path / "large", "64M")).recommended_threads() == 8
+
+
+def test_recommended_threads_without_cache_info(tmp_path):
+    root = write_tree(tmp_path, {"devices/system/cpu/online": "0-3\n"})
+    topology = read_topology(root)
+    assert topology.l3_caches == []
+    assert topology.physical_cores == 4
+    assert topology.recommended_threads() == 3
+
+
+def test_read_topology_missing_sysfs(tmp_path):
+    assert read_topology(str(tmp_path / "missing")) is None
+
+
+def test_check_threads(tmp_path):
+    topology = read_topology(smt_sysfs(tmp_path))
+    assert check_threads(4, topology) is None
+    assert check_threads(6, topology) is None
+    assert "L3缓存" in check_threads(7, topology)
+    assert "超过了逻辑CPU数" in check_threads(9, topology)
+    assert check_threads(64, None) is None
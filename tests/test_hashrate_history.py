@@ -0,0 +1,75 @@
+import types
+
+import pytest
+
+from hashrate_history import HashrateHistory
+from miner_events import MinerOutputParser, MiningStatistics
+
+
+def filled(seconds=120, step=2):
+    """每 step 秒一个样本，算力等于时间戳"""
+    history = HashrateHistory()
+    for timestamp in range(0, seconds, step):
+        history.add(timestamp, float(timestamp))
+    return history
+
+
+def test_tiers_average_each_bucket():
+    history = filled()
+    assert history.resolutions == [10, 60, 900]
+    ten = history.series(10)
+    assert len(ten) == 12
+    assert ten[0] == (0.0, 4.0)
+    assert ten[-1] == (110.0, 114.0)
+    assert history.series(60) == [(0.0, 29.0), (60.0, 89.0)]
+    assert history.series(900) == [(0.0, 59.0)]
+    assert history.latest() == (110.0, 114.0)
+    assert history.version == 60
+
+
+def test_series_since():
+    history = filled()
+    assert [point[0] for point in history.series(10, since=85)] == [90.0, 100.0, 110.0]
+    assert history.series(60, since=60) == [(60.0, 89.0)]
+    assert history.series(10, since=1000) == []
+
+
+def test_ring_buffer_keeps_newest():
+    history = HashrateHistory(tiers=((10, 30),))
+    for bucket in range(5):
+        history.add(bucket * 10, float(bucket))
+    assert history.series(10) == [(20.0, 2.0), (30.0, 3.0), (40.0, 4.0)]
+
+
+def test_samples_going_back_in_time_are_ignored():
+    history = HashrateHistory()
+    history.add(100, 10.0)
+    history.add(50, 99.0)
+    assert history.series(10) == [(100.0, 10.0)]
+
+
+def test_average():
+    history = HashrateHistory()
+    assert history.latest() is None and history.average(600) is None
+    # 第一个小时 100 H/s，之后一个小时 200 H/s
+    for timestamp in range(0, 7200, 10):
+        history.add(timestamp, 100.0 if timestamp < 3600 else 200.0)
+    assert history.average(600) == 200.0
+    assert history.average(7200) == pytest.approx(150.0, rel=0.02)
+    assert history.average(600, now=3590) == 100.0
+    assert history.average(10, now=-100) is None
+
+
+def test_unknown_resolution():
+    with pytest.raises(ValueError):
+        HashrateHistory().series(30)
+
+
+def test_attach_records_pipeline_hashrate():
+    parser = MinerOutputParser()
+    stats = MiningStatistics().attach(parser)
+    pipeline = types.SimpleNamespace(stats=stats, parsers={'0': parser})
+    history = HashrateHistory().attach(pipeline)
+    parser.feed_line("cpu hashrate: 10s: 1234.5 H/s", timestamp=100.0)
+    parser.feed_line("cpu result accepted [ 35ms ]", timestamp=101.0)
+    assert history.series(10) == [(100.0, 1234.5)]
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+from conftest import write_tree
+
+import host_advisor
+import hugepages
+from host_advisor import OK, WARN, INFO
+
+# 1 个挖矿进程 4 个线程需要的2MB大页
+NEEDED = hugepages.required_pages(4)
+
+
+def meminfo(total, free):
+    return f"MemTotal: 16000000 kB\nHugePages_Total: {total}\nHugePages_Free: {free}\nHugepagesize: 2048 kB\n"
+
+
+@pytest.fixture
+def roots(tmp_path):
+    """假的 /proc 和 /sys：4核无SMT的AMD CPU，调频策略 performance，已预留足够的大页"""
+    sysfs = {
+        "devices/system/cpu/online": "0-3\n",
+        "kernel/mm/transparent_hugepage/enabled": "always [madvise] never\n",
+        "module/msr/refcnt": "0\n",
+    }
+    for cpu in range(4):
+        sysfs[f"devices/system/cpu/cpu{cpu}/topology/physical_package_id"] = "0\n"
+        sysfs[f"devices/system/cpu/cpu{cpu}/topology/core_id"] = f"{cpu}\n"
+        sysfs[f"devices/system/cpu/cpu{cpu}/cpufreq/scaling_governor"] = "performance\n"
+    proc = {
+        "cpuinfo": "processor\t: 0\nvendor_id\t: AuthenticAMD\n",
+        "meminfo": meminfo(NEEDED + 10, NEEDED + 10),
+    }
+    return write_tree(tmp_path / "proc", proc), write_tree(tmp_path / "sys", sysfs)
+
+
+def findings(report):
+    return {finding['check']: finding for finding in report['findings']}
+
+
+def test_governor(roots):
+    _, sysfs = roots
+    assert host_advisor.check_governor(sysfs).status == OK
+    write_tree(sysfs, {"devices/system/cpu/cpu1/cpufreq/scaling_governor": "powersave\n"})
+    finding = host_advisor.check_governor(sysfs)
+    assert finding.status == WARN
+    assert "performance x3" in finding.message and "powersave x1" in finding.message
+    assert host_advisor.check_governor(os.path.join(sysfs, "missing")).status == INFO
+
+
+def test_hugepages_enough(roots):
+    proc, sysfs = roots
+    finding, ok = host_advisor.check_hugepages(proc, sysfs, 4, 1)
+    assert ok and finding.status == OK
+
+
+def test_hugepages_shortfall(roots):
+    proc, sysfs = roots
+    write_tree(proc, {"meminfo": meminfo(100, 100)})
+    finding, ok = host_advisor.check_hugepages(proc, sysfs, 4, 1)
+    assert not ok and finding.status == WARN
+    assert finding.fix == f"sudo sysctl -w vm.nr_hugepages={NEEDED}"
+    assert 0 < finding.impact_pct <= 40
+
+
+def test_hugepages_held_by_running_miner_count_as_available(roots):
+    proc, sysfs = roots
+    # 挖矿程序正在运行并占用了大部分大页，其他进程占用了10页
+    write_tree(proc, {
+        "meminfo": meminfo(NEEDED + 10, 5),
+        "100/status": f"Name:\tSRBMiner-MULTI\nHugetlbPages:\t{(NEEDED - 5) * 2048} kB\n",
+        "200/status": f"Name:\tpostgres\nHugetlbPages:\t{10 * 2048} kB\n",
+    })
+    status = hugepages.read_status(proc, sysfs)
+    assert status.held == NEEDED - 5
+    assert status.shortfall(4) == 0
+    finding, ok = host_advisor.check_hugepages(proc, sysfs, 4, 1)
+    assert ok and finding.status == OK
+
+    # 只算挖矿进程占用的：其他进程占用的大页不可用
+    assert status.shortfall(4, instances=2) == hugepages.required_pages(4, 2) - NEEDED
+
+
+def test_thp(roots):
+    _, sysfs = roots
+    assert host_advisor.check_thp(sysfs, True).status == OK
+    assert host_advisor.check_thp(sysfs, False).status == INFO
+    write_tree(sysfs, {"kernel/mm/transparent_hugepage/enabled": "always madvise [never]\n"})
+    assert host_advisor.check_thp(sysfs, False).status == WARN
+
+
+def test_msr(roots, monkeypatch):
+    proc, sysfs = roots
+    monkeypatch.setattr(os, 'geteuid', lambda: 0, raising=False)
+    assert host_advisor.check_msr(proc, sysfs).status == OK
+    monkeypatch.setattr(os, 'geteuid', lambda: 1000, raising=False)
+    finding = host_advisor.check_msr(proc, sysfs)
+    assert finding.status == WARN and finding.impact_pct == 10
+    os.remove(os.path.join(sysfs, "module", "msr", "refcnt"))
+    os.rmdir(os.path.join(sysfs, "module", "msr"))
+    assert "modprobe msr" in host_advisor.check_msr(proc, sysfs).fix
+
+
+def test_diagnose_scores_multiply(roots, monkeypatch):
+    proc, sysfs = roots
+    monkeypatch.setattr(os, 'geteuid', lambda: 0, raising=False)
+    report = host_advisor.diagnose(4, 1, sysfs, proc)
+    assert report['score'] == 100
+    assert report['cpu']['vendor'] == 'AuthenticAMD'
+    assert all(finding['status'] != WARN for finding in report['findings'])
+
+    # 调频策略（-5%）和大页不足（-40%）同时存在时按乘法叠加
+    write_tree(sysfs, {"devices/system/cpu/cpu0/cpufreq/scaling_governor": "powersave\n"})
+    write_tree(proc, {"meminfo": meminfo(0, 0)})
+    report = host_advisor.diagnose(4, 1, sysfs, proc)
+    checks = findings(report)
+    assert checks['governor']['status'] == WARN
+    assert checks['hugepages']['impact_pct'] == 40
+    assert report['score'] == round(0.95 * 0.6 * 100)
+    assert "💡" in host_advisor.format_report(report)
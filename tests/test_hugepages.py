@@ -0,0 +1,102 @@
+import os
+
+from conftest import write_tree
+
+import hugepages
+
+
+def fake_roots(tmp_path, total=1300, free=1300, processes=None, gigantic=None):
+    """/proc/meminfo（2MB大页）、挖矿进程的 /proc/<pid>/status，以及可选的1GB大页sysfs目录"""
+    proc = {"meminfo": (f"MemTotal:       32000000 kB\nMemFree:        20000000 kB\n"
+                        f"HugePages_Total:    {total}\nHugePages_Free:     {free}\nHugePages_Rsvd:        0\n"
+                        f"Hugepagesize:       2048 kB\n"),
+            "sys/vm/nr_hugepages": f"{total}\n"}
+    for pid, (name, held_kb) in (processes or {}).items():
+        proc[f"{pid}/status"] = f"Name:\t{name}\nState:\tS (sleeping)\nHugetlbPages:\t{held_kb} kB\n"
+    sysfs = {"kernel/mm/transparent_hugepage/enabled": "always [madvise] never\n"}
+    if gigantic is not None:
+        sysfs["kernel/mm/hugepages/hugepages-1048576kB/nr_hugepages"] = f"{gigantic}\n"
+    return write_tree(tmp_path / "proc", proc), write_tree(tmp_path / "sys", sysfs)
+
+
+def test_required_pages():
+    # 数据集 2080MB + 缓存 256MB = 1168 个2MB大页，每个线程再加1页
+    assert hugepages.required_pages(1) == 1169
+    assert hugepages.required_pages(8) == 1176
+    assert hugepages.required_pages(8, instances=2) == 2 * 1168 + 8
+    # 1GB大页：数据集和缓存共3页，8个线程的scratchpad共16MB向上取整为1页
+    assert hugepages.required_pages(8, page_kb=1024 * 1024) == 4
+
+
+def test_read_meminfo(tmp_path):
+    proc, _ = fake_roots(tmp_path, total=1300, free=200)
+    meminfo = hugepages.read_meminfo(proc)
+    assert meminfo['HugePages_Total'] == 1300
+    assert meminfo['HugePages_Free'] == 200
+    assert meminfo['Hugepagesize'] == 2048
+    assert hugepages.read_meminfo(str(tmp_path / "missing")) is None
+
+
+def test_read_status_with_gigantic_pages(tmp_path):
+    proc, sysfs = fake_roots(tmp_path, total=1300, free=200, gigantic=3)
+    status = hugepages.read_status(proc, sysfs)
+    assert (status.total, status.free, status.page_kb) == (1300, 200, 2048)
+    assert status.gigantic_supported and status.gigantic_total == 3
+    assert status.to_dict()['held'] == 0
+
+
+def test_read_status_without_hugepages(tmp_path):
+    proc = write_tree(tmp_path / "proc", {"meminfo": "MemTotal: 1000 kB\n"})
+    assert hugepages.read_status(proc, str(tmp_path / "sys")) is None
+
+
+def test_miner_held_pages(tmp_path):
+    proc, _ = fake_roots(tmp_path, processes={
+        100: ("SRBMiner-MULTI", 1168 * 2048),
+        101: ("srbminer-multi", 10 * 2048),
+        200: ("postgres", 50 * 2048),
+    })
+    assert hugepages.miner_held_pages(2048, proc) == 1178
+
+
+def test_shortfall_counts_pages_held_by_miner(tmp_path):
+    # 共1300页：挖矿程序占用1176页，其他进程占用100页，空闲24页
+    proc, sysfs = fake_roots(tmp_path, total=1300, free=24, processes={
+        100: ("SRBMiner-MULTI", 1176 * 2048),
+        200: ("postgres", 100 * 2048),
+    })
+    status = hugepages.read_status(proc, sysfs)
+    assert status.held == 1176
+    assert status.available == 1200
+    assert status.shortfall(8) == 0
+    assert status.shortfall(8, instances=2) == hugepages.required_pages(8, 2) - 1200
+    assert "挖矿程序占用 1176 页" in status.describe()
+
+
+def test_preflight_enough(tmp_path):
+    proc, sysfs = fake_roots(tmp_path, total=1300, free=1300, gigantic=0)
+    messages = []
+    assert hugepages.preflight(8, log=messages.append, proc_root=proc, sysfs_root=sysfs) is True
+    assert any("1GB大页" in message for message in messages)
+
+
+def test_preflight_unprivileged_does_not_reserve(tmp_path, monkeypatch):
+    proc, sysfs = fake_roots(tmp_path, total=100, free=100)
+    monkeypatch.setattr(os, 'geteuid', lambda: 1000, raising=False)
+    messages = []
+    assert hugepages.preflight(8, reserve=True, log=messages.append, proc_root=proc, sysfs_root=sysfs) is False
+    assert any("需要root权限" in message for message in messages)
+    assert any("vm.nr_hugepages=1176" in message for message in messages)
+    with open(os.path.join(proc, "sys", "vm", "nr_hugepages")) as f:
+        assert f.read().strip() == "100"
+
+
+def test_preflight_reserve_as_root(tmp_path, monkeypatch):
+    proc, sysfs = fake_roots(tmp_path, total=100, free=100)
+    monkeypatch.setattr(os, 'geteuid', lambda: 0, raising=False)
+    messages = []
+    # 写入了 nr_hugepages，但 meminfo 没有变化（相当于内存碎片过多只预留到部分大页）
+    assert hugepages.preflight(8, reserve=True, log=messages.append, proc_root=proc, sysfs_root=sysfs) is False
+    with open(os.path.join(proc, "sys", "vm", "nr_hugepages")) as f:
+        assert f.read().strip() == "1176"
+    assert any("内存碎片" in message for message in messages)
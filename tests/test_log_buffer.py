@@ -0,0 +1,61 @@
+import pytest
+
+from log_buffer import DROP_NEWEST, LogBuffer
+
+
+def test_coalesces_lines_that_differ_only_in_numbers():
+    buffer = LogBuffer()
+    assert buffer.append("hashrate: 100.5 H/s") is True
+    assert buffer.append("hashrate: 101.2 H/s") is False
+    assert buffer.append("hashrate: 99 H/s") is False
+    buffer.append("cpu result accepted [ 35ms ]")
+    buffer.append("hashrate: 98 H/s")
+    assert len(buffer) == 3
+    # 合并后保留最新的内容
+    assert buffer.drain() == ["hashrate: 99 H/s (x3)", "cpu result accepted [ 35ms ]", "hashrate: 98 H/s"]
+    assert len(buffer) == 0
+    stats = buffer.stats()
+    assert (stats['appended'], stats['coalesced'], stats['dropped']) == (5, 2, 0)
+
+
+def test_coalesce_disabled():
+    buffer = LogBuffer(coalesce=False)
+    buffer.append("hashrate: 100 H/s")
+    buffer.append("hashrate: 101 H/s")
+    assert buffer.drain() == ["hashrate: 100 H/s", "hashrate: 101 H/s"]
+
+
+def test_drop_oldest():
+    buffer = LogBuffer(maxlen=3)
+    for line in ("a", "b", "c", "d", "e"):
+        buffer.append(line)
+    assert buffer.drain() == ["c", "d", "e"]
+    stats = buffer.stats()
+    assert (stats['dropped'], stats['max_depth'], stats['depth']) == (2, 3, 0)
+
+
+def test_drop_newest():
+    buffer = LogBuffer(maxlen=3, overflow=DROP_NEWEST)
+    for line in ("a", "b", "c", "d", "e"):
+        buffer.append(line)
+    assert buffer.drain() == ["a", "b", "c"]
+    assert buffer.stats()['dropped'] == 2
+
+
+def test_full_buffer_still_coalesces():
+    buffer = LogBuffer(maxlen=2)
+    buffer.append("a")
+    buffer.append("hashrate: 1 H/s")
+    buffer.append("hashrate: 2 H/s")
+    assert buffer.drain() == ["a", "hashrate: 2 H/s (x2)"]
+    assert buffer.stats()['dropped'] == 0
+
+
+def test_configure():
+    buffer = LogBuffer()
+    buffer.configure(maxlen=5, overflow=DROP_NEWEST)
+    assert (buffer.maxlen, buffer.overflow) == (5, DROP_NEWEST)
+    with pytest.raises(ValueError):
+        buffer.configure(maxlen=0)
+    with pytest.raises(ValueError):
+        buffer.configure(overflow='block')
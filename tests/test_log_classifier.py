@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.run import SAMPLE_LINES
+from log_classifier import LogClassifier, build_keyword_table, classify_line
+
+
+def brute_force(table, line):
+    """逐个关键词做子串查找，作为分类结果的参照"""
+    text = line.lower()
+    flags = 0
+    for keyword, keyword_flags in table.items():
+        if keyword in text:
+            flags |= keyword_flags
+    return flags
+
+
+EXTRA_LINES = [
+    "",
+    "Difficulty set to 5000, new job received",
+    "job received: shares: 10 accepted, 2 rejected",
+    "connection failed: error: failed to connect to pool",
+    "Couldn't get active devfee pools - check your internet/firewall!",
+    "devfee timeout, devfee pool connection failed",
+    "pool disconnected, reconnected, connected",
+    "Hash Rate 100 H/S, HASHRATE 99 h/s",
+    "连接失败，连接超时，开始挖矿，接受任务，哈希率",
+    "socket errorerror failedfailed",
+    "no route to host; network is unreachable; host unreachable",
+]
+
+
+@pytest.mark.parametrize("line", SAMPLE_LINES + EXTRA_LINES)
+def test_default_table_matches_brute_force(line):
+    assert classify_line(line) == brute_force(build_keyword_table(), line)
+
+
+# 前缀、包含和部分重叠的关键词
+OVERLAPPING = {'ab': 1, 'abc': 2, 'bcd': 4, 'cd': 8, 'c': 16, 'abcde': 32, 'dea': 64, 'aab': 128}
+
+OVERLAPPING_LINES = [
+    "ab", "abc", "abcd", "abcde", "abcdea", "aabcd", "xabx", "bcdeab", "cdeaab",
+    "abab", "aaab", "abcdeabc", "dabcd", "ABCDE", "zzz",
+]
+
+
+@pytest.mark.parametrize("line", OVERLAPPING_LINES)
+def test_overlapping_keywords_match_brute_force(line):
+    assert LogClassifier(OVERLAPPING).classify(line) == brute_force(OVERLAPPING, line)
+
+
+def test_overlapping_keywords_exhaustive():
+    classifier = LogClassifier(OVERLAPPING)
+    lines = [""]
+    for _ in range(6):
+        lines = [line + char for line in lines for char in "abcde"]
+        for line in lines:
+            assert classifier.classify(line) == brute_force(OVERLAPPING, line), line
@@ -0,0 +1,59 @@
+import gzip
+import os
+
+from log_history import LogHistoryPager
+from log_writer import MiningLogWriter, rotated_segments
+
+
+def write_segment(path, lines, compress=False):
+    data = "".join(f"{line}\n" for line in lines).encode()
+    with (gzip.open(path, 'wb') if compress else open(path, 'wb')) as f:
+        f.write(data)
+
+
+def test_segment_being_compressed_is_listed_once(tmp_path):
+    log_path = str(tmp_path / "mining_log.txt")
+    older = str(tmp_path / "mining_log.20260101-000000.txt")
+    newer = str(tmp_path / "mining_log.20260102-000000.txt")
+    write_segment(older + ".gz", ["a1", "a2"], compress=True)
+    # 压缩文件已就位、原文件还没删除
+    write_segment(newer, ["b1", "b2"])
+    write_segment(newer + ".gz", ["b1", "b2"], compress=True)
+    write_segment(log_path, ["c1"])
+
+    assert rotated_segments(log_path) == [older + ".gz", newer + ".gz"]
+
+    pager = LogHistoryPager(log_path)
+    lines = []
+    while pager.has_more:
+        lines = pager.read_previous(2) + lines
+    pager.close()
+    assert lines == ["a1", "a2", "b1", "b2", "c1"]
+
+
+def test_leftover_original_is_recompressed_and_removed(tmp_path):
+    log_path = str(tmp_path / "mining_log.txt")
+    segment = str(tmp_path / "mining_log.20260102-000000.txt")
+    write_segment(segment, ["b1"])
+    write_segment(segment + ".gz", ["b1"], compress=True)
+
+    writer = MiningLogWriter(log_path, rotate='none')
+    writer.open()
+    writer.close()
+    writer.wait_for_compression()
+    assert not os.path.exists(segment)
+    assert rotated_segments(log_path) == [segment + ".gz"]
+
+
+def test_retention_counts_each_segment_once(tmp_path):
+    log_path = str(tmp_path / "mining_log.txt")
+    for day in range(1, 4):
+        segment = str(tmp_path / f"mining_log.2026010{day}-000000.txt")
+        write_segment(segment, [str(day)])
+        write_segment(segment + ".gz", [str(day)], compress=True)
+
+    writer = MiningLogWriter(log_path, rotate='none', backup_count=3)
+    writer.open()
+    writer.close()
+    writer.wait_for_compression()
+    assert len(rotated_segments(log_path)) == 3
@@ -0,0 +1,106 @@
+from miner_events import (DevfeeEvent, DifficultyEvent, HashrateEvent, JobEvent, LargePagesEvent,
+                          MinerOutputParser, MiningStatistics, PoolEvent, ShareEvent, format_hashrate)
+
+
+def only(events, kind):
+    matched = [event for event in events if isinstance(event, kind)]
+    assert len(matched) == 1, events
+    return matched[0]
+
+
+def test_hashrate_windows():
+    parser = MinerOutputParser()
+    event = only(parser.parse_line("cpu hashrate: 10s: 1234.56 H/s 60s: 1.23 KH/s", 1.0), HashrateEvent)
+    assert event.timestamp == 1.0
+    assert event.values == {'10s': 1234.56, '60s': 1230.0}
+    assert event.hashrate == 1234.56
+    event = only(parser.parse_line("Total hashrate: 2.5 MH/s"), HashrateEvent)
+    assert event.values == {None: 2.5e6}
+
+
+def test_shares():
+    parser = MinerOutputParser()
+    share = only(parser.parse_line("cpu result accepted [ 35ms ] shares: 120/1"), ShareEvent)
+    assert share.accepted and share.latency_ms == 35.0 and share.reason is None
+    share = only(parser.parse_line("cpu result rejected [ reason: Low difficulty share ] [ 40ms ]"), ShareEvent)
+    assert not share.accepted
+    assert share.latency_ms == 40.0
+    assert share.reason == "low difficulty share"
+
+
+def test_job_and_difficulty():
+    parser = MinerOutputParser()
+    job = only(parser.parse_line("pool1 new job from scash.pool.example:3333 diff 1.5k height 123456"), JobEvent)
+    assert job.difficulty == 1500.0 and job.height == 123456
+    difficulty = only(parser.parse_line("pool1 difficulty set to 1200"), DifficultyEvent)
+    assert difficulty.difficulty == 1200.0
+
+
+def test_pool_connection():
+    parser = MinerOutputParser()
+    pool = only(parser.parse_line("pool1 connected to scash.pool.example:3333"), PoolEvent)
+    assert pool.connected and pool.pool == "scash.pool.example:3333"
+    line = "pool1 connection refused by 10.0.0.1:3333"
+    pool = only(parser.parse_line(line), PoolEvent)
+    assert not pool.connected
+    assert pool.pool == "10.0.0.1:3333"
+    assert pool.reason == line
+
+
+def test_devfee_lines_are_separate():
+    parser = MinerOutputParser()
+    events = parser.parse_line("devfee: connection failed to devfee pool, retrying in 10 sec")
+    assert [event.state for event in events if isinstance(event, DevfeeEvent)] == ['error']
+    # devfee的行不产生用户矿池的连接事件
+    assert not any(isinstance(event, PoolEvent) for event in events)
+    assert only(parser.parse_line("switching to devfee mining"), DevfeeEvent).state == 'start'
+    assert only(parser.parse_line("devfee mining finished, switching back"), DevfeeEvent).state == 'end'
+
+
+def test_large_pages():
+    parser = MinerOutputParser()
+    assert only(parser.parse_line("randomx: huge pages allocated 100%"), LargePagesEvent).enabled
+    assert not only(parser.parse_line("Unable to allocate large pages"), LargePagesEvent).enabled
+
+
+def test_unrelated_lines():
+    parser = MinerOutputParser()
+    assert parser.parse_line("cpu0 thread stats: nonce 0000abcd") == []
+    assert parser.parse_line("") == []
+
+
+def test_subscribers_filter_by_type():
+    parser = MinerOutputParser()
+    shares, everything = [], []
+    parser.subscribe(shares.append, (ShareEvent,))
+    parser.subscribe(everything.append)
+
+    def broken(event):
+        raise RuntimeError("订阅者出错")
+    parser.subscribe(broken)
+
+    parser.feed_line("cpu hashrate: 10s: 100 H/s")
+    parser.feed_line("cpu result accepted [ 35ms ]")
+    assert [type(event) for event in shares] == [ShareEvent]
+    assert [type(event) for event in everything] == [HashrateEvent, ShareEvent]
+
+    parser.unsubscribe(everything.append)
+    parser.feed_line("cpu result accepted [ 20ms ]")
+    assert len(everything) == 2 and len(shares) == 2
+
+
+def test_statistics():
+    parser = MinerOutputParser()
+    stats = MiningStatistics().attach(parser)
+    for line in ("pool1 connected to scash.pool.example:3333",
+                 "cpu hashrate: 10s: 1234.56 H/s",
+                 "cpu result accepted [ 30ms ]",
+                 "cpu result rejected [ reason: stale ] [ 50ms ]",
+                 "pool1 disconnected from scash.pool.example:3333"):
+        parser.feed_line(line)
+    assert stats.hashrate == 1234.56
+    assert (stats.accepted, stats.rejected) == (1, 1)
+    assert stats.average_latency_ms == 40.0
+    assert not stats.pool_connected and stats.disconnects == 1
+    assert stats.summary() == "1.23 KH/s | 接受 1 / 拒绝 1"
+    assert format_hashrate(12.5) == "12.50 H/s"
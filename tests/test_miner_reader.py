@@ -0,0 +1,49 @@
+from miner_reader import LineSplitter
+
+
+def test_lines_across_chunks():
+    splitter = LineSplitter()
+    assert splitter.feed(b"first li") == []
+    assert splitter.feed(b"ne\nsecond\nthi") == ["first line", "second"]
+    assert splitter.feed(b"rd\n") == ["third"]
+    assert splitter.flush() == []
+
+
+def test_crlf_and_bare_cr():
+    splitter = LineSplitter()
+    assert splitter.feed(b"a\r\nb\r\n") == ["a", "b"]
+    # 单独的\r也作为换行（同一行刷新）
+    assert splitter.feed(b"10%\r20%\r") == ["10%"]
+    assert splitter.feed(b"30%\n") == ["20%", "30%"]
+
+
+def test_crlf_split_between_chunks():
+    splitter = LineSplitter()
+    assert splitter.feed(b"line\r") == []
+    # \r\n被拆开时不能多出一个空行
+    assert splitter.feed(b"\nnext\r") == ["line"]
+    assert splitter.feed(b"\n") == ["next"]
+
+
+def test_multibyte_character_split_between_chunks():
+    data = "开始挖矿\n哈希率\n".encode('utf-8')
+    splitter = LineSplitter()
+    lines = []
+    for i in range(len(data)):
+        lines.extend(splitter.feed(data[i:i + 1]))
+    assert lines == ["开始挖矿", "哈希率"]
+
+
+def test_flush_returns_last_partial_line():
+    splitter = LineSplitter()
+    assert splitter.feed("末尾没有换行\r".encode('utf-8')) == []
+    assert splitter.flush() == ["末尾没有换行"]
+    assert splitter.flush() == []
+
+
+def test_invalid_bytes_are_replaced():
+    splitter = LineSplitter()
+    assert splitter.feed(b"bad \xff byte\n") == ["bad � byte"]
+    # 输出在多字节字符中间结束
+    assert splitter.feed("好".encode('utf-8')[:2]) == []
+    assert splitter.flush() == ["�"]
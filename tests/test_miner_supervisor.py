@@ -0,0 +1,45 @@
+import sys
+import threading
+import time
+
+from miner_supervisor import MinerGroup
+
+EMITTER = "import sys, time; print(sys.argv[1], flush=True); time.sleep(30)"
+
+
+def supervisor_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "MinerSupervisor" and thread.is_alive()]
+
+
+def test_group_runs_all_instances_on_one_loop_thread():
+    before = len(supervisor_threads())
+    group = MinerGroup(stop_timeout=2.0)
+    lines = {}
+    exited = threading.Event()
+    instances = [(name, [sys.executable, '-c', EMITTER, name], {}) for name in ("n0", "n1", "n2")]
+    try:
+        pids = group.start(instances, on_lines=lambda name, batch: lines.setdefault(name, []).extend(batch),
+                           on_exit=lambda returncode, stop_requested: exited.set()).result(10)
+        assert len(set(pids)) == 3
+        assert len(supervisor_threads()) == before + 1
+        deadline = time.monotonic() + 10
+        while len(lines) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert group.stop().result(10) in ('terminated', 'killed')
+        assert exited.wait(5)
+        assert lines == {"n0": ["n0"], "n1": ["n1"], "n2": ["n2"]}
+    finally:
+        group.shutdown()
+    assert len(supervisor_threads()) == before
+
+
+def test_group_restarts_after_shutdown():
+    group = MinerGroup(stop_timeout=2.0)
+    try:
+        for _ in range(2):
+            group.start([(None, [sys.executable, '-c', EMITTER, "x"], {})]).result(10)
+            assert group.running
+            group.shutdown()
+            assert not group.running
+    finally:
+        group.shutdown()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import socket
+import time
+
+import pool_probe
+from pool_probe import ProbeCache, parse_pool_address, probe_pools_async
+
+
+async def stratum_server(respond=True):
+    """本地矿池：收到 mining.subscribe 后按id回复（respond=False 时不回复）"""
+    async def handle(reader, writer):
+        line = await reader.readline()
+        if line and respond:
+            request = json.loads(line)
+            writer.write((json.dumps({"id": request['id'], "result": [], "error": None}) + "\n").encode())
+            await writer.drain()
+        await reader.read()
+        writer.close()
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_parse_pool_address():
+    assert parse_pool_address("stratum+tcp://pool.example:3333/") == ("pool.example", 3333)
+    assert parse_pool_address(" pool.example ") == ("pool.example", pool_probe.DEFAULT_PORT)
+
+
+def test_success_is_cached():
+    async def main():
+        server, address = await stratum_server()
+        async with server:
+            cache = ProbeCache()
+            first, = await probe_pools_async([address], 2.0, cache)
+            second, = await probe_pools_async([address], 2.0, cache)
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert first['socket_success'] and not first['cached']
+    assert first['address'] == "127.0.0.1" and first['rtt_ms'] is not None
+    assert second['cached'] and second['rtt_ms'] == first['rtt_ms']
+
+
+def test_cache_expires():
+    async def main():
+        server, address = await stratum_server()
+        async with server:
+            cache = ProbeCache(dns_ttl=0.05, result_ttl=0.05)
+            await probe_pools_async([address], 2.0, cache)
+            await asyncio.sleep(0.1)
+            return (await probe_pools_async([address], 2.0, cache))[0]
+
+    result = asyncio.run(main())
+    assert not result['cached'] and not result['dns_cached']
+
+
+def test_failure_is_not_cached():
+    address = f"127.0.0.1:{closed_port()}"
+    cache = ProbeCache()
+    result, = asyncio.run(probe_pools_async([address], 2.0, cache))
+    assert not result['socket_success']
+    assert any("TCP连接失败" in message for message in result['error_messages'])
+    assert cache.get_result(address) is None
+    # DNS结果仍然缓存
+    assert cache.get_addresses("127.0.0.1", int(address.rsplit(':', 1)[1])) == [(socket.AF_INET, "127.0.0.1")]
+
+
+def test_pools_share_one_deadline(monkeypatch):
+    async def hang(address, port, stratum=False):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(pool_probe, '_connect', hang)
+    started = time.monotonic()
+    results = asyncio.run(probe_pools_async(["127.0.0.1:1", "127.0.0.1:2", "127.0.0.1:3"], 0.3, ProbeCache()))
+    # 三个矿池并发检测，总耗时不超过一个总时限
+    assert time.monotonic() - started < 1.0
+    assert [result['error_messages'] for result in results] == [["TCP连接超时"]] * 3
+
+
+def test_stratum_probe_measures_subscribe_and_skips_cache(monkeypatch):
+    monkeypatch.setattr(pool_probe, 'SUBSCRIBE_TIMEOUT', 0.2)
+
+    async def main():
+        server, address = await stratum_server()
+        silent, silent_address = await stratum_server(respond=False)
+        async with server, silent:
+            cache = ProbeCache()
+            await probe_pools_async([address], 2.0, cache)
+            return await probe_pools_async([address, silent_address], 5.0, cache, stratum=True)
+
+    answered, silent = asyncio.run(main())
+    assert not answered['cached'] and answered['subscribe_ms'] is not None
+    assert silent['socket_success'] and silent['subscribe_ms'] is None
+    assert "stratum订阅无响应" in silent['error_messages']
@@ -0,0 +1,156 @@
+import json
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+import pool_selector
+from pool_selector import PoolHealth, PoolSelector
+
+SLOW_MS = 150
+
+
+class StratumStub(socketserver.ThreadingTCPServer):
+    """本地矿池：每个 mining.subscribe 等待 delay 秒后响应"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        super().__init__(("127.0.0.1", 0), StratumHandler)
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def address(self):
+        return f"stratum+tcp://127.0.0.1:{self.server_address[1]}"
+
+
+class StratumHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            time.sleep(self.server.delay)
+            self.wfile.write((json.dumps({"id": request["id"], "result": [[], "00", 4], "error": None})
+                              + "\n").encode())
+
+
+@pytest.fixture
+def pools():
+    servers = {"fast": StratumStub(), "slow": StratumStub(SLOW_MS / 1000)}
+    yield {name: server.address for name, server in servers.items()}
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def dead_pool():
+    """一个没有监听的端口：连接立即被拒绝"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"stratum+tcp://127.0.0.1:{port}"
+
+
+def quiet_selector(pool_list, **kwargs):
+    return PoolSelector(pool_list, timeout=2.0, log=lambda message: None, **kwargs)
+
+
+def test_health_score_penalizes_failures():
+    health = PoolHealth("pool")
+    assert health.score() == float('inf')
+    for value in (10.0, 20.0, 30.0):
+        health.record({'socket_success': True, 'subscribe_ms': value, 'rtt_ms': 1.0})
+    health.record({'socket_success': False})
+    assert health.latency_ms == 20.0
+    assert health.failure_rate == 0.25
+    assert health.consecutive_failures == 1
+    assert health.score() == pytest.approx(20.0 * (1 + pool_selector.FAILURE_PENALTY * 0.25))
+
+
+def test_rank_orders_by_subscribe_latency(pools, dead_pool):
+    selector = quiet_selector([dead_pool, pools["slow"], pools["fast"]])
+    assert selector.rank()
+    assert selector.order == [pools["fast"], pools["slow"], dead_pool]
+    assert selector.health[pools["slow"]].latency_ms >= SLOW_MS
+    assert selector.describe()[-1].endswith("不可达")
+
+
+def test_rank_reuses_recent_probe(pools):
+    selector = quiet_selector([pools["fast"]])
+    selector.rank()
+    probed_at = selector.last_probe
+    selector.rank(max_age=60)
+    assert selector.last_probe == probed_at
+    assert len(selector.health[pools["fast"]].samples) == 1
+
+
+def test_degraded_respects_cooldown(pools):
+    selector = quiet_selector([pools["slow"], pools["fast"]])
+    selector.probe_once()
+    selector.order = [pools["slow"], pools["fast"]]
+    # 刚切换过，冷却期内不再切换
+    selector.last_switch = time.monotonic()
+    assert selector.degraded() is None
+    selector.last_switch = time.monotonic() - pool_selector.SWITCH_COOLDOWN - 1
+    assert "得分" in selector.degraded()
+    # 当前已是最佳矿池
+    selector.order = [pools["fast"], pools["slow"]]
+    assert selector.degraded() is None
+
+
+def test_degraded_when_current_pool_goes_down(pools, dead_pool):
+    selector = quiet_selector([dead_pool, pools["fast"]])
+    selector.order = [dead_pool, pools["fast"]]
+    selector.last_switch = time.monotonic() - pool_selector.SWITCH_COOLDOWN - 1
+    selector.probe_once()
+    # 只失败一次时按得分判断（从未连通的得分为无穷大）
+    assert "得分" in selector.degraded()
+    selector.probe_once()
+    assert selector.degraded() == f"当前矿池连续 {pool_selector.DOWN_AFTER} 次检测失败"
+
+
+def test_failover_ignores_cooldown(pools, dead_pool):
+    selector = quiet_selector([dead_pool, pools["fast"]])
+    # 刚排好序，当前矿池随即不可用
+    selector.health[dead_pool].samples.extend([50.0] * 3)
+    assert selector.select()[0] == dead_pool
+    selector.probe_once()
+    assert selector.degraded() is None
+    selector.probe_once()
+    assert time.monotonic() - selector.last_switch < pool_selector.SWITCH_COOLDOWN
+    assert selector.degraded() == f"当前矿池连续 {pool_selector.DOWN_AFTER} 次检测失败"
+
+
+def test_similar_pools_do_not_switch(pools):
+    selector = quiet_selector([pools["fast"], pools["slow"]])
+    fast, slow = (selector.health[pools[name]] for name in ("fast", "slow"))
+    fast.samples.extend([5.0] * 3)
+    slow.samples.extend([3.0] * 3)
+    selector.order = [pools["fast"], pools["slow"]]
+    selector.last_switch = 0.0
+    # 相差不到 DEGRADE_MIN_MS 毫秒时不切换
+    assert selector.degraded() is None
+
+
+def test_background_probe_reorders_and_stops(pools, monkeypatch):
+    monkeypatch.setattr(pool_selector, 'SWITCH_COOLDOWN', 0.0)
+    selector = quiet_selector([pools["slow"], pools["fast"]], interval=0.05)
+    calls = []
+    switched = threading.Event()
+
+    def on_degraded(order):
+        calls.append(order)
+        switched.set()
+
+    selector.start(on_degraded)
+    assert switched.wait(5)
+    selector.stop()
+    assert calls[0] == [pools["fast"], pools["slow"]]
+    assert selector.active == pools["fast"]
+    count = len(calls)
+    time.sleep(0.3)
+    assert len(calls) == count
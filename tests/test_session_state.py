@@ -0,0 +1,78 @@
+import threading
+
+from session_state import IDLE, MINING, PROBING, STARTING, STOPPING, SessionStateMachine
+
+
+def test_normal_session():
+    machine = SessionStateMachine()
+    changes = []
+    machine.add_listener(lambda old, new, detail: changes.append((old, new, detail)))
+    session = machine.begin("开始")
+    assert session == 1 and machine.state == PROBING and machine.active
+    assert machine.transition(STARTING, session)
+    assert machine.transition(MINING, session, detail="已连接")
+    assert machine.transition(STOPPING, session)
+    assert machine.transition(IDLE, session)
+    assert not machine.active
+    assert changes == [(IDLE, PROBING, "开始"), (PROBING, STARTING, None), (STARTING, MINING, "已连接"),
+                       (MINING, STOPPING, None), (STOPPING, IDLE, None)]
+
+
+def test_begin_only_from_idle():
+    machine = SessionStateMachine()
+    assert machine.begin() == 1
+    assert machine.begin() is None
+    assert machine.session == 1
+
+
+def test_invalid_transition_is_rejected():
+    machine = SessionStateMachine()
+    assert not machine.transition(MINING)
+    session = machine.begin()
+    assert not machine.transition(MINING, session)
+    assert machine.state == PROBING
+
+
+def test_stale_session_is_rejected():
+    machine = SessionStateMachine()
+    old = machine.begin()
+    # 用户停止后又重新开始，旧会话的后台线程还在运行
+    assert machine.transition(STOPPING)
+    assert machine.transition(IDLE)
+    new = machine.begin()
+    assert new == old + 1
+    assert not machine.transition(STARTING, old)
+    assert not machine.transition(IDLE, old)
+    assert machine.state == PROBING
+    assert machine.transition(STARTING, new)
+
+
+def test_only_one_thread_wins_a_transition():
+    machine = SessionStateMachine()
+    session = machine.begin()
+    machine.transition(STARTING, session)
+    machine.transition(MINING, session)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def stop():
+        barrier.wait()
+        results.append(machine.transition(STOPPING, session))
+
+    threads = [threading.Thread(target=stop) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    assert machine.state == STOPPING
+
+
+def test_listener_errors_are_ignored():
+    machine = SessionStateMachine()
+
+    def broken(old, new, detail):
+        raise RuntimeError("监听者出错")
+    machine.add_listener(broken)
+    assert machine.begin() == 1
+    assert machine.transition(IDLE, 1)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+from mock_pool import MockPool
+from stratum_proxy import PREFIX_BYTES, StratumProxy
+
+
+def quiet(message):
+    pass
+
+
+class Rig:
+    """一台下游矿机：发送请求并等待对应id的响应，同时记录收到的通知"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.notifications = []
+        self._next_id = 1
+
+    @classmethod
+    async def connect(cls, port, worker):
+        rig = cls(*await asyncio.open_connection("127.0.0.1", port))
+        rig.subscription = await rig.request("mining.subscribe", ["test-rig"])
+        assert (await rig.request("mining.authorize", [worker, "x"]))['result'] is True
+        return rig
+
+    async def request(self, method, params):
+        request_id = self._next_id
+        self._next_id += 1
+        self.writer.write((json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode())
+        await self.writer.drain()
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), 5)
+            assert line, "代理关闭了连接"
+            message = json.loads(line)
+            if message.get('id') == request_id:
+                return message
+            self.notifications.append(message)
+
+    async def job_id(self):
+        """当前任务id（订阅后代理立即下发当前任务）"""
+        while not any(message.get('method') == 'mining.notify' for message in self.notifications):
+            self.notifications.append(json.loads(await asyncio.wait_for(self.reader.readline(), 5)))
+        return [message for message in self.notifications if message.get('method') == 'mining.notify'][-1]['params'][0]
+
+    async def submit(self, worker, job_id, extranonce2):
+        response = await self.request("mining.submit", [worker, job_id, extranonce2, "65000000", "00000001"])
+        return response['result'] is True
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("等待超时")
+
+
+async def run_proxy_scenario():
+    pool = await MockPool(job_interval=3600, log=quiet).start()
+    proxy = StratumProxy([pool.address], "wallet.farm", listen="127.0.0.1:0", log=quiet)
+    stop = asyncio.Event()
+    serving = asyncio.ensure_future(proxy.serve(stop, stats_interval=3600))
+    try:
+        await wait_for(lambda: proxy.port is not None)
+        rig_a = await Rig.connect(proxy.port, "rig-a")
+        rig_b = await Rig.connect(proxy.port, "rig-b")
+
+        # 两台矿机共用上游的extranonce1，各自分到不同的extranonce2前缀，剩余的extranonce2字节留给矿机
+        extranonce_a, size_a = rig_a.subscription['result'][1:]
+        extranonce_b, size_b = rig_b.subscription['result'][1:]
+        upstream_extranonce1 = proxy.upstreams[0].extranonce1
+        assert extranonce_a[:len(upstream_extranonce1)] == extranonce_b[:len(upstream_extranonce1)] == upstream_extranonce1
+        assert extranonce_a != extranonce_b
+        assert len(extranonce_a) == len(upstream_extranonce1) + PREFIX_BYTES * 2
+        assert size_a == size_b == pool.extranonce2_size - PREFIX_BYTES
+
+        job_id = await rig_a.job_id()
+        assert await rig_b.job_id() == job_id
+        # 相同的extranonce2加上不同的前缀后，在矿池看来是不同的份额
+        assert await rig_a.submit("rig-a", job_id, "0000")
+        assert await rig_a.submit("rig-a", job_id, "0001")
+        assert await rig_b.submit("rig-b", job_id, "0000")
+        assert not await rig_b.submit("rig-b", job_id, "0000")  # 重复份额
+        assert not await rig_b.submit("rig-b", "ffff", "0002")  # 过期任务
+
+        # 矿机重连后按矿工名继续累计
+        await rig_a.close()
+        await wait_for(lambda: len(proxy.downstreams) == 1)
+        rig_a = await Rig.connect(proxy.port, "rig-a")
+        assert await rig_a.submit("rig-a", job_id, "0002")
+
+        return proxy.worker_totals(), pool.stats(), proxy.stats()
+    finally:
+        stop.set()
+        await serving
+        await pool.stop()
+
+
+def test_proxy_partitions_extranonce_and_counts_shares_per_worker():
+    totals, pool_stats, proxy_stats = asyncio.run(run_proxy_scenario())
+
+    assert totals['rig-a'] == {'submitted': 3, 'accepted': 3, 'rejected': 0, 'accepted_difficulty': 3000.0}
+    assert totals['rig-b'] == {'submitted': 3, 'accepted': 1, 'rejected': 2, 'accepted_difficulty': 1000.0}
+    # 所有矿机通过同一条上游连接、使用代理的矿工名提交
+    assert pool_stats['connections'] == 1
+    assert pool_stats['authorized'] == ["wallet.farm"]
+    assert (pool_stats['accepted'], pool_stats['rejected']) == (4, 2)
+    assert proxy_stats['upstreams'][0]['connected']
+
+
+async def run_bad_set_extranonce():
+    pool = await MockPool(job_interval=3600, log=quiet).start()
+    messages = []
+    proxy = StratumProxy([pool.address], "wallet.farm", listen="127.0.0.1:0", log=messages.append)
+    stop = asyncio.Event()
+    serving = asyncio.ensure_future(proxy.serve(stop, stats_interval=3600))
+    try:
+        await wait_for(lambda: proxy.port is not None)
+        rig = await Rig.connect(proxy.port, "rig-a")
+        extranonce1 = proxy.upstreams[0].extranonce1
+        for params in ([], ["abcd"], ["abcd", "four"], None):
+            for writer in list(pool._clients):
+                pool._send(writer, {"id": None, "method": "mining.set_extranonce", "params": params})
+        await wait_for(lambda: sum("set_extranonce" in message for message in messages) == 4)
+        # 上游连接和下游都不受影响，仍可正常提交份额
+        accepted = await rig.submit("rig-a", await rig.job_id(), "0000")
+        return accepted, proxy.upstreams[0].extranonce1 == extranonce1, pool.stats()['connections']
+    finally:
+        stop.set()
+        await serving
+        await pool.stop()
+
+
+def test_proxy_ignores_malformed_set_extranonce():
+    accepted, extranonce_kept, connections = asyncio.run(run_bad_set_extranonce())
+    assert accepted
+    assert extranonce_kept
+    assert connections == 1
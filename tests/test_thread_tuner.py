@@ -0,0 +1,36 @@
+from thread_tuner import ThreadTuner, find_knee
+
+
+def test_find_knee_returns_fewest_threads_near_best():
+    results = [(1, 500.0), (2, 990.0), (3, 1000.0), (4, 960.0)]
+    assert find_knee(results) == 2
+    assert find_knee(results, tolerance=0.0) == 3
+
+
+def test_find_knee_ignores_missing_results_and_order():
+    assert find_knee([(4, 800.0), (2, None), (3, 1000.0), (1, 0.0)]) == 3
+    assert find_knee([(1, None), (2, None)]) is None
+    assert find_knee([]) is None
+
+
+def test_sweep_against_fake_miner(monkeypatch, fake_miner_path):
+    # 模拟挖矿程序在2个线程之后算力不再增加
+    monkeypatch.setenv("FAKE_MINER_KNEE", "2")
+    monkeypatch.setenv("FAKE_MINER_HASHRATE_INTERVAL", "0.1")
+    monkeypatch.setenv("FAKE_MINER_STARTUP_DELAY", "0")
+    messages = []
+    tuner = ThreadTuner(fake_miner_path, duration=1.5, warmup=0.3, log=messages.append)
+
+    assert tuner.sweep([1, 2, 3]) == 2
+    assert [threads for threads, _ in tuner.results] == [1, 2, 3]
+    assert all(hashrate for _, hashrate in tuner.results)
+    assert tuner.results[1][1] > tuner.results[0][1] * 1.8
+    assert any("推荐 2 线程" in message for message in messages)
+
+
+def test_measure_without_hashrate_output(tmp_path):
+    silent = tmp_path / "silent_miner.py"
+    silent.write_text("print('no hashrate here')\n")
+    tuner = ThreadTuner(str(silent), duration=2, warmup=0, log=lambda message: None)
+    assert tuner.sweep([1]) is None
+    assert tuner.results == [(1, None)]
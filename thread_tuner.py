@@ -0,0 +1,127 @@
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import miner_config
+from miner_events import MinerOutputParser, HashrateEvent, format_hashrate
+from miner_supervisor import MinerSupervisor
+
+# SRBMiner离线基准测试模式的参数（不连接矿池）
+BENCHMARK_ARGS = ["--algorithm", "randomscash", "--benchmark", "--randomx-use-largepages", "--gpu-off"]
+
+# 算力与最高值相差不超过该比例时视为没有提升（RandomX受L3缓存限制，线程过多反而无益）
+KNEE_TOLERANCE = 0.02
+
+
+def find_knee(results, tolerance=KNEE_TOLERANCE):
+    """results为 [(线程数, 稳定算力)]，返回达到最高算力 (1 - tolerance) 的最少线程数"""
+    measured = sorted((threads, hashrate) for threads, hashrate in results if hashrate)
+    if not measured:
+        return None
+    best = max(hashrate for _, hashrate in measured)
+    for threads, hashrate in measured:
+        if hashrate >= best * (1 - tolerance):
+            return threads
+
+
+class ThreadTuner:
+    """依次用不同的 --cpu-threads 运行挖矿程序的基准测试，
+    取每个线程数预热后的稳定算力（中位数），找出继续增加线程不再提升算力的拐点"""
+
+    def __init__(self, miner_path=miner_config.MINER_EXECUTABLE, duration=60, warmup=20,
+                 benchmark_args=None, tolerance=KNEE_TOLERANCE, log=print):
+        self.miner_path = miner_path
+        self.duration = duration
+        self.warmup = warmup
+        self.benchmark_args = list(BENCHMARK_ARGS if benchmark_args is None else benchmark_args)
+        self.tolerance = tolerance
+        self.log = log
+        self.results = []
+
+    def measure(self, threads):
+        """运行一次基准测试，返回预热之后的算力中位数（没有算力输出时返回None）"""
+        cmd = (miner_config.miner_command_prefix(self.miner_path) + self.benchmark_args
+               + ["--cpu-threads", str(threads)])
+        started = time.monotonic()
+        samples = []
+
+        def on_hashrate(event):
+            # 预热期间（生成数据集、缓存未稳定）的算力不计入
+            if event.hashrate and time.monotonic() - started >= self.warmup:
+                samples.append(event.hashrate)
+
+        parser = MinerOutputParser()
+        parser.subscribe(on_hashrate, (HashrateEvent,))
+        exited = threading.Event()
+
+        def on_lines(lines):
+            for line in lines:
+                parser.feed_line(line)
+
+        # 与挖矿时相同，由监督线程读取输出；到时间后停止（超时未退出时强制终止）
+        supervisor = MinerSupervisor()
+        try:
+            supervisor.start(cmd, on_lines=on_lines, on_exit=lambda returncode, stop_requested: exited.set(),
+                             **miner_config.hidden_window_kwargs()).result(10)
+            exited.wait(self.duration)
+        finally:
+            supervisor.shutdown()
+        return statistics.median(samples) if samples else None
+
+    def sweep(self, thread_counts):
+        """依次测试各个线程数，返回拐点线程数"""
+        self.results = []
+        for threads in thread_counts:
+            self.log(f"⏱ 测试 {threads} 个线程（{self.duration} 秒，预热 {self.warmup} 秒）...")
+            hashrate = self.measure(threads)
+            self.results.append((threads, hashrate))
+            if hashrate:
+                self.log(f"   {threads} 线程: {format_hashrate(hashrate)}")
+            else:
+                self.log(f"   {threads} 线程: 没有读到算力输出")
+        knee = find_knee(self.results, self.tolerance)
+        if knee is not None:
+            best_threads, best = max(((t, h) for t, h in self.results if h), key=lambda item: item[1])
+            self.log(f"✅ 最高算力 {format_hashrate(best)}（{best_threads} 线程），"
+                     f"推荐 {knee} 线程（与最高算力相差不超过 {self.tolerance:.0%}）")
+        return knee
+
+
+def save_tuned_threads(threads, config_path=miner_config.CONFIG_PATH, log=print):
+    """把调优结果按主机名写回config.json"""
+    config = miner_config.load_config(config_path, log=log)
+    miner_config.set_host_cpu_threads(config, threads)
+    miner_config.save_config(config, config_path)
+    log(f"💾 已为主机 {miner_config.host_name()} 保存 cpu_threads = {threads}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="自动测试最佳的 cpu_threads")
+    parser.add_argument('--config', default=miner_config.CONFIG_PATH, help="配置文件路径")
+    parser.add_argument('--miner', help="挖矿程序路径（默认使用配置中的 miner_path）")
+    parser.add_argument('--min-threads', type=int, default=1)
+    parser.add_argument('--max-threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--step', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=60, help="每个线程数的测试时长（秒）")
+    parser.add_argument('--warmup', type=float, default=20, help="不计入结果的预热时长（秒）")
+    parser.add_argument('--tolerance', type=float, default=KNEE_TOLERANCE, help="视为没有提升的算力差距比例")
+    parser.add_argument('--write', action='store_true', help="把推荐值写回配置文件")
+    args = parser.parse_args(argv)
+
+    config = miner_config.load_config(args.config)
+    tuner = ThreadTuner(args.miner or config.get('miner_path') or miner_config.MINER_EXECUTABLE,
+                        duration=args.duration, warmup=args.warmup, tolerance=args.tolerance)
+    knee = tuner.sweep(range(args.min_threads, args.max_threads + 1, max(args.step, 1)))
+    if knee is None:
+        print("❌ 没有得到任何算力数据，请检查挖矿程序路径和基准测试参数")
+        return 1
+    if args.write:
+        save_tuned_threads(knee, args.config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+import headless  # noqa: E402
+import miner_config  # noqa: E402
+from mock_pool import MockPool  # noqa: E402
+
+
+def run_pool_in_thread(pool):
+    """在后台线程的事件循环中运行模拟矿池，返回停止函数"""
+    started = threading.Event()
+    state = {}
+
+    def thread_main():
+        loop = asyncio.new_event_loop()
+        state['loop'] = loop
+        loop.run_until_complete(pool.start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(pool.stop())
+        loop.close()
+
+    threading.Thread(target=thread_main, name="MockPool", daemon=True).start()
+    started.wait()
+    return lambda: state['loop'].call_soon_threadsafe(state['loop'].stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线端到端检查：模拟矿池 + 模拟挖矿程序 + 无界面模式的完整流程")
+    parser.add_argument('--duration', type=float, default=15.0, help="挖矿多少秒后停止")
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--job-interval', type=float, default=2.0)
+    parser.add_argument('--share-interval', type=float, default=0.5)
+    parser.add_argument('--reject-ratio', type=float, default=0.1)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--lines-per-sec', type=float, default=0.0, help="模拟挖矿程序额外输出的日志行速率")
+    parser.add_argument('--json', dest='json_path', help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    pool = MockPool(job_interval=args.job_interval, reject_ratio=args.reject_ratio, latency_ms=args.latency_ms)
+    stop_pool = run_pool_in_thread(pool)
+
+    workdir = tempfile.mkdtemp(prefix="scash-e2e-")
+    config = dict(miner_config.DEFAULT_CONFIG, pool_address=pool.address, cpu_threads=str(args.threads),
+                  miner_path=os.path.join(TOOLS_DIR, "fake_miner.py"), log_flush_interval="0.2",
+                  stratum_monitor=True)
+    config_path = os.path.join(workdir, "config.json")
+    miner_config.save_config(config, config_path)
+    # 模拟挖矿程序的速率参数通过环境变量传递（挖矿命令由程序生成）
+    os.environ.update(FAKE_MINER_SHARE_INTERVAL=str(args.share_interval), FAKE_MINER_HASHRATE_INTERVAL="1",
+                      FAKE_MINER_LINES_PER_SEC=str(args.lines_per_sec), FAKE_MINER_STARTUP_DELAY="0.5")
+
+    miner = headless.HeadlessMiner(config_path, os.path.join(workdir, "mining_log.txt"), stats_interval=5)
+    timer = threading.Timer(args.duration, miner.request_stop)
+    timer.start()
+    started = time.monotonic()
+    returncode = miner.run()
+    elapsed = time.monotonic() - started
+    timer.cancel()
+    stop_pool()
+
+    stats = miner.pipeline.stats if miner.pipeline is not None else None
+    pool_stats = pool.stats()
+    result = {
+        'returncode': returncode,
+        'elapsed': round(elapsed, 2),
+        'workdir': workdir,
+        'pool': pool_stats,
+        'miner': {
+            'hashrate': stats.hashrate,
+            'accepted': stats.accepted,
+            'rejected': stats.rejected,
+            'jobs': stats.jobs,
+            'large_pages': stats.large_pages,
+        } if stats is not None else None,
+    }
+    # 挖矿程序报告的份额结果应与矿池的记录一致（停止时仍在途中的份额除外）
+    checks = {
+        'exit_ok': returncode == 0,
+        'miner_started': stats is not None,
+        'hashrate_reported': stats is not None and bool(stats.hashrate),
+        'jobs_received': stats is not None and stats.jobs > 0,
+        'shares_accepted': stats is not None and stats.accepted > 0,
+        'shares_match_pool': stats is not None and 0 <= pool_stats['accepted'] - stats.accepted <= 1,
+        'monitor_connected': any(name and name.endswith("_monitor") for name in pool_stats['authorized']),
+    }
+    result['checks'] = checks
+    result['passed'] = all(checks.values())
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if result['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
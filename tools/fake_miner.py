@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# 输出速率等参数也可以用环境变量设置：挖矿命令由程序生成，无法直接加参数
+ENV_PREFIX = "FAKE_MINER_"
+
+
+def _env(name, default):
+    return type(default)(os.environ.get(ENV_PREFIX + name, default))
+
+
+class FakeMiner:
+    """模拟SRBMiner-MULTI：接受相同的命令行参数，按设定的速率输出与真实程序格式相近的日志；
+    指定了矿池时真正连接矿池（stratum），收到任务、提交份额并输出结果"""
+
+    def __init__(self, args):
+        self.args = args
+        self.threads = max(1, args.cpu_threads)
+        self.pools = [pool for pool in (args.pool or "").split(",") if pool]
+        self.wallet = (args.wallet or "x").split(",")[0]
+        self.password = (args.password or "x").split(",")[0]
+        self.difficulty = None
+        self.job = None
+        self.height = random.randint(100000, 200000)
+        self.extranonce2_size = 4
+        self.accepted = 0
+        self.rejected = 0
+        self._writer = None
+        self._next_id = 10
+        self._pending = {}
+
+    def emit(self, line, flush=True):
+        sys.stdout.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {line}\n")
+        if flush:
+            sys.stdout.flush()
+
+    def hashrate(self):
+        """线程数超过 knee 之后算力不再增加并略有下降（模拟L3缓存不足）"""
+        knee = self.args.knee
+        effective = min(self.threads, knee) - max(0, self.threads - knee) * 0.1
+        return max(0.0, effective * self.args.hashrate * random.uniform(0.98, 1.02))
+
+    async def run(self):
+        args = self.args
+        self.emit("SRBMiner-MULTI CPU & AMD/INTEL/NVIDIA GPU Miner 2.5.2 (fake)")
+        self.emit(f"Algorithm: randomscash, CPU threads: {self.threads}")
+        await asyncio.sleep(args.startup_delay)
+        if args.randomx_use_largepages:
+            if args.large_pages:
+                self.emit("randomx: huge pages allocated 100%")
+            else:
+                self.emit("randomx: failed to allocate huge pages, using normal memory")
+        self.emit("randomscash algorithm initialized")
+        tasks = [asyncio.ensure_future(self._hashrate_loop())]
+        if args.lines_per_sec > 0:
+            tasks.append(asyncio.ensure_future(self._filler_loop()))
+        if not args.benchmark and self.pools:
+            tasks.append(asyncio.ensure_future(self._pool_loop()))
+            tasks.append(asyncio.ensure_future(self._share_loop()))
+        if args.duration:
+            await asyncio.sleep(args.duration)
+            self.emit("miner shutting down")
+            return 0
+        await asyncio.gather(*tasks)
+        return 0
+
+    async def _hashrate_loop(self):
+        while True:
+            await asyncio.sleep(self.args.hashrate_interval)
+            hashrate = self.hashrate()
+            self.emit(f"cpu hashrate: 10s: {hashrate:.2f} H/s 60s: {hashrate * 0.995:.2f} H/s")
+
+    async def _filler_loop(self):
+        """无关紧要的输出行，用于测试输出读取和日志处理的吞吐量"""
+        tick = 0.01
+        carry = 0.0
+        index = 0
+        while True:
+            await asyncio.sleep(tick)
+            carry += self.args.lines_per_sec * tick
+            count, carry = int(carry), carry - int(carry)
+            for _ in range(count):
+                index += 1
+                self.emit(f"cpu{index % self.threads} thread stats: nonce {index:08x}", flush=False)
+            if count:
+                sys.stdout.flush()
+
+    # ---- stratum ----
+
+    def _send(self, method, params, request_id=None):
+        if request_id is None:
+            request_id = self._next_id
+            self._next_id += 1
+        self._writer.write((json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode())
+        return request_id
+
+    async def _pool_loop(self):
+        delay = 1
+        while True:
+            for index, pool in enumerate(self.pools, 1):
+                address = pool.split("://", 1)[-1]
+                host, _, port = address.rpartition(":")
+                try:
+                    reader, self._writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), 10)
+                except (OSError, ValueError, asyncio.TimeoutError) as e:
+                    self.emit(f"pool{index} connection failed to {address}: {e}, retrying in {delay} sec")
+                    continue
+                self.emit(f"pool{index} connected to {address}")
+                delay = 1
+                try:
+                    await self._session(index, address, reader)
+                except (OSError, ValueError) as e:
+                    self.emit(f"pool{index} connection lost: {e}")
+                self.emit(f"pool{index} disconnected from {address}")
+                self._writer = None
+                self.job = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _session(self, index, address, reader):
+        self._send("mining.subscribe", ["SRBMiner-MULTI/2.5.2"], 1)
+        self._send("mining.authorize", [self.wallet, self.password], 2)
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("pool closed connection")
+            message = json.loads(line)
+            method = message.get('method')
+            params = message.get('params') or []
+            if method == 'mining.set_difficulty':
+                self.difficulty = float(params[0])
+                self.emit(f"pool{index} difficulty set to {self.difficulty:g}")
+            elif method == 'mining.notify':
+                self.job = params[0]
+                self.height += 1
+                self.emit(f"pool{index} new job from {address} diff {self.difficulty or 0:g} height {self.height}")
+            elif message.get('id') == 1 and message.get('result'):
+                self.extranonce2_size = int(message['result'][2])
+            elif message.get('id') == 2 and message.get('result') is not True:
+                self.emit(f"pool{index} authorization failed: {message.get('error')}")
+            elif message.get('id') in self._pending:
+                latency_ms = (time.perf_counter() - self._pending.pop(message['id'])) * 1000
+                if message.get('result') is True:
+                    self.accepted += 1
+                    self.emit(f"cpu result accepted [ {latency_ms:.0f}ms ] shares: {self.accepted}/{self.rejected}")
+                else:
+                    self.rejected += 1
+                    reason = (message.get('error') or [None, "unknown"])[1]
+                    self.emit(f"cpu result rejected [ reason: {reason} ] [ {latency_ms:.0f}ms ]")
+
+    async def _share_loop(self):
+        while True:
+            # 份额按泊松过程出现
+            await asyncio.sleep(random.expovariate(1 / self.args.share_interval))
+            if self._writer is None or self.job is None:
+                continue
+            extranonce2 = os.urandom(self.extranonce2_size).hex()
+            request_id = self._send("mining.submit", [self.wallet, self.job, extranonce2,
+                                                      format(int(time.time()), '08x'), os.urandom(4).hex()])
+            self._pending[request_id] = time.perf_counter()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模拟SRBMiner-MULTI（用于测试）")
+    parser.add_argument('--pool', help="矿池地址，多个用逗号分隔")
+    parser.add_argument('--wallet')
+    parser.add_argument('--password')
+    parser.add_argument('--cpu-threads', type=int, default=1)
+    parser.add_argument('--benchmark', action='store_true', help="只输出算力，不连接矿池")
+    parser.add_argument('--randomx-use-largepages', action='store_true')
+    parser.add_argument('--hashrate', type=float, default=_env("HASHRATE", 500.0), help="每线程算力 H/s")
+    parser.add_argument('--knee', type=int, default=_env("KNEE", os.cpu_count() or 4),
+                        help="超过该线程数后算力不再增加")
+    parser.add_argument('--hashrate-interval', type=float, default=_env("HASHRATE_INTERVAL", 10.0),
+                        help="输出算力的间隔（秒）")
+    parser.add_argument('--share-interval', type=float, default=_env("SHARE_INTERVAL", 10.0),
+                        help="平均每隔多少秒找到一个份额")
+    parser.add_argument('--lines-per-sec', type=float, default=_env("LINES_PER_SEC", 0.0),
+                        help="额外输出的无关日志行速率")
+    parser.add_argument('--startup-delay', type=float, default=_env("STARTUP_DELAY", 1.0),
+                        help="模拟生成RandomX数据集的启动时间（秒）")
+    parser.add_argument('--large-pages', type=int, default=_env("LARGE_PAGES", 1), help="1表示大页分配成功")
+    parser.add_argument('--duration', type=float, default=_env("DURATION", 0.0), help="运行多少秒后退出（0表示一直运行）")
+    # 真实挖矿程序的其他参数（--algorithm、--send-stales 等）忽略
+    args, _ = parser.parse_known_args(argv)
+    try:
+        return asyncio.run(FakeMiner(args).run())
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import time
+
+DEFAULT_DIFFICULTY = 1000.0
+DEFAULT_JOB_INTERVAL = 30.0  # 下发新任务的间隔（秒）
+DEFAULT_EXTRANONCE2_SIZE = 4
+RECENT_JOBS = 4  # 接受最近几个任务的份额，更早的按过期份额拒绝
+
+
+class MockPool:
+    """模拟stratum矿池：可配置难度、任务间隔、拒绝比例和响应延迟，记录收到的请求"""
+
+    def __init__(self, host="127.0.0.1", port=0, difficulty=DEFAULT_DIFFICULTY, job_interval=DEFAULT_JOB_INTERVAL,
+                 reject_ratio=0.0, latency_ms=0.0, extranonce2_size=DEFAULT_EXTRANONCE2_SIZE, log=print):
+        self.host = host
+        self.port = port
+        self.difficulty = difficulty
+        self.job_interval = job_interval
+        self.reject_ratio = reject_ratio
+        self.latency_ms = latency_ms
+        self.extranonce2_size = extranonce2_size
+        self.log = log
+        self.connections = 0
+        self.authorized = []
+        self.jobs = 0
+        self.accepted = 0
+        self.rejected = 0
+        self._clients = set()
+        self._job = None
+        self._recent_jobs = []
+        self._shares = set()
+        self._server = None
+        self._job_task = None
+
+    @property
+    def address(self):
+        return f"stratum+tcp://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._new_job()
+        self._job_task = asyncio.ensure_future(self._job_loop())
+        self.log(f"模拟矿池已启动: {self.address}（难度 {self.difficulty:g}，任务间隔 {self.job_interval:g} 秒，"
+                 f"拒绝比例 {self.reject_ratio:g}，延迟 {self.latency_ms:g} ms）")
+        return self
+
+    async def stop(self):
+        self._job_task.cancel()
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'connections': self.connections,
+            'clients': len(self._clients),
+            'authorized': list(self.authorized),
+            'jobs': self.jobs,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+        }
+
+    def _new_job(self):
+        self.jobs += 1
+        job_id = format(self.jobs, 'x')
+        self._job = [job_id, os.urandom(32).hex(), os.urandom(40).hex(), os.urandom(20).hex(), [],
+                     "20000000", "1d00ffff", format(int(time.time()), '08x'), True]
+        self._recent_jobs = (self._recent_jobs + [job_id])[-RECENT_JOBS:]
+
+    async def _job_loop(self):
+        while True:
+            await asyncio.sleep(self.job_interval)
+            self._new_job()
+            for writer in list(self._clients):
+                self._send(writer, {"id": None, "method": "mining.notify", "params": self._job})
+
+    def _send(self, writer, message):
+        writer.write((json.dumps(message) + "\n").encode())
+
+    async def _reply(self, writer, request_id, result, error=None):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self._send(writer, {"id": request_id, "result": result, "error": error})
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        extranonce1 = format(self.connections, '08x')
+        subscribed = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                request_id, method, params = message.get('id'), message.get('method'), message.get('params') or []
+                if method == 'mining.subscribe':
+                    subscribed = True
+                    await self._reply(writer, request_id, [[["mining.set_difficulty", extranonce1],
+                                                            ["mining.notify", extranonce1]],
+                                                           extranonce1, self.extranonce2_size])
+                elif method == 'mining.authorize':
+                    self.authorized.append(params[0] if params else None)
+                    await self._reply(writer, request_id, True)
+                    if subscribed:
+                        self._clients.add(writer)
+                        self._send(writer, {"id": None, "method": "mining.set_difficulty", "params": [self.difficulty]})
+                        self._send(writer, {"id": None, "method": "mining.notify", "params": self._job})
+                elif method == 'mining.submit':
+                    await self._on_submit(writer, request_id, params, extranonce1)
+                elif method == 'mining.extranonce.subscribe':
+                    await self._reply(writer, request_id, True)
+                else:
+                    await self._reply(writer, request_id, None, [20, f"Unsupported method {method}", None])
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _on_submit(self, writer, request_id, params, extranonce1):
+        job_id = params[1] if len(params) > 1 else None
+        share = (extranonce1,) + tuple(params[1:])
+        if job_id not in self._recent_jobs:
+            error = [21, "Job not found", None]
+        elif share in self._shares:
+            error = [22, "Duplicate share", None]
+        elif random.random() < self.reject_ratio:
+            error = [23, "Low difficulty share", None]
+        else:
+            error = None
+        self._shares.add(share)
+        if error is None:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        await self._reply(writer, request_id, error is None, error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟stratum矿池")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=3333)
+    parser.add_argument('--difficulty', type=float, default=DEFAULT_DIFFICULTY)
+    parser.add_argument('--job-interval', type=float, default=DEFAULT_JOB_INTERVAL, help="下发新任务的间隔（秒）")
+    parser.add_argument('--reject-ratio', type=float, default=0.0, help="随机拒绝份额的比例（0~1）")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="每个响应额外延迟的毫秒数")
+    parser.add_argument('--extranonce2-size', type=int, default=DEFAULT_EXTRANONCE2_SIZE)
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="输出统计的间隔（秒）")
+    args = parser.parse_args(argv)
+
+    async def run():
+        pool = await MockPool(args.host, args.port, args.difficulty, args.job_interval, args.reject_ratio,
+                              args.latency_ms, args.extranonce2_size).start()
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+        while True:
+            try:
+                await asyncio.wait_for(stop_event.wait(), args.stats_interval)
+                break
+            except asyncio.TimeoutError:
+                print(json.dumps(pool.stats(), ensure_ascii=False))
+        await pool.stop()
+        print(json.dumps(pool.stats(), ensure_ascii=False))
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
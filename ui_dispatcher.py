@@ -0,0 +1,61 @@
+import threading
+from collections import deque
+
+UI_DISPATCH_EVENT = "<<UIDispatch>>"
+FALLBACK_DRAIN_MS = 500  # 兜底的定时执行间隔（毫秒），虚拟事件丢失时调用最多延迟这么久
+
+
+class UIDispatcher:
+    """把后台线程中的界面操作转交给Tk主线程执行：
+    调用先进入线程安全队列，需要时用虚拟事件唤醒主线程统一执行；
+    另有一个定时器定期执行队列，虚拟事件发送失败或丢失时调用也不会一直留在队列中"""
+
+    def __init__(self, root, event_name=UI_DISPATCH_EVENT, fallback_ms=FALLBACK_DRAIN_MS):
+        self.root = root
+        self.event_name = event_name
+        self.fallback_ms = fallback_ms
+        self._calls = deque()
+        self._event_pending = False  # 已发送虚拟事件、主线程还没有执行队列
+        self._lock = threading.Lock()
+        self._main_thread = threading.current_thread()
+        root.bind(event_name, self._drain)
+        self._schedule_fallback()
+
+    def call(self, func, *args):
+        """在主线程中执行 func(*args)；已在主线程中时直接执行"""
+        if threading.current_thread() is self._main_thread:
+            func(*args)
+            return
+        with self._lock:
+            self._calls.append((func, args))
+            if self._event_pending:
+                return
+            self._event_pending = True
+        try:
+            self.root.event_generate(self.event_name, when="tail")
+        except Exception:
+            # 窗口已销毁或主循环未运行：下一次调用重新发送，其间由定时器执行
+            with self._lock:
+                self._event_pending = False
+
+    def _schedule_fallback(self):
+        try:
+            self.root.after(self.fallback_ms, self._fallback_drain)
+        except Exception:
+            pass  # 窗口已销毁
+
+    def _fallback_drain(self):
+        if self._calls:
+            self._drain()
+        self._schedule_fallback()
+
+    def _drain(self, event=None):
+        with self._lock:
+            calls = self._calls
+            self._calls = deque()
+            self._event_pending = False
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"界面更新出错: {repr(e)}")